@@ -1,9 +1,11 @@
 # src/app.py
+import argparse
+import itertools
 import json
 import os
 import sys
+import threading
 from urllib.parse import urlparse
-import re
 
 # --- Setup Project Path ---
 # Get the directory containing the 'src' directory (project root)
@@ -14,16 +16,23 @@ if project_root not in sys.path:
 # --------------------------
 
 # --- Imports relative to project root (now that it's in sys.path) ---
-try:
-    # Import using the new path structure (src.run_url_finder)
-    from src.run_url_finder import run_spider
-    from src.utils.WebpageExtractor import WebpageExtractor
-    from src.utils.FileSaver import write_to_markdown
-except ImportError as e:
-    print(f"Error: Could not import required modules: {e}")
-    print("Ensure all modules exist in the 'src' directory and its subdirectories.")
-    print(f"Project Root added to sys.path: {project_root}")
-    sys.exit(1)
+# Only lightweight modules here: Scrapy/Twisted (crawl) and trafilatura/lxml/requests
+# (extraction) are imported by the functions that need them, so importing this
+# module, --help and the process-pool workers stay fast.
+from src.utils.FileSaver import build_output_filename, render_markdown, sanitize_filename
+from src.utils.OutputWriter import (OutputWriter, check_output_format, create_sink,
+                                    default_output_path, OUTPUT_FORMATS, DEFAULT_SHARD_SIZE)
+from src.utils.Manifest import ManifestSet, BUDGET_CLOSE_REASONS
+from src.utils.NearDuplicates import NearDuplicateIndex, DEFAULT_MAX_DISTANCE
+from src.utils.ProgressLog import ProgressLog
+from src.utils.ContentGate import ContentGate, DEFAULT_MAX_BODY_BYTES
+from src.utils.RateControl import RATE_CONTROLLER, DEFAULT_MAX_CONCURRENCY
+from src.utils.UrlStream import UrlStream, DEFAULT_STREAM_SIZE
+from src.utils.ResponseCache import ResponseCache
+from src.utils.CrawlPriority import parse_pattern_weights
+from src.utils.SeenSet import SEEN_SET_KINDS
+from src.utils.UrlFilter import DEFAULT_STRIP_PARAMS
+from src.utils.Metrics import SamplingProfiler, format_stage_summary, start_reporters, DEFAULT_METRICS_HOST
 # ---------------------------------------------------------------------
 
 # --- Configuration ---
@@ -31,98 +40,631 @@ START_URL = "https://browser-use.com/"
 # Define directories relative to the project root
 URL_LIST_DIR_NAME = "url_lists"
 URL_LIST_DIR_ABS = os.path.join(project_root, URL_LIST_DIR_NAME) # Absolute path
+# Extraction progress log, kept inside --job-dir
+EXTRACT_PROGRESS_LOG = "extract_progress.log"
 # --------------------
 
-# --- Helper Function to Sanitize Filenames ---
-def sanitize_filename(name):
-    """Removes potentially problematic characters for filenames."""
-    name = re.sub(r'^https?:\/\/', '', name)
-    name = name.replace('.', '_').replace('/', '_')
-    name = re.sub(r'[^\w\-]+', '', name)
-    return name or "default"
+def iter_urls(url_list_path):
+    """Yields URLs from a JSONL URL list one line at a time."""
+    try:
+        with open(url_list_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    data = json.loads(line)
+                    yield data["url"]
+                except (json.JSONDecodeError, KeyError) as e:
+                    print(f"Skipping invalid line in {url_list_path}: {line.strip()} - Error: {e}")
+                    continue
+    except OSError as e:
+        print(f"Error reading {url_list_path}: {e}")
+        sys.exit(1)
 # ---------------------------------------------
 
-# --- Derive Filename and Path ---
-try:
-    parsed_start_uri = urlparse(START_URL)
-    domain_part = parsed_start_uri.netloc if parsed_start_uri.netloc else "unknown_url"
-    sanitized_domain = sanitize_filename(domain_part)
-    url_filename = f"{sanitized_domain}_urls.jsonl"
-    # Construct the absolute path for the URL list file
-    full_url_output_path = os.path.join(URL_LIST_DIR_ABS, url_filename)
-except Exception as e:
-    print(f"Error parsing START_URL '{START_URL}' to generate filename: {e}")
-    sys.exit(1)
-# ---------------------------------
-
-# --- Step 1: Run the URL Finder ---
-print("--- Running URL Finder ---")
-try:
-    # Pass the absolute path to the run_spider function
-    run_spider(start_url=START_URL, output_file_path=full_url_output_path) # Domain auto-derived
-    print(f"--- URL Finder finished. URLs should be in {full_url_output_path} ---")
-except Exception as e:
-    print(f"\nError occurred during URL finding: {e}")
-    sys.exit(1)
-
-# --- Step 2: Extract Content from Found URLs ---
-print(f"\n--- Starting Content Extraction from {full_url_output_path} ---")
-
-# Check if the URL file exists *at the expected absolute path*
-if not os.path.exists(full_url_output_path):
-    print(f"Error: Output file '{full_url_output_path}' not found.")
-    sys.exit(1)
-
-# --- Read URLs from the file at the absolute path ---
-target_urls: list = []
-try:
-    with open(full_url_output_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            try:
-                data = json.loads(line)
-                url = data["url"]
-                target_urls.append(url)
-            except (json.JSONDecodeError, KeyError) as e:
-                print(f"Skipping invalid line in {full_url_output_path}: {line.strip()} - Error: {e}")
+def add_run_arguments(parser):
+    """Start URL and how the crawl hands pages to the extraction (the 'run' command)."""
+    parser.add_argument(
+        "start_url",
+        nargs="?",
+        default=START_URL,
+        help="The full starting URL (e.g., 'https://www.example.com')"
+    )
+    parser.add_argument(
+        "--single-fetch",
+        action="store_true",
+        help="Extract content during the crawl instead of re-downloading every page afterwards."
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Start extracting as soon as the crawl finds URLs instead of after it finishes: "
+             "found URLs go through a bounded in-memory buffer to the extraction workers, "
+             "and a full buffer holds back the crawl."
+    )
+    parser.add_argument(
+        "--stream-buffer",
+        type=int,
+        default=DEFAULT_STREAM_SIZE,
+        help="With --stream: URLs buffered between the crawl and the extraction."
+    )
+
+
+def add_crawl_arguments(parser):
+    """URL discovery options."""
+    parser.add_argument(
+        "--sitemap",
+        action="store_true",
+        help="Seed URL discovery from the sitemaps listed in robots.txt (or /sitemap.xml)."
+    )
+    parser.add_argument(
+        "--no-follow-links",
+        dest="follow_links",
+        action="store_false",
+        help="Do not follow links; with --sitemap, crawl only the pages the sitemaps list."
+    )
+    parser.add_argument(
+        "--max-pages",
+        type=int,
+        default=0,
+        help="Stop the crawl after finding this many pages, most likely changed first. 0 = no limit."
+    )
+    parser.add_argument(
+        "--max-time",
+        type=int,
+        default=0,
+        help="Stop the crawl after this many seconds. 0 = no limit."
+    )
+    parser.add_argument(
+        "--pattern-weight",
+        action="append",
+        default=[],
+        help="Crawl priority boost for URLs matching a glob, as GLOB=WEIGHT (e.g. '*/blog/*=50'); repeatable."
+    )
+    parser.add_argument(
+        "--strip-param",
+        action="append",
+        default=[],
+        help="Extra query parameter (glob) to strip from URLs; repeatable. "
+             "Tracking params (utm_*, gclid, ...) and session IDs are always stripped."
+    )
+    parser.add_argument(
+        "--max-query-variants",
+        type=int,
+        default=50,
+        help="Crawl at most this many distinct query strings per path; 0 disables."
+    )
+    parser.add_argument(
+        "--max-per-pattern",
+        type=int,
+        default=0,
+        help="Opt-in trap guard: crawl at most this many URLs per path shape "
+             "(e.g. /calendar/{n}/{n}). 0 = no limit."
+    )
+    parser.add_argument(
+        "--seen-set",
+        choices=SEEN_SET_KINDS,
+        default="set",
+        help="Dedup structure for found URLs and requests: exact set, 64-bit hashes, or Bloom filter."
+    )
+    parser.add_argument(
+        "--seen-capacity",
+        type=int,
+        default=1_000_000,
+        help="Expected number of URLs (sizes the hashed table / Bloom filter and the trap counters)."
+    )
+    parser.add_argument(
+        "--bloom-error-rate",
+        type=float,
+        default=0.001,
+        help="False-positive rate for --seen-set bloom (a false positive skips a page)."
+    )
+
+
+def add_extract_arguments(parser):
+    """Fetching and extraction options."""
+    parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        default=1,
+        help="Number of extraction processes. Values above 1 fetch pages concurrently "
+             "and run trafilatura in a process pool."
+    )
+    parser.add_argument(
+        "--fetch-engine",
+        choices=["session", "async"],
+        default="session",
+        help="Fetch backend for extraction: pooled requests.Session, or the same session "
+             "scheduled by asyncio with per-host limits (requests runs in a thread pool)."
+    )
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        default=16,
+        help="Global cap on concurrent connections during extraction."
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=4,
+        help="Maximum concurrent requests per host (async engine only)."
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=2,
+        help="Retries for connection errors, timeouts and 429/5xx responses."
+    )
+    parser.add_argument(
+        "--profile-extract",
+        type=int,
+        default=0,
+        metavar="N",
+        help="cProfile every Nth page's parse + extraction (in every worker) into --profile-dir."
+    )
+    parser.add_argument(
+        "--profile-dir",
+        default="profiles",
+        help="Directory for extraction profiles (extract-<pid>.prof, read with python -m pstats)."
+    )
+
+
+def add_common_arguments(parser):
+    """Options shared by the crawl and the extraction: politeness, cache, checkpoints, metrics."""
+    parser.add_argument(
+        "--adaptive-rate",
+        action="store_true",
+        help="Adapt each host's concurrency and delay to its p95 latency and error rate, in the "
+             "crawl and the extraction: grow while the host stays healthy, halve on slowdowns, "
+             "429/503 responses and Retry-After. Replaces AutoThrottle and --per-host."
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help="With --adaptive-rate: most concurrent requests allowed to one host."
+    )
+    parser.add_argument(
+        "--max-body-mb",
+        type=float,
+        default=DEFAULT_MAX_BODY_BYTES / (1024 * 1024),
+        help="Abandon page downloads larger than this (checked on Content-Length and while "
+             "streaming). Links to PDFs, images, media and archives are never followed, and "
+             "non-HTML responses are dropped on their headers. 0 = no size limit."
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Directory for a persistent HTTP response cache shared by crawl and extraction. "
+             "Cached pages are revalidated with ETag/Last-Modified on later runs."
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=1024,
+        help="Size bound for the response cache; least recently used pages are evicted."
+    )
+    parser.add_argument(
+        "--job-dir",
+        default=None,
+        help="Directory for crawl checkpoints and the extraction progress log."
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run from --job-dir: resume the crawl and skip URLs "
+             "whose extraction already finished."
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve live Prometheus metrics (per-stage timings, bytes, status codes, "
+             "retries, queue depths) on this port at /metrics."
+    )
+    parser.add_argument(
+        "--metrics-host",
+        default=DEFAULT_METRICS_HOST,
+        help="Address for --metrics-port to listen on (0.0.0.0 exposes it to other hosts)."
+    )
+    parser.add_argument(
+        "--stats-file",
+        default=None,
+        help="Periodically write a JSON snapshot of the same metrics to this file."
+    )
+    parser.add_argument(
+        "--stats-interval",
+        type=float,
+        default=10,
+        help="Seconds between --stats-file updates."
+    )
+
+
+def add_output_arguments(parser):
+    """Output format, near-duplicate and incremental options."""
+    parser.add_argument(
+        "--output-format",
+        choices=OUTPUT_FORMATS,
+        default="markdown",
+        help="'markdown' writes one file per page under output_folder/<domain>/, mirroring "
+             "the URL path; the others write every page to one JSON Lines file "
+             "(jsonl.zst needs the zstandard package) or to tar/zip shards."
+    )
+    parser.add_argument(
+        "--output-path",
+        default=None,
+        help="File for the bulk output formats (default: output_folder/<domain>.<format>)."
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=DEFAULT_SHARD_SIZE,
+        help="Pages per tar/zip shard."
+    )
+    parser.add_argument(
+        "--near-duplicates",
+        action="store_true",
+        help="Write pages whose extracted content is nearly identical to an earlier page "
+             "(print views, tracking parameters, mirrors) only once, listing their URLs "
+             "under 'aliases' in that page's front-matter."
+    )
+    parser.add_argument(
+        "--near-duplicate-bits",
+        type=int,
+        default=DEFAULT_MAX_DISTANCE,
+        help="Content SimHashes (64 bits) differing in at most this many bits count as "
+             "near-duplicates; higher values collapse less similar pages."
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Skip extraction and writes for pages whose HTML or Markdown is unchanged since "
+             "the last run (tracked in output_folder/<domain>/.manifest.json), and report "
+             "added, changed and removed pages. With a bulk --output-format the file then "
+             "holds only the new and changed pages."
+    )
+
+
+def build_parser():
+    """The command-line parser for the crawl + extraction run."""
+    parser = argparse.ArgumentParser(
+        description="Crawl a site, extract main content and publish Markdown.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    add_run_arguments(parser)
+    add_crawl_arguments(parser)
+    add_extract_arguments(parser)
+    add_common_arguments(parser)
+    add_output_arguments(parser)
+    return parser
+
+
+def parse_args(argv=None):
+    """Parses command-line options for the crawl + extraction run."""
+    return build_parser().parse_args(argv)
+
+
+def finish_reporting(reporters):
+    """Stops the metrics reporters (writing a final stats file) and prints per-stage timings."""
+    for reporter in reporters:
+        reporter.stop()
+    print("\nStage timings:")
+    print(format_stage_summary())
+
+
+def url_list_path_for(start_url):
+    """Returns (sanitized domain, absolute URL list path) for a start URL."""
+    try:
+        parsed_start_uri = urlparse(start_url)
+        domain_part = parsed_start_uri.netloc if parsed_start_uri.netloc else "unknown_url"
+        sanitized_domain = sanitize_filename(domain_part)
+        url_filename = f"{sanitized_domain}_urls.jsonl"
+        # Construct the absolute path for the URL list file
+        return sanitized_domain, os.path.join(URL_LIST_DIR_ABS, url_filename)
+    except Exception as e:
+        print(f"Error parsing start URL '{start_url}' to generate filename: {e}")
+        sys.exit(1)
+
+
+def resolve_output_path(args, name):
+    """Checks --output-format and returns the absolute bulk output path (None for Markdown)."""
+    try:
+        check_output_format(args.output_format)
+    except ImportError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if args.output_format == "markdown":
+        return None
+    return os.path.abspath(args.output_path or default_output_path(args.output_format, name))
+
+
+def crawl_settings(args):
+    """Scrapy settings for the crawl options shared by every command."""
+    return {
+        'PRIORITY_PATTERN_WEIGHTS': parse_pattern_weights(args.pattern_weight),
+        'URL_STRIP_PARAMS': list(DEFAULT_STRIP_PARAMS) + args.strip_param,
+        'TRAP_MAX_QUERY_VARIANTS': args.max_query_variants,
+        'TRAP_MAX_PER_PATTERN': args.max_per_pattern,
+        'CONTENT_GATE_MAX_BYTES': int(args.max_body_mb * 1024 * 1024),
+        'ADAPTIVE_RATE_ENABLED': args.adaptive_rate,
+        'ADAPTIVE_RATE_MAX_CONCURRENCY': args.max_concurrency,
+    }
+
+
+def crawl_options(args):
+    """run_spider / configure_crawl keyword arguments for the add_crawl_arguments options."""
+    return dict(sitemap=args.sitemap, follow_links=args.follow_links,
+                max_pages=args.max_pages, max_seconds=args.max_time,
+                seen_set=args.seen_set, seen_set_capacity=args.seen_capacity,
+                seen_set_error_rate=args.bloom_error_rate)
+
+
+def crawl_job_dir(args):
+    """The crawl's state folder inside --job-dir, or None."""
+    return os.path.join(os.path.abspath(args.job_dir), "crawl") if args.job_dir else None
+
+
+def crawl_completed(close_reason):
+    """True if a crawl closed for close_reason finished or used up its page/time budget."""
+    return close_reason == 'finished' or close_reason in BUDGET_CLOSE_REASONS
+
+
+def run_crawl(args, url_list_path, extra_settings, extract_content=False):
+    """
+    Runs the crawl (blocking) into url_list_path. Returns its close reason
+    (see run_spider), or None if it failed.
+    """
+    # Scrapy and Twisted are only loaded by commands that crawl
+    from src.run_url_finder import run_spider
+
+    job_dir = crawl_job_dir(args)
+    print("--- Running URL Finder ---")
+    try:
+        # Pass the absolute path to the run_spider function
+        close_reason = run_spider(start_url=args.start_url, output_file_path=url_list_path,
+                                  extract_content=extract_content,
+                                  extract_workers=getattr(args, 'workers', 1),
+                                  incremental=getattr(args, 'incremental', False),
+                                  cache_dir=os.path.abspath(args.cache_dir) if args.cache_dir else None,
+                                  cache_max_bytes=args.cache_max_mb * 1024 * 1024,
+                                  job_dir=job_dir, resume=args.resume,
+                                  extra_settings=extra_settings, # Domain auto-derived
+                                  **crawl_options(args))
+        print(f"--- URL Finder finished. URLs should be in {url_list_path} ---")
+    except Exception as e:
+        print(f"\nError occurred during URL finding: {e}")
+        return None
+    return close_reason
+
+
+class ExtractionRun:
+    """
+    Fetches, extracts and writes pages for the extraction options in
+    `args`: the fetcher, extractor, output writer, incremental manifests
+    and the --job-dir progress log, set up once and shared by every
+    extract_all() call.
+    """
+
+    def __init__(self, args, output_path=None):
+        # trafilatura, lxml and requests are only loaded by commands that extract
+        from src.utils.Fetcher import create_fetcher
+        from src.utils.WebpageExtractor import WebpageExtractor
+
+        self.args = args
+        cache_dir = os.path.abspath(args.cache_dir) if args.cache_dir else None
+        self.cache = ResponseCache(cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024) if cache_dir else None
+        self.gate = ContentGate(max_bytes=int(args.max_body_mb * 1024 * 1024))
+        rate = None
+        if args.adaptive_rate:
+            # Hosts the crawl already measured keep their learned limits
+            RATE_CONTROLLER.configure(max_concurrency=args.max_concurrency,
+                                      initial_concurrency=args.per_host)
+            rate = RATE_CONTROLLER
+        self.fetcher = create_fetcher(
+            args.fetch_engine,
+            headers=WebpageExtractor.DEFAULT_HEADERS,
+            retries=args.retries,
+            max_connections=args.max_connections,
+            per_host=args.per_host,
+            cache=self.cache,
+            gate=self.gate,
+            rate=rate,
+        )
+        profiler = None
+        if args.profile_extract:
+            profiler = SamplingProfiler(os.path.abspath(args.profile_dir), every=args.profile_extract)
+        self.extractor = WebpageExtractor(fetcher=self.fetcher, profiler=profiler,
+                                          fingerprint=args.near_duplicates) # Instantiate from src.utils
+
+        self.manifests = ManifestSet() if args.incremental else None
+        near_duplicates = NearDuplicateIndex(args.near_duplicate_bits) if args.near_duplicates else None
+        self.writer = OutputWriter(create_sink(args.output_format, output_path, shard_size=args.shard_size),
+                                   manifests=self.manifests, near_duplicates=near_duplicates)
+
+        # --- Skip URLs finished by an interrupted run ---
+        self.progress = None
+        if args.job_dir:
+            self.progress = ProgressLog(os.path.join(os.path.abspath(args.job_dir), EXTRACT_PROGRESS_LOG),
+                                        resume=args.resume)
+        self.already_done = 0
+        self.processed = 0
+
+    def _should_extract(self, url, body):
+        domain_name, _ = build_output_filename(url, 0)
+        return not self.manifests[domain_name].body_unchanged(url, body)
+
+    def _pending_urls(self, urls):
+        """Streams URLs to extract, leaving out those already done."""
+        for url in urls:
+            if self.progress is not None and url in self.progress:
+                self.already_done += 1
+                if self.manifests is not None:
+                    # Still part of the site, so it must not be reported as removed
+                    self.manifests[build_output_filename(url, 0)[0]].mark_seen(url)
                 continue
-except Exception as e:
-     print(f"Error reading {full_url_output_path}: {e}")
-     sys.exit(1)
+            yield url
 
-# --- Process the extracted URLs (logic remains the same) ---
-if target_urls:
-    print(f"Processing {len(target_urls)} URLs from {full_url_output_path}...")
-    extractor = WebpageExtractor() # Instantiate from src.utils
+    def extract_all(self, urls):
+        """Extracts and writes every URL as it is read (the list is never held in memory)."""
+        should_extract = self._should_extract if self.manifests is not None else None
+        # extract_many yields results in input order, one per URL
+        results = self.extractor.extract_many(self._pending_urls(urls), workers=self.args.workers,
+                                              should_extract=should_extract)
+        for i, result in enumerate(results):
+            self._write_result(i, result)
 
-    for i, link in enumerate(target_urls):
+    def _write_result(self, i, result):
+        """Writes one extraction result, skipping unchanged pages in incremental mode."""
+        link = result['url']
+        self.processed += 1
         print(f"Processing: {link}")
-        result = extractor.extract(link)
-
-        try:
-            parsed_uri = urlparse(link)
-            domain_name = parsed_uri.netloc if parsed_uri.netloc else "unknown_domain"
-            url_path_basename = os.path.basename(parsed_uri.path)
+        domain_name, output_filename_base = build_output_filename(link, i)
 
-            if not url_path_basename or url_path_basename == '/':
-                filename_base = "index"
+        if self.manifests is None:
+            if not self.writer.write(result, domain_name, output_filename_base):
+                print(f"No content extracted for URL: {link}. Skipping file save.")
+        else:
+            manifest = self.manifests[domain_name]
+            manifest.mark_seen(link)
+            markdown_content = render_markdown(result)
+            if result.get('skipped'):
+                print(f"Unchanged HTML, skipping: {link}")
+            elif markdown_content and manifest.output_unchanged(link, markdown_content):
+                print(f"Unchanged content, not rewriting: {link}")
             else:
-                filename_base, _ = os.path.splitext(url_path_basename)
+                written_to = self.writer.write(result, domain_name, output_filename_base,
+                                               markdown=markdown_content)
+                if written_to:
+                    manifest.record_output(link, written_to, markdown_content)
+
+        if self.progress is not None:
+            self.progress.mark_done(link)
+
+    def close(self, source, close_reason='finished'):
+        """
+        Flushes the output and manifests, releases connections and prints
+        the summary. close_reason is that of the crawl that listed the URLs
+        (see ManifestSet.finish).
+        """
+        self.writer.close()
+        if self.manifests is not None:
+            self.manifests.finish(close_reason)
+
+        self.fetcher.close()
+        if self.cache:
+            self.cache.close()
+        if self.progress is not None:
+            self.progress.close()
+
+        if self.already_done:
+            print(f"Skipped {self.already_done} URLs already extracted by an interrupted run.")
+        if self.gate.skipped:
+            print(f"Skipped non-HTML or oversized responses: {self.gate.summary()}")
+        if self.processed:
+            print(f"--- Content Extraction finished: {self.processed} URLs processed. ---")
+        else:
+            print(f"No valid URLs found or loaded from {source}.")
+
+
+def run(args):
+    """Runs the URL finder, then extracts and saves content for every URL found."""
+    if args.stream and args.single_fetch:
+        print("Error: --stream and --single-fetch are alternatives; choose one.")
+        sys.exit(1)
+
+    sanitized_domain, full_url_output_path = url_list_path_for(args.start_url)
+    output_path = resolve_output_path(args, sanitized_domain)
+    reporters = start_reporters(args.metrics_port, args.stats_file, args.stats_interval,
+                                metrics_host=args.metrics_host)
+
+    # --- Step 1: Run the URL Finder ---
+    settings = crawl_settings(args)
+
+    if args.single_fetch:
+        settings.update({
+            'EXTRACT_PROFILE_EVERY': args.profile_extract,
+            'EXTRACT_PROFILE_DIR': os.path.abspath(args.profile_dir),
+            'OUTPUT_FORMAT': args.output_format,
+            'OUTPUT_PATH': output_path,
+            'OUTPUT_SHARD_SIZE': args.shard_size,
+            'NEAR_DUPLICATES': args.near_duplicates,
+            'NEAR_DUPLICATE_DISTANCE': args.near_duplicate_bits,
+        })
+        # The crawl's item pipeline saves the manifests according to the close reason
+        if not crawl_completed(run_crawl(args, full_url_output_path, settings, extract_content=True)):
+            sys.exit(1)
+        # Pages were already extracted and written by the crawl's item pipeline.
+        finish_reporting(reporters)
+        print("\n--- app.py finished (single-fetch mode) ---")
+        return
+
+    if not args.stream:
+        close_reason = run_crawl(args, full_url_output_path, settings)
+        if not crawl_completed(close_reason):
+            # Interrupted (resume with --job-dir ... --resume) or failed
+            print(f"Crawl did not finish ({close_reason or 'failed'}); not extracting.")
+            sys.exit(1)
+
+        # --- Step 2: Extract Content from Found URLs ---
+        print(f"\n--- Starting Content Extraction from {full_url_output_path} ---")
+
+        # Check if the URL file exists *at the expected absolute path*
+        if not os.path.exists(full_url_output_path):
+            print(f"Error: Output file '{full_url_output_path}' not found.")
+            sys.exit(1)
+
+        extraction = ExtractionRun(args, output_path)
+        print(f"Processing URLs from {full_url_output_path}...")
+        extraction.extract_all(iter_urls(full_url_output_path))
+    else:
+        # --- Step 2 runs alongside Step 1: extract URLs while the crawl finds more ---
+        # Every URL the spider finds goes straight to the extraction (see UrlStreamPipeline)
+        stream = UrlStream(args.stream_buffer)
+        settings['ITEM_PIPELINES'] = {'src.pipelines.UrlStreamPipeline': 300}
+        settings['URL_STREAM'] = stream
+        extraction = ExtractionRun(args, output_path)
+        print(f"--- Extracting URLs as the crawl finds them (buffer of {args.stream_buffer}) ---")
+        urls = stream
+        if args.resume and args.job_dir:
+            # Recover checkpointed URLs into the list before counting it: the crawl's own
+            # recovery would append them after the count, and they would never be extracted
+            from src.run_url_finder import sync_feed_with_found_urls
+            sync_feed_with_found_urls(full_url_output_path, crawl_job_dir(args))
+        if args.resume and os.path.exists(full_url_output_path):
+            # The resumed crawl does not yield again the URLs it found before the interruption
+            found_before = sum(1 for _ in iter_urls(full_url_output_path))
+            urls = itertools.chain(itertools.islice(iter_urls(full_url_output_path), found_before), stream)
+        extraction_error = []
+
+        def consume():
+            try:
+                extraction.extract_all(urls)
+            except BaseException as e:
+                extraction_error.append(e)
+                # Let the crawl finish without waiting on a full stream
+                stream.cancel()
+
+        consumer = threading.Thread(target=consume, name="extract-stream", daemon=True)
+        consumer.start()
+        close_reason = run_crawl(args, full_url_output_path, settings)
+        # Normally closed by the pipeline already; this covers a crawl that failed to start
+        stream.close()
+        consumer.join()
+        if extraction_error:
+            print(f"\nError occurred during extraction: {extraction_error[0]!r}")
+            close_reason = None
+
+    # After an interrupted crawl, pages it never reached would be recorded as removed
+    extraction.close(full_url_output_path, close_reason)
 
-            if not filename_base:
-                 filename_base = f"page_{i+1}"
-            output_filename_base = f"{filename_base}.md"
+    finish_reporting(reporters)
+    if not crawl_completed(close_reason):
+        sys.exit(1)
+    print("\n--- app.py finished ---")
 
-        except Exception as e:
-            print(f"Warning: Error parsing URL '{link}' for filename generation: {e}")
-            domain_name = "parsing_error_domain"
-            output_filename_base = f"error_site_{i+1}.md"
 
-        # write_to_markdown is imported from src.utils
-        # It needs to correctly place files in the project root's output_folder
-        write_to_markdown(result, output_filename_base, domain=domain_name)
+def main(argv=None):
+    """Entry point for `python src/app.py` (same as `python -m src.cli run`)."""
+    run(parse_args(argv))
 
-    print("--- Content Extraction finished. ---")
-else:
-    print(f"No valid URLs found or loaded from {full_url_output_path}.")
 
-print("\n--- app.py finished ---")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
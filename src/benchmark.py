@@ -0,0 +1,372 @@
+# src/benchmark.py
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Setup Project Path ---
+# Get the directory containing the 'src' directory (project root)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add the project root to the Python path
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# --------------------------
+
+# --- Imports relative to project root ---
+try:
+    from src.extensions import DownloadLatencyRecorder
+    from src.run_url_finder import run_spider
+    from src.utils.Fetcher import create_fetcher
+    from src.utils.FileSaver import build_output_filename, write_to_markdown
+    from src.utils.WebpageExtractor import WebpageExtractor
+except ImportError as e:
+    print(f"Error: Could not import required modules: {e}")
+    sys.exit(1)
+# --------------------------------------
+
+WORDS = (
+    "crawler extraction markdown content latency throughput sitemap request response "
+    "parser queue domain page link header encoding document section article summary "
+    "network cache budget worker process thread memory benchmark fixture report"
+).split()
+
+
+class _SiteServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops SYNs under concurrent load, adding 1s retransmit stalls
+    request_queue_size = 256
+
+
+def _serve_site(site, ready):
+    """Child-process entry point: serves the site and reports the bound port."""
+    server = _SiteServer(('127.0.0.1', 0), site._make_handler())
+    ready.send(server.server_address[1])
+    ready.close()
+    server.serve_forever()
+
+
+class SyntheticSite:
+    """
+    Generated website served from 127.0.0.1 for benchmarks.
+
+    Page n lives at /page/<n>.html (the start page is /page/0.html) and
+    links to page n+1 plus `fanout - 1` pseudo-random others, so every page
+    is reachable. Bodies are about `page_kb` KB of article text and are
+    generated deterministically from `seed`. Each response is delayed by
+    `latency_ms` plus up to `jitter_ms` to mimic a remote server.
+    `bytes_sent` and `requests` count what the server delivered.
+
+    The server runs in a child process so it does not compete with the
+    crawler and fetcher for this process's GIL.
+    """
+
+    def __init__(self, pages: int = 200, fanout: int = 5, page_kb: int = 20,
+                 latency_ms: float = 0, jitter_ms: float = 0, seed: int = 0):
+        self.pages = max(1, pages)
+        self.fanout = max(1, fanout)
+        self.page_kb = page_kb
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.seed = seed
+        self._bytes_sent = multiprocessing.Value('Q', 0)
+        self._requests = multiprocessing.Value('Q', 0)
+        self._process = None
+
+    @property
+    def bytes_sent(self) -> int:
+        return self._bytes_sent.value
+
+    @property
+    def requests(self) -> int:
+        return self._requests.value
+
+    def render(self, n: int) -> bytes:
+        rng = random.Random(self.seed * 1_000_003 + n)
+        targets = [(n + 1) % self.pages]
+        targets += [rng.randrange(self.pages) for _ in range(self.fanout - 1)]
+        links = ''.join(f'<li><a href="/page/{t}.html">Page {t}</a></li>' for t in targets)
+
+        paragraphs = []
+        size = 0
+        while size < self.page_kb * 1024:
+            paragraph = '<p>' + ' '.join(rng.choice(WORDS) for _ in range(80)) + '.</p>'
+            paragraphs.append(paragraph)
+            size += len(paragraph)
+        return (
+            '<!DOCTYPE html><html><head><meta charset="utf-8">'
+            f'<title>Page {n}</title></head><body>'
+            f'<nav><ul>{links}</ul></nav>'
+            f'<article><h1>Page {n}</h1>{"".join(paragraphs)}</article>'
+            '<footer><p>Synthetic benchmark site</p></footer></body></html>'
+        ).encode('utf-8')
+
+    def _page_number(self, path: str):
+        if path in ('/', '/index.html'):
+            return 0
+        if path.startswith('/page/') and path.endswith('.html'):
+            try:
+                n = int(path[len('/page/'):-len('.html')])
+            except ValueError:
+                return None
+            return n if 0 <= n < self.pages else None
+        return None
+
+    def _make_handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                delay = site.latency_ms + random.uniform(0, site.jitter_ms)
+                if delay:
+                    time.sleep(delay / 1000)
+                n = site._page_number(self.path.split('?', 1)[0])
+                if n is None:
+                    body, status = b'Not found', 404
+                else:
+                    body, status = site.render(n), 200
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with site._bytes_sent.get_lock():
+                    site._bytes_sent.value += len(body)
+                with site._requests.get_lock():
+                    site._requests.value += 1
+
+            def log_message(self, format, *args):
+                pass # Keep benchmark output clean
+
+        return Handler
+
+    def start(self) -> str:
+        """Starts serving on a free port and returns the start page URL."""
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        self._process = multiprocessing.Process(target=_serve_site, args=(self, sender), daemon=True)
+        self._process.start()
+        sender.close()
+        port = receiver.recv()
+        receiver.close()
+        return f"http://127.0.0.1:{port}/page/0.html"
+
+    def stop(self):
+        if self._process:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+
+def percentile(samples, pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, round(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize_latency(samples) -> dict:
+    """p50/p99/mean of latency samples in seconds, reported in milliseconds."""
+    return {
+        'count': len(samples),
+        'p50_ms': round(percentile(samples, 50) * 1000, 3),
+        'p99_ms': round(percentile(samples, 99) * 1000, 3),
+        'mean_ms': round(sum(samples) / len(samples) * 1000, 3) if samples else 0.0,
+    }
+
+
+def peak_rss_mb() -> dict:
+    """Peak resident set size so far, for this process and its reaped children."""
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return {
+        'self': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        'children': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def _stage_report(pages: int, seconds: float, samples, **extra) -> dict:
+    report = {
+        'pages': pages,
+        'seconds': round(seconds, 3),
+        'pages_per_sec': round(pages / seconds, 2) if seconds else 0.0,
+        'latency': summarize_latency(samples),
+    }
+    report.update(extra)
+    report['peak_rss_mb'] = peak_rss_mb()
+    return report
+
+
+def run_benchmark(args) -> dict:
+    """
+    Runs crawl -> fetch -> extract -> write against a SyntheticSite and
+    returns the report: per-stage pages/sec, p50/p99 latency, bytes and
+    peak RSS, plus end-to-end totals.
+
+    Stages run one after another so each is measured in isolation:
+        crawl    run_spider() over the whole site (latency = download latency)
+        fetch    the extraction fetcher over the crawled URL list
+        extract  WebpageExtractor.extract_from_html, in this process
+        write    write_to_markdown into a temporary output folder
+    """
+    site = SyntheticSite(pages=args.pages, fanout=args.fanout, page_kb=args.page_kb,
+                         latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, seed=args.seed)
+    work_dir = tempfile.mkdtemp(prefix='site-scraper-bench-')
+    url_list_path = os.path.join(work_dir, 'urls.jsonl')
+    output_dir = os.path.join(work_dir, 'output')
+    report = {'config': vars(args), 'stages': {}}
+    started = time.perf_counter()
+
+    start_url = site.start()
+    try:
+        # --- Crawl ---
+        DownloadLatencyRecorder.samples.clear()
+        bytes_before = site.bytes_sent
+        t0 = time.perf_counter()
+        run_spider(start_url, url_list_path, extra_settings={
+            'LOG_LEVEL': 'WARNING',
+            'CONCURRENT_REQUESTS': args.concurrency,
+            'CONCURRENT_REQUESTS_PER_DOMAIN': args.concurrency_per_domain,
+            'DOWNLOAD_DELAY': args.download_delay,
+            'AUTOTHROTTLE_ENABLED': args.autothrottle,
+            'AUTOTHROTTLE_TARGET_CONCURRENCY': args.autothrottle_target,
+            'EXTENSIONS': {
+                'src.extensions.MetricsExtension': 500,
+                'src.extensions.DownloadLatencyRecorder': 500,
+                'src.extensions.ContentGateExtension': 510,
+            },
+            'PRIORITY_USE_HISTORY': False,
+        })
+        crawl_seconds = time.perf_counter() - t0
+        with open(url_list_path, 'r', encoding='utf-8') as f:
+            urls = [json.loads(line)['url'] for line in f if line.strip()]
+        report['stages']['crawl'] = _stage_report(
+            len(urls), crawl_seconds, DownloadLatencyRecorder.samples,
+            bytes=site.bytes_sent - bytes_before)
+
+        # --- Fetch ---
+        fetcher = create_fetcher(args.fetch_engine, headers=WebpageExtractor.DEFAULT_HEADERS,
+                                 max_connections=args.max_connections, per_host=args.per_host)
+        fetch_samples = []
+        attempt = fetcher._attempt
+
+        def timed_attempt(url):
+            t = time.perf_counter()
+            try:
+                return attempt(url)
+            finally:
+                fetch_samples.append(time.perf_counter() - t)
+
+        fetcher._attempt = timed_attempt # Both engines fetch through _attempt
+        bytes_before = site.bytes_sent
+        t0 = time.perf_counter()
+        pages = [(url, page) for url, page in fetcher.fetch_many(urls) if page is not None]
+        fetch_seconds = time.perf_counter() - t0
+        fetcher.close()
+        report['stages']['fetch'] = _stage_report(
+            len(pages), fetch_seconds, fetch_samples, bytes=site.bytes_sent - bytes_before)
+
+        # --- Extract ---
+        extractor = WebpageExtractor()
+        extract_samples = []
+        results = []
+        t0 = time.perf_counter()
+        for url, page in pages:
+            t = time.perf_counter()
+            results.append(extractor.extract_from_html(url, page.body, encoding=page.encoding))
+            extract_samples.append(time.perf_counter() - t)
+        extract_seconds = time.perf_counter() - t0
+        report['stages']['extract'] = _stage_report(len(results), extract_seconds, extract_samples)
+
+        # --- Write ---
+        write_samples = []
+        bytes_written = 0
+        t0 = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for i, result in enumerate(results):
+                domain_name, filename = build_output_filename(result['url'], i)
+                t = time.perf_counter()
+                output_path = write_to_markdown(result, filename, domain=domain_name,
+                                                base_dir=output_dir)
+                write_samples.append(time.perf_counter() - t)
+                if output_path:
+                    bytes_written += os.path.getsize(output_path)
+        write_seconds = time.perf_counter() - t0
+        report['stages']['write'] = _stage_report(len(write_samples), write_seconds,
+                                                  write_samples, bytes=bytes_written)
+    finally:
+        site.stop()
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    total_seconds = time.perf_counter() - started
+    report['total'] = {
+        'pages': len(urls),
+        'seconds': round(total_seconds, 3),
+        'pages_per_sec': round(len(urls) / total_seconds, 2) if total_seconds else 0.0,
+        'bytes_transferred': site.bytes_sent,
+        'requests_served': site.requests,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    if args.keep:
+        report['work_dir'] = work_dir
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark crawl, fetch, extraction and Markdown writing against a local synthetic site.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    site = parser.add_argument_group("synthetic site")
+    site.add_argument("--pages", type=int, default=200, help="Number of pages on the site.")
+    site.add_argument("--fanout", type=int, default=5, help="Links per page.")
+    site.add_argument("--page-kb", type=int, default=20, help="Approximate article size per page.")
+    site.add_argument("--latency-ms", type=float, default=0, help="Fixed delay added to every response.")
+    site.add_argument("--jitter-ms", type=float, default=0, help="Extra random delay, 0..jitter.")
+    site.add_argument("--seed", type=int, default=0, help="Seed for page content and links.")
+
+    crawl = parser.add_argument_group("crawl (Scrapy settings)")
+    crawl.add_argument("--concurrency", type=int, default=8, help="CONCURRENT_REQUESTS.")
+    crawl.add_argument("--concurrency-per-domain", type=int, default=4,
+                       help="CONCURRENT_REQUESTS_PER_DOMAIN.")
+    crawl.add_argument("--download-delay", type=float, default=0,
+                       help="DOWNLOAD_DELAY (production crawls use 0.5).")
+    crawl.add_argument("--autothrottle", action="store_true", help="Enable AUTOTHROTTLE_ENABLED.")
+    crawl.add_argument("--autothrottle-target", type=float, default=1.0,
+                       help="AUTOTHROTTLE_TARGET_CONCURRENCY.")
+
+    extract = parser.add_argument_group("extraction fetcher")
+    extract.add_argument("--fetch-engine", choices=["session", "async"], default="session")
+    extract.add_argument("--max-connections", type=int, default=16)
+    extract.add_argument("--per-host", type=int, default=4, help="Async engine only.")
+
+    parser.add_argument("-o", "--output", default=None,
+                        help="Write the JSON report here as well as to stdout.")
+    parser.add_argument("--keep", action="store_true",
+                        help="Keep the temporary URL list and Markdown output.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_benchmark(args)
+    report_json = json.dumps(report, indent=2)
+    print(report_json)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report_json + '\n')
+
+
+if __name__ == "__main__":
+    main()
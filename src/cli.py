@@ -0,0 +1,146 @@
+# src/cli.py
+"""
+Command-line interface with one subcommand per job:
+
+    python -m src.cli crawl https://example.com     # list the site's URLs
+    python -m src.cli extract url_lists/example_com_urls.jsonl
+    python -m src.cli run https://example.com       # crawl, then extract (same as app.py)
+    python -m src.cli stats stats.json              # summarize a --stats-file snapshot
+
+Scrapy and Twisted are imported only when a command crawls, and
+trafilatura, lxml and requests only when it extracts, so `stats`, `--help`
+and re-extractions start quickly and this module imports without side
+effects.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+# --- Setup Project Path ---
+# Needed when this file is run directly, so 'src' imports resolve
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# --------------------------
+
+from src.app import (ExtractionRun, add_common_arguments, add_crawl_arguments, add_extract_arguments,
+                     add_output_arguments, add_run_arguments, crawl_completed, crawl_settings,
+                     finish_reporting, iter_urls, resolve_output_path, run, run_crawl,
+                     sanitize_filename, url_list_path_for)
+from src.utils.Metrics import format_series_summary, format_stage_summary, start_reporters
+
+
+def crawl_command(args):
+    """Crawls a site and writes its URL list."""
+    _, url_list_path = url_list_path_for(args.start_url)
+    if args.output:
+        url_list_path = os.path.abspath(args.output)
+    reporters = start_reporters(args.metrics_port, args.stats_file, args.stats_interval,
+                                metrics_host=args.metrics_host)
+    close_reason = run_crawl(args, url_list_path, crawl_settings(args))
+    finish_reporting(reporters)
+    return 0 if crawl_completed(close_reason) else 1
+
+
+def extract_command(args):
+    """Extracts and writes every URL of an existing URL list."""
+    url_list_path = os.path.abspath(args.url_list)
+    if not os.path.exists(url_list_path):
+        print(f"Error: URL list '{url_list_path}' not found.")
+        return 1
+    # url_lists/example_com_urls.jsonl -> output_folder/example_com.<format>
+    list_name = os.path.basename(url_list_path).split('.', 1)[0]
+    output_path = resolve_output_path(args, sanitize_filename(list_name.removesuffix('_urls')))
+    reporters = start_reporters(args.metrics_port, args.stats_file, args.stats_interval,
+                                metrics_host=args.metrics_host)
+
+    print(f"--- Starting Content Extraction from {url_list_path} ---")
+    extraction = ExtractionRun(args, output_path)
+    extraction.extract_all(iter_urls(url_list_path))
+    extraction.close(url_list_path)
+    finish_reporting(reporters)
+    return 0
+
+
+def run_command(args):
+    """Crawls a site, then extracts every URL found."""
+    run(args)
+    return 0
+
+
+def stats_command(args):
+    """Prints the stage timings, counters and gauges of a --stats-file snapshot."""
+    try:
+        with open(args.stats_file, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Error: Could not read stats file {args.stats_file}: {e}")
+        return 1
+    taken = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(snapshot.get('time', 0)))
+    print(f"Snapshot of {args.stats_file} taken {taken}")
+    print("\nStage timings:")
+    print(format_stage_summary(snapshot=snapshot) or "  (none)")
+    print("\nCounters:")
+    print(format_series_summary(snapshot, 'counters') or "  (none)")
+    if args.gauges:
+        print("\nGauges:")
+        print(format_series_summary(snapshot, 'gauges') or "  (none)")
+    return 0
+
+
+def build_parser():
+    """The command-line parser with the crawl, extract, run and stats subcommands."""
+    parser = argparse.ArgumentParser(
+        prog="python -m src.cli",
+        description="Crawl sites, extract main content and publish Markdown."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    crawl = commands.add_parser(
+        "crawl", help="Discover a site's URLs into a JSON Lines URL list.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    crawl.add_argument("start_url", help="The full starting URL (e.g., 'https://www.example.com')")
+    crawl.add_argument("-o", "--output", default=None,
+                       help="URL list to write (default: url_lists/<domain>_urls.jsonl).")
+    add_crawl_arguments(crawl)
+    add_common_arguments(crawl)
+    crawl.set_defaults(handler=crawl_command)
+
+    extract = commands.add_parser(
+        "extract", help="Fetch, extract and write the pages of an existing URL list.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    extract.add_argument("url_list", help="JSON Lines URL list, e.g. from the crawl command.")
+    add_extract_arguments(extract)
+    add_common_arguments(extract)
+    add_output_arguments(extract)
+    extract.set_defaults(handler=extract_command)
+
+    run_parser = commands.add_parser(
+        "run", help="Crawl a site, then extract every URL found (same as app.py).",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    add_run_arguments(run_parser)
+    add_crawl_arguments(run_parser)
+    add_extract_arguments(run_parser)
+    add_common_arguments(run_parser)
+    add_output_arguments(run_parser)
+    run_parser.set_defaults(handler=run_command)
+
+    stats = commands.add_parser(
+        "stats", help="Summarize a metrics snapshot written with --stats-file.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    stats.add_argument("stats_file", help="JSON snapshot written by --stats-file.")
+    stats.add_argument("--gauges", action="store_true",
+                       help="Also print the gauges (queue depths, per-host rate limits).")
+    stats.set_defaults(handler=stats_command)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+# src/distributed.py
+import argparse
+import logging
+import os
+import socket
+import sys
+import time
+from urllib.parse import urlparse
+
+# --- Setup Project Path ---
+# Get the directory containing the 'src' directory (project root)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add the project root to the Python path
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# --------------------------
+
+# --- Imports relative to project root ---
+try:
+    from src.app import (add_crawl_arguments, crawl_options, crawl_settings, finish_reporting,
+                         sanitize_filename, URL_LIST_DIR_ABS)
+    from src.run_url_finder import run_spider
+    from src.utils.ContentGate import ContentGate, DEFAULT_MAX_BODY_BYTES
+    from src.utils.Fetcher import create_fetcher
+    from src.utils.Metrics import start_reporters, DEFAULT_METRICS_HOST
+    from src.utils.RateControl import RATE_CONTROLLER, DEFAULT_MAX_CONCURRENCY
+    from src.utils.OutputWriter import (OutputWriter, MarkdownTreeSink, check_output_format,
+                                        create_sink, default_output_path, iter_output_records,
+                                        OUTPUT_FORMATS, DEFAULT_SHARD_SIZE)
+    from src.utils.ResponseCache import ResponseCache
+    from src.utils.WebpageExtractor import WebpageExtractor
+    from src.utils.WorkQueue import open_work_queue, DEFAULT_LEASE_SECONDS, DEFAULT_MAX_ATTEMPTS
+except ImportError as e:
+    print(f"Error: Could not import required modules: {e}")
+    sys.exit(1)
+# --------------------------------------
+
+# URLs claimed from the queue at a time, and marked done together once written
+DEFAULT_CLAIM_BATCH = 64
+
+
+def format_counts(counts):
+    return ", ".join(f"{state}: {count}" for state, count in counts.items())
+
+
+def run_coordinator(args):
+    """Crawls the site, feeding every found URL to the shared queue, then optionally waits for the workers."""
+    work_queue = open_work_queue(args.queue, args.job)
+    if args.reset:
+        work_queue.reset()
+        print(f"Cleared job '{args.job}' at {args.queue}.")
+
+    domain_part = sanitize_filename(urlparse(args.start_url).netloc or "unknown_url")
+    url_list_path = os.path.join(URL_LIST_DIR_ABS, f"{domain_part}_urls.jsonl")
+    run_spider(start_url=args.start_url, output_file_path=url_list_path,
+               cache_dir=os.path.abspath(args.cache_dir) if args.cache_dir else None,
+               **crawl_options(args),
+               extra_settings={
+                   **crawl_settings(args),
+                   'ITEM_PIPELINES': {'src.pipelines.WorkQueuePipeline': 300},
+                   'WORK_QUEUE': args.queue,
+                   'WORK_QUEUE_NAME': args.job,
+               })
+    work_queue.mark_crawl_done()
+    print(f"Crawl finished. Job '{args.job}': {format_counts(work_queue.counts())}")
+
+    if args.wait:
+        while not work_queue.finished():
+            time.sleep(args.status_interval)
+            print(f"Job '{args.job}': {format_counts(work_queue.counts())}")
+        print(f"All URLs of job '{args.job}' processed.")
+    work_queue.close()
+
+
+def run_worker(args):
+    """Pulls URLs from the shared queue, extracts them and writes the output until the job is finished."""
+    try:
+        check_output_format(args.output_format)
+    except ImportError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    work_queue = open_work_queue(args.queue, args.job, lease_seconds=args.lease,
+                                 max_attempts=args.max_attempts)
+    worker_id = args.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    output_path = None
+    if args.output_format != "markdown":
+        # One file per worker, so nodes never append to the same file
+        output_path = os.path.abspath(args.output_path or default_output_path(
+            args.output_format, f"{sanitize_filename(args.job)}-{sanitize_filename(worker_id)}"))
+
+    reporters = start_reporters(args.metrics_port, args.stats_file, args.stats_interval,
+                                metrics_host=args.metrics_host)
+    cache = ResponseCache(os.path.abspath(args.cache_dir)) if args.cache_dir else None
+    gate = ContentGate(max_bytes=int(args.max_body_mb * 1024 * 1024))
+    rate = None
+    if args.adaptive_rate:
+        # No crawl runs here to set up logging for the controller's decisions
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(levelname)s: %(message)s")
+        RATE_CONTROLLER.configure(max_concurrency=args.max_concurrency, initial_concurrency=args.per_host)
+        rate = RATE_CONTROLLER
+    fetcher = create_fetcher(
+        args.fetch_engine,
+        headers=WebpageExtractor.DEFAULT_HEADERS,
+        retries=args.retries,
+        max_connections=args.max_connections,
+        per_host=args.per_host,
+        cache=cache,
+        gate=gate,
+        rate=rate,
+    )
+    extractor = WebpageExtractor(fetcher=fetcher)
+    writer = OutputWriter(create_sink(args.output_format, output_path, shard_size=args.shard_size),
+                          shared_claims=work_queue.path_claims())
+
+    def claimed_urls(first_batch):
+        """
+        Streams URLs claimed from the queue until it runs dry. The fetcher
+        reads ahead, so waiting here would stall pages already in flight.
+        """
+        urls = first_batch
+        while urls:
+            yield from urls
+            urls = work_queue.claim(worker_id, args.batch_size)
+
+    print(f"Worker {worker_id} pulling from job '{args.job}' at {args.queue}")
+    processed = failed_count = 0
+    finished = []
+    failed = []
+
+    def report():
+        # Only report URLs done once their output is on disk
+        writer.sync()
+        work_queue.complete(worker_id, finished)
+        work_queue.fail(worker_id, failed)
+        finished.clear()
+        failed.clear()
+
+    while True:
+        urls = work_queue.claim(worker_id, args.batch_size)
+        if not urls:
+            if work_queue.finished():
+                break
+            # The crawl is still finding URLs
+            time.sleep(args.poll_interval)
+            continue
+        for result in extractor.extract_many(claimed_urls(urls), workers=args.workers):
+            processed += 1
+            if writer.write(result):
+                finished.append(result['url'])
+            else:
+                # Fetch or extraction failed: back to the queue until --max-attempts
+                failed.append(result['url'])
+                failed_count += 1
+            if len(finished) + len(failed) >= args.batch_size:
+                report()
+        report()
+    writer.close()
+    retried = f" ({failed_count} failed, retried up to --max-attempts times)" if failed_count else ""
+    print(f"Worker {worker_id} processed {processed} URLs{retried}. Job '{args.job}': "
+          f"{format_counts(work_queue.counts())}")
+    if gate.skipped:
+        print(f"Skipped non-HTML or oversized responses: {gate.summary()}")
+
+    work_queue.close()
+    fetcher.close()
+    if cache:
+        cache.close()
+    finish_reporting(reporters)
+
+
+def run_status(args):
+    work_queue = open_work_queue(args.queue, args.job)
+    state = "finished" if work_queue.finished() else ("draining" if work_queue.crawl_done() else "crawling")
+    print(f"Job '{args.job}' ({state}): {format_counts(work_queue.counts())}")
+    work_queue.close()
+
+
+def run_merge(args):
+    """Merges workers' bulk output files into one Markdown tree."""
+    writer = OutputWriter(MarkdownTreeSink(os.path.abspath(args.output_dir) if args.output_dir else None))
+    for path in args.files:
+        for record in iter_output_records(path):
+            if record.aliases:
+                writer.add_aliases(record.url, record.domain, record.relpath, record.aliases)
+                continue
+            writer.write({'url': record.url, 'title': record.title},
+                         record.domain, record.relpath, markdown=record.markdown)
+    writer.close()
+
+
+def add_rate_arguments(parser):
+    parser.add_argument("--adaptive-rate", action="store_true",
+                        help="Adapt each host's concurrency and delay to its latency and errors (AIMD).")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="With --adaptive-rate: most concurrent requests allowed to one host.")
+
+
+def add_queue_arguments(parser):
+    parser.add_argument(
+        "--queue",
+        required=True,
+        help="Shared work queue: 'redis://host:6379/0' for nodes on several machines, or a "
+             "SQLite file ('sqlite:///queue.db' or a path) for processes on one machine."
+    )
+    parser.add_argument(
+        "--job",
+        default="default",
+        help="Job name; coordinator and workers of one crawl must use the same name."
+    )
+
+
+def parse_args(argv=None):
+    """Parses command-line options for the coordinator, worker, status and merge commands."""
+    parser = argparse.ArgumentParser(
+        description="Distributed crawl + extraction: one coordinator crawls and queues URLs, "
+                    "workers on any number of nodes extract them.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    coordinator = commands.add_parser(
+        "coordinator", help="Crawl a site and queue every URL found.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    coordinator.add_argument("start_url", help="The full starting URL.")
+    add_queue_arguments(coordinator)
+    coordinator.add_argument("--reset", action="store_true",
+                             help="Forget the job's queued and seen URLs before crawling.")
+    add_crawl_arguments(coordinator)
+    coordinator.add_argument("--max-body-mb", type=float, default=DEFAULT_MAX_BODY_BYTES / (1024 * 1024),
+                             help="Abandon page downloads larger than this. 0 = no size limit.")
+    add_rate_arguments(coordinator)
+    coordinator.add_argument("--cache-dir", default=None,
+                             help="Directory for the persistent HTTP response cache.")
+    coordinator.add_argument("--wait", action="store_true",
+                             help="After the crawl, wait until workers have processed every URL.")
+    coordinator.add_argument("--status-interval", type=float, default=10,
+                             help="Seconds between progress lines with --wait.")
+
+    worker = commands.add_parser(
+        "worker", help="Extract queued URLs until the job is finished.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    add_queue_arguments(worker)
+    worker.add_argument("--worker-id", default=None,
+                        help="Name for this worker (default: <hostname>-<pid>).")
+    worker.add_argument("-w", "--workers", type=int, default=1,
+                        help="Extraction processes on this node.")
+    worker.add_argument("--batch-size", type=int, default=DEFAULT_CLAIM_BATCH,
+                        help="URLs claimed from the queue at a time.")
+    worker.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS,
+                        help="Seconds before URLs claimed by a worker that stopped responding "
+                             "are handed to another one.")
+    worker.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS,
+                        help="Claims per URL before it is marked failed; a failed fetch or "
+                             "extraction returns the URL to the queue until then.")
+    worker.add_argument("--poll-interval", type=float, default=2,
+                        help="Seconds to wait for new URLs while the crawl is running.")
+    worker.add_argument("--fetch-engine", choices=["session", "async"], default="session",
+                        help="Fetch backend for extraction: pooled requests.Session, or the same session "
+                             "scheduled by asyncio with per-host limits (requests runs in a thread pool).")
+    worker.add_argument("--max-connections", type=int, default=16,
+                        help="Global cap on concurrent connections.")
+    worker.add_argument("--per-host", type=int, default=4,
+                        help="Maximum concurrent requests per host (async engine only).")
+    worker.add_argument("--retries", type=int, default=2,
+                        help="Retries for connection errors, timeouts and 429/5xx responses.")
+    worker.add_argument("--max-body-mb", type=float, default=DEFAULT_MAX_BODY_BYTES / (1024 * 1024),
+                        help="Abandon page downloads larger than this. 0 = no size limit.")
+    add_rate_arguments(worker)
+    worker.add_argument("--cache-dir", default=None,
+                        help="Directory for the persistent HTTP response cache.")
+    worker.add_argument("--output-format", choices=OUTPUT_FORMATS, default="markdown",
+                        help="'markdown' writes into the output tree (share output_folder between "
+                             "nodes); bulk formats write one file per worker, combined with 'merge'.")
+    worker.add_argument("--output-path", default=None,
+                        help="File for the bulk output formats (default: "
+                             "output_folder/<job>-<worker id>.<format>).")
+    worker.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE,
+                        help="Pages per tar/zip shard.")
+    worker.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve live Prometheus metrics on this port at /metrics.")
+    worker.add_argument("--metrics-host", default=DEFAULT_METRICS_HOST,
+                        help="Address for --metrics-port to listen on (0.0.0.0 exposes it to other hosts).")
+    worker.add_argument("--stats-file", default=None,
+                        help="Periodically write a JSON metrics snapshot to this file.")
+    worker.add_argument("--stats-interval", type=float, default=10,
+                        help="Seconds between --stats-file updates.")
+
+    status = commands.add_parser("status", help="Print the job's URL counts.")
+    add_queue_arguments(status)
+
+    merge = commands.add_parser(
+        "merge", help="Merge workers' bulk output files into the Markdown output tree.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    merge.add_argument("files", nargs="+", help="JSONL (.jsonl, .jsonl.gz, .jsonl.zst), .tar or .zip files.")
+    merge.add_argument("--output-dir", default=None,
+                       help="Root of the Markdown tree (default: the project's output_folder).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    {'coordinator': run_coordinator, 'worker': run_worker,
+     'status': run_status, 'merge': run_merge}[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
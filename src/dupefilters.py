@@ -0,0 +1,57 @@
+# src/dupefilters.py
+from pathlib import Path
+
+from scrapy.dupefilters import RFPDupeFilter
+from scrapy.utils.job import job_dir
+
+from src.utils.SeenSet import create_seen_set
+
+
+class FlushingDupeFilter(RFPDupeFilter):
+    """
+    RFPDupeFilter that flushes each new fingerprint to JOBDIR/requests.seen.
+
+    The stock filter buffers writes until the crawl closes cleanly, so a
+    crash loses the tail of the seen-set and resumed crawls re-request
+    those pages. Flushing per fingerprint keeps the file current.
+    """
+
+    def request_seen(self, request):
+        seen = super().request_seen(request)
+        if not seen and self.file:
+            self.file.flush()
+        return seen
+
+
+class CompactDupeFilter(FlushingDupeFilter):
+    """
+    Dupefilter that keeps request fingerprints in a compact seen-set
+    (see src.utils.SeenSet) instead of a set of 40-character hex strings.
+
+    Settings:
+        SEEN_SET_KIND: 'hashed' or 'bloom' ('set' keeps the stock behaviour).
+        SEEN_SET_CAPACITY: Expected number of requests.
+        SEEN_SET_ERROR_RATE: False-positive rate for 'bloom'.
+    """
+
+    def __init__(self, path=None, debug=False, *, fingerprinter=None,
+                 kind='hashed', capacity=1_000_000, error_rate=0.001):
+        # Load the job directory's seen file into the compact set ourselves,
+        # rather than letting RFPDupeFilter build a full set of strings first.
+        super().__init__(None, debug, fingerprinter=fingerprinter)
+        self.fingerprints = create_seen_set(kind, capacity=capacity, error_rate=error_rate)
+        if path:
+            self.file = Path(path, "requests.seen").open("a+", encoding="utf-8")
+            self.file.seek(0)
+            self.fingerprints.update(x.rstrip() for x in self.file)
+
+    @classmethod
+    def _from_settings(cls, settings, *, fingerprinter=None):
+        return cls(
+            job_dir(settings),
+            settings.getbool("DUPEFILTER_DEBUG"),
+            fingerprinter=fingerprinter,
+            kind=settings.get("SEEN_SET_KIND", "hashed"),
+            capacity=settings.getint("SEEN_SET_CAPACITY", 1_000_000),
+            error_rate=settings.getfloat("SEEN_SET_ERROR_RATE", 0.001),
+        )
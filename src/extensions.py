@@ -0,0 +1,133 @@
+# src/extensions.py
+from scrapy import signals
+from scrapy.exceptions import StopDownload
+from twisted.internet import task
+
+from src.utils.ContentGate import ContentGate
+from src.utils.Metrics import METRICS
+
+
+class DownloadLatencyRecorder:
+    """
+    Records each response's download latency (seconds) in `samples`.
+
+    Enabled through the EXTENSIONS setting by the benchmark, which reads
+    the class-level list after run_spider() returns in the same process.
+    """
+
+    samples = []
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        extension = cls()
+        crawler.signals.connect(extension.response_received, signal=signals.response_received)
+        return extension
+
+    def response_received(self, response, request, spider):
+        latency = request.meta.get('download_latency')
+        if latency is not None:
+            self.samples.append(latency)
+
+
+class MetricsExtension:
+    """
+    Feeds the crawl into the shared metrics registry (src.utils.Metrics):
+    download latency, status codes and bytes per response, plus the
+    scheduler and in-flight queue depths and retry count, sampled every
+    METRICS_SAMPLE_INTERVAL seconds.
+    """
+
+    def __init__(self, crawler, interval=1.0):
+        self.crawler = crawler
+        self.interval = interval
+        self.retries_reported = 0
+        self._sampler = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        extension = cls(crawler, crawler.settings.getfloat('METRICS_SAMPLE_INTERVAL', 1.0))
+        crawler.signals.connect(extension.response_received, signal=signals.response_received)
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        return extension
+
+    def response_received(self, response, request, spider):
+        latency = request.meta.get('download_latency')
+        if latency is not None:
+            METRICS.observe('stage_seconds', latency, stage='crawl_download')
+        METRICS.inc('http_responses_total', stage='crawl', status=response.status)
+        METRICS.inc('bytes_total', len(response.body), stage='crawl')
+
+    def spider_opened(self, spider):
+        self._sampler = task.LoopingCall(self.sample)
+        self._sampler.start(self.interval, now=False)
+
+    def sample(self):
+        engine = self.crawler.engine
+        if engine is None or engine.slot is None:
+            return
+        METRICS.set_gauge('queue_depth', len(engine.slot.scheduler), queue='crawl_scheduler')
+        METRICS.set_gauge('queue_depth', len(engine.downloader.active), queue='crawl_inflight')
+        retries = self.crawler.stats.get_value('retry/count', 0)
+        if retries > self.retries_reported:
+            METRICS.inc('retries_total', retries - self.retries_reported, stage='crawl')
+            self.retries_reported = retries
+
+    def spider_closed(self, spider):
+        if self._sampler and self._sampler.running:
+            self._sampler.stop()
+        self.sample()
+
+
+class ContentGateExtension:
+    """
+    Stops page downloads that are not worth extracting (see ContentGate):
+    as soon as the headers arrive if the Content-Type is not HTML or the
+    Content-Length is above CONTENT_GATE_MAX_BYTES, or mid-transfer once
+    the streamed body passes it. The connection is dropped, so the rest of
+    the body is never downloaded; the spider receives the response flagged
+    'download_stopped' and ignores it.
+
+    Only page requests (handled by spider.parse) are gated; robots.txt and
+    sitemaps are not. Skips are counted in the crawl stats as
+    content_gate/skipped/<reason>.
+    """
+
+    def __init__(self, crawler, gate):
+        self.crawler = crawler
+        self.gate = gate
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        extension = cls(crawler, ContentGate.from_settings(crawler.settings, stage='crawl'))
+        crawler.signals.connect(extension.headers_received, signal=signals.headers_received)
+        crawler.signals.connect(extension.bytes_received, signal=signals.bytes_received)
+        return extension
+
+    @staticmethod
+    def _gated(request, spider):
+        return request.callback is None or request.callback == getattr(spider, 'parse', None)
+
+    def _stop(self, request, reason):
+        request.meta['content_gate_skipped'] = reason
+        self.crawler.stats.inc_value(f'content_gate/skipped/{reason}')
+        raise StopDownload(fail=False)
+
+    def headers_received(self, headers, body_length, request, spider):
+        if not self._gated(request, spider):
+            return
+        content_type = headers.get(b'Content-Type')
+        reason = self.gate.check_headers(
+            content_type.decode('latin-1') if content_type else None,
+            body_length if isinstance(body_length, int) and body_length >= 0 else None)
+        if reason:
+            self._stop(request, reason)
+
+    def bytes_received(self, data, request, spider):
+        if not self.gate.max_bytes or not self._gated(request, spider):
+            return
+        received = request.meta.get('content_gate_bytes', 0) + len(data)
+        request.meta['content_gate_bytes'] = received
+        reason = self.gate.check_size(received)
+        if reason:
+            self._stop(request, reason)
@@ -1,22 +1,161 @@
 # find_urls.py
 
+import logging
+import os
 import scrapy
 from urllib.parse import urlparse
 
+from src.utils.ContentGate import ContentGate
+from src.utils.CrawlPriority import PriorityScorer
+from src.utils.SeenSet import create_seen_set
+from src.utils.Sitemap import iter_robots_sitemaps, iter_sitemap_entries
+from src.utils.UrlFilter import UrlFilter, canonical_key, clean_url
+
+# File in the job directory that records every URL yielded so far
+FOUND_URLS_LOG = "found_urls.log"
+
+# Sitemaps are fetched ahead of pages (far above any PriorityScorer score)
+# so discovery finishes early
+SITEMAP_REQUEST_PRIORITY = 10_000
+
 class UrlFinderSpider(scrapy.Spider):
     name = 'url_finder'
 
-    def __init__(self, start_url=None, domain=None, *args, **kwargs):
+    def __init__(self, start_url=None, domain=None, extract_content=False, job_dir=None,
+                 seen_set='set', seen_set_capacity=1_000_000, seen_set_error_rate=0.001,
+                 sitemap=False, follow_links=True, *args, **kwargs):
         if not start_url or not domain:
             raise ValueError("Both 'start_url' and 'domain' arguments are required.")
         self.start_urls = [start_url]
         self.allowed_domains = [domain]
-        self.found_urls = set()
+        # 'hashed' or 'bloom' keep memory flat on very large sites (see src.utils.SeenSet)
+        self.seen_set_options = {
+            'seen_set': seen_set,
+            'seen_set_capacity': int(seen_set_capacity),
+            'seen_set_error_rate': float(seen_set_error_rate),
+        }
+        # Canonical keys of every URL scheduled or found; shared with the URL
+        # filter, which drops links to them as duplicates.
+        self.seen_urls = create_seen_set(seen_set, capacity=int(seen_set_capacity),
+                                         error_rate=float(seen_set_error_rate))
+        # With a job directory, found URLs are checkpointed to an append-only
+        # log so a resumed crawl does not schedule them again.
+        self.found_urls_log = None
+        if job_dir:
+            os.makedirs(job_dir, exist_ok=True)
+            log_path = os.path.join(job_dir, FOUND_URLS_LOG)
+            if os.path.exists(log_path):
+                with open(log_path, 'r', encoding='utf-8') as f:
+                    self.seen_urls.update(canonical_key(line.rstrip('\n')) for line in f if line.strip())
+            self.found_urls_log = open(log_path, 'a', encoding='utf-8')
+        # When True, yielded items carry the downloaded HTML so the
+        # MarkdownExtractionPipeline can extract it without a second fetch.
+        self.extract_content = extract_content
+        # Sitemap-first discovery: seed the frontier from robots.txt sitemaps;
+        # link-following can be turned off to crawl only what sitemaps list.
+        self.use_sitemaps = sitemap
+        self.follow_links = follow_links
+        self.sitemaps_seen = set()
+        self.pages_yielded = 0
         super().__init__(*args, **kwargs)
         self.log(f"Starting crawl at: {start_url} within domain: {domain}")
 
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        # Canonicalizes followed links and prunes crawler traps (URL_STRIP_PARAMS, TRAP_* settings)
+        spider.url_filter = UrlFilter.from_settings(crawler.settings, seen=spider.seen_urls,
+                                                    **spider.seen_set_options)
+        for url in spider.start_urls:
+            spider.url_filter.check(url)
+        # Drops links to documents, images, media and archives before they are requested
+        # (CONTENT_GATE_SKIP_EXTENSIONS); ContentGateExtension checks the responses
+        spider.content_gate = ContentGate.from_settings(crawler.settings, stage='crawl')
+        # Orders the frontier so likely-changed pages come first (PRIORITY_* settings);
+        # CLOSESPIDER_ITEMCOUNT doubles as the hard page budget.
+        spider.scorer = PriorityScorer.from_settings(crawler.settings)
+        spider.max_pages = crawler.settings.getint('CLOSESPIDER_ITEMCOUNT')
+        return spider
+
+    def start_requests(self):
+        if self.use_sitemaps:
+            parsed = urlparse(self.start_urls[0])
+            yield scrapy.Request(
+                f"{parsed.scheme}://{parsed.netloc}/robots.txt",
+                callback=self._parse_robots,
+                dont_filter=True,
+                priority=SITEMAP_REQUEST_PRIORITY,
+                meta={'handle_httpstatus_all': True},
+            )
+        # Filtered like any other request, so a resumed crawl (whose dupefilter
+        # is restored from the job directory) does not fetch the start page again
+        for url in self.start_urls:
+            yield scrapy.Request(url, callback=self.parse)
+
+    def _sitemap_request(self, url):
+        """Request for a sitemap, or None if it was already requested (index loops)."""
+        if url in self.sitemaps_seen:
+            return None
+        self.sitemaps_seen.add(url)
+        self.crawler.stats.inc_value('sitemap/sitemaps')
+        # dont_filter also lets sitemaps hosted on another domain (e.g. a CDN) through
+        return scrapy.Request(url, callback=self._parse_sitemap, dont_filter=True,
+                              priority=SITEMAP_REQUEST_PRIORITY)
+
+    def _parse_robots(self, response):
+        sitemap_urls = []
+        if response.status == 200 and isinstance(response, scrapy.http.TextResponse):
+            sitemap_urls = list(iter_robots_sitemaps(response.text))
+        if not sitemap_urls:
+            # No Sitemap: lines, so try the conventional location
+            sitemap_urls = [response.urljoin('/sitemap.xml')]
+        for url in sitemap_urls:
+            request = self._sitemap_request(url)
+            if request:
+                yield request
+
+    def _parse_sitemap(self, response):
+        """Streams a sitemap (or index) and schedules every listed page with its lastmod."""
+        for entry in iter_sitemap_entries(response.body):
+            if entry.kind == 'sitemap':
+                request = self._sitemap_request(entry.loc)
+                if request:
+                    yield request
+                continue
+
+            if not self._is_allowed(entry.loc) or self.content_gate.check_url(entry.loc):
+                continue
+            url, prune_reason = self.url_filter.check(entry.loc)
+            if prune_reason:
+                continue
+            self.crawler.stats.inc_value('sitemap/urls')
+            # Sitemap pages count as one hop from the start page
+            priority = self.scorer.score(url, depth=1, lastmod=entry.lastmod,
+                                         changefreq=entry.changefreq,
+                                         sitemap_priority=entry.priority)
+            yield scrapy.Request(url, callback=self.parse, priority=priority, meta={
+                'sitemap_lastmod': entry.lastmod,
+                'sitemap_changefreq': entry.changefreq,
+                'sitemap_priority': entry.priority,
+            })
+
+    def _is_allowed(self, url):
+        """Checks if the URL's domain is exactly an allowed domain or a subdomain of it."""
+        # urlparse(url).hostname provides the full domain including subdomains (without port).
+        domain = urlparse(url).hostname or ''
+        for allowed_domain in self.allowed_domains:
+            if domain == allowed_domain or domain.endswith('.' + allowed_domain):
+                return True
+        return False
+
     def parse(self, response):
-        current_url = response.url
+        # Responses still in flight when the page budget runs out are dropped
+        if self.max_pages and self.pages_yielded >= self.max_pages:
+            return
+        # Not HTML or too large: ContentGateExtension stopped the download
+        if 'download_stopped' in response.flags:
+            return
+        current_url = clean_url(response.url, self.url_filter.strip_params)
 
         # --- Yield the current URL if it's valid and new ---
         # Extract the netloc (domain) from the current URL
@@ -28,42 +167,57 @@ class UrlFinderSpider(scrapy.Spider):
         # Check if the final URL's domain matches our allowed domain
         # This is a stricter check than just allowed_domains which might allow subdomains
         # if the base domain was given. Adjust if you *want* all subdomains.
-        # For simplicity here, let's trust allowed_domains primarily, but add the found_urls check.
+        # For simplicity here, let's trust allowed_domains primarily.
         # Re-evaluate domain check if needed. Let's assume allowed_domains handles it.
-        if response.url not in self.found_urls:
-             # Check if the response URL domain is within the allowed list
-             # This handles cases where allowed_domains = ['example.com'] and
-             # we land on www.example.com or docs.example.com.
-             # urlparse(response.url).netloc provides the full domain including subdomains.
-             is_allowed = False
-             response_domain = urlparse(response.url).netloc
-             for allowed_domain in self.allowed_domains:
-                 # Check if response domain is exactly the allowed domain or a subdomain of it
-                 if response_domain == allowed_domain or response_domain.endswith('.' + allowed_domain):
-                     is_allowed = True
-                     break
-
-             if is_allowed:
-                 self.found_urls.add(response.url)
-                 yield {'url': response.url}
-             #else: # Optional: log if a URL was visited but not yielded due to domain mismatch after redirect
-             #    self.log(f"Skipping yield for {response.url} - outside allowed domain(s) {self.allowed_domains}", level=scrapy.log.INFO)
+        # URLs are yielded in cleaned form (tracking params stripped, query sorted).
+        # The dupefilter requests every cleaned URL once, so each response is a
+        # new page; its key is recorded for redirect targets the filter never saw.
+        # Check if the response URL domain is within the allowed list
+        # This handles cases where allowed_domains = ['example.com'] and
+        # we land on www.example.com or docs.example.com.
+        if self._is_allowed(current_url):
+            self.seen_urls.add(canonical_key(current_url))
+            self.pages_yielded += 1
+            if self.found_urls_log:
+                self.found_urls_log.write(current_url + '\n')
+                self.found_urls_log.flush()
+            item = {'url': current_url}
+            if response.meta.get('sitemap_lastmod'):
+                item['lastmod'] = response.meta['sitemap_lastmod']
+            if self.extract_content and isinstance(response, scrapy.http.TextResponse):
+                # Raw bytes plus charset: the extractor parses them without decoding first
+                item['html'] = response.body
+                item['encoding'] = response.encoding
+            yield item
+        #else: # Optional: log if a URL was visited but not yielded due to domain mismatch after redirect
+        #    self.log(f"Skipping yield for {response.url} - outside allowed domain(s) {self.allowed_domains}", level=scrapy.log.INFO)
 
 
         # --- Find and follow valid links ---
+        if not self.follow_links:
+            return
         links = response.css('a::attr(href)').getall()
+        depth = response.meta.get('depth', 0) + 1
         # self.log(f"Found {len(links)} links on {current_url}") # Reduced logging verbosity
 
         for link in links:
             # Basic check to filter out non-web links BEFORE calling follow
             if link and not link.startswith(('mailto:', 'tel:', 'javascript:', '#')):
                 try:
-                    # Use response.follow - it handles relative URLs, allowed_domains check,
-                    # and duplicate request filtering automatically.
-                    yield response.follow(link, callback=self.parse)
+                    url = response.urljoin(link)
+                    if not self._is_allowed(url) or self.content_gate.check_url(url):
+                        continue
+                    # Canonicalize, then drop already-seen URLs and crawler traps before scheduling
+                    url, prune_reason = self.url_filter.check(url)
+                    if prune_reason:
+                        continue
+                    # Use response.follow - it handles relative URLs and
+                    # duplicate request filtering automatically.
+                    yield response.follow(url, callback=self.parse,
+                                          priority=self.scorer.score(url, depth=depth))
                 except Exception as e:
                     # Log errors during follow generation if needed, but Scrapy usually handles internal errors
-                    self.log(f"Error trying to follow link '{link}' from {response.url}: {e}", level=scrapy.log.ERROR)
+                    self.log(f"Error trying to follow link '{link}' from {response.url}: {e}", level=logging.ERROR)
             # else: # Optional: log skipped links
             #    if link and link.startswith('#'):
             #        pass # Skip logging fragment links silently
@@ -71,4 +225,15 @@ class UrlFinderSpider(scrapy.Spider):
             #        self.log(f"Skipping non-web link: {link}", level=scrapy.log.DEBUG)
 
     def closed(self, reason):
-        self.log(f"Spider finished: {reason}. Found {len(self.found_urls)} unique internal URLs yielded.")
\ No newline at end of file
+        if self.found_urls_log:
+            self.found_urls_log.close()
+        # Expose what canonicalization and trap detection pruned in the crawl stats
+        stats = self.crawler.stats
+        stats.set_value('url_filter/rewritten', self.url_filter.cleaned)
+        stats.set_value('url_filter/duplicates', self.url_filter.duplicates)
+        for prune_reason, count in self.url_filter.pruned.items():
+            stats.set_value(f'url_filter/pruned/{prune_reason}', count)
+        for skip_reason, count in self.content_gate.skipped.items():
+            stats.set_value(f'content_gate/skipped/{skip_reason}', count)
+        self.log(f"URL filter: {self.url_filter.summary()}")
+        self.log(f"Spider finished: {reason}. Found {self.pages_yielded} unique internal URLs yielded.")
\ No newline at end of file
@@ -0,0 +1,41 @@
+# src/handlers.py
+from scrapy.core.downloader.handlers.http11 import HTTP11DownloadHandler
+from twisted.internet import defer
+
+from src.utils.Metrics import METRICS
+
+
+class GlobalConcurrencyDownloadHandler(HTTP11DownloadHandler):
+    """
+    HTTP(S) download handler that caps the downloads in flight across
+    every crawler in the process at GLOBAL_CONCURRENT_REQUESTS, for batch
+    runs with one crawler per site.
+
+    A global slot is taken only when the download starts, after the
+    request has left its crawler's per-domain queue. A host held back by
+    DOWNLOAD_DELAY, AutoThrottle or the adaptive rate control
+    (AdaptiveRateMiddleware) holds no global slot while it waits, so a
+    slow or throttled site cannot starve the others. Time spent waiting
+    for a global slot is not part of download_latency, so the adaptive
+    rate control never reads it as a slow host. Cache hits
+    (HttpCacheMiddleware) never reach the handler.
+    """
+
+    # One pool per limit, shared by all crawlers in the reactor
+    _pools = {}
+
+    def __init__(self, settings, crawler):
+        super().__init__(settings, crawler)
+        limit = settings.getint('GLOBAL_CONCURRENT_REQUESTS')
+        self.pool = None
+        if limit > 0:
+            self.pool = self._pools.get(limit)
+            if self.pool is None:
+                self.pool = self._pools[limit] = defer.DeferredSemaphore(limit)
+
+    def download_request(self, request, spider):
+        if self.pool is None:
+            return super().download_request(request, spider)
+        downloaded = self.pool.run(super().download_request, request, spider)
+        METRICS.set_gauge('queue_depth', len(self.pool.waiting), queue='crawl_global_wait')
+        return downloaded
@@ -0,0 +1,64 @@
+# src/httpcache.py
+from scrapy.extensions.httpcache import RFC2616Policy
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+
+from src.utils.ResponseCache import ResponseCache, DEFAULT_MAX_BYTES
+
+
+class RevalidatingCachePolicy(RFC2616Policy):
+    """
+    Caches responses that carry an ETag or Last-Modified validator and
+    always revalidates them with a conditional request.
+
+    A 304 reply makes HttpCacheMiddleware reuse the cached body, so
+    unchanged pages cost a round trip but no body transfer.
+    """
+
+    def should_cache_response(self, response, request):
+        # Downloads cut short (e.g. by ContentGateExtension) have no usable body
+        if response.status != 200 or 'download_stopped' in response.flags:
+            return False
+        return b"ETag" in response.headers or b"Last-Modified" in response.headers
+
+    def is_cached_response_fresh(self, cachedresponse, request):
+        self._set_conditional_validators(request, cachedresponse)
+        return False
+
+
+class ResponseCacheStorage:
+    """
+    Scrapy HTTPCACHE_STORAGE backend on top of ResponseCache, so the crawl
+    and WebpageExtractor share one cache directory (HTTPCACHE_DIR).
+    """
+
+    def __init__(self, settings):
+        self.cache_dir = settings['HTTPCACHE_DIR']
+        self.max_bytes = settings.getint('RESPONSE_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+        self.cache = None
+
+    def open_spider(self, spider):
+        self.cache = ResponseCache(self.cache_dir, max_bytes=self.max_bytes)
+
+    def close_spider(self, spider):
+        self.cache.close()
+
+    def retrieve_response(self, spider, request):
+        if request.method != 'GET':
+            return None
+        entry = self.cache.get(request.url)
+        if entry is None:
+            return None
+        headers = Headers(entry['headers'])
+        respcls = responsetypes.from_args(headers=headers, url=request.url, body=entry['body'])
+        return respcls(url=request.url, headers=headers, status=entry['status'], body=entry['body'])
+
+    def store_response(self, spider, request, response):
+        if request.method != 'GET':
+            return
+        self.cache.store(
+            request.url,
+            response.body,
+            dict(response.headers.to_unicode_dict()),
+            status=response.status,
+        )
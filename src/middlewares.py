@@ -0,0 +1,60 @@
+# src/middlewares.py
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.utils.httpobj import urlparse_cached
+
+from src.utils.RateControl import DEFAULT_MAX_CONCURRENCY, RATE_CONTROLLER
+
+
+class AdaptiveRateMiddleware:
+    """
+    Replaces AutoThrottle with the shared AIMD controller
+    (src.utils.RateControl.RATE_CONTROLLER) when ADAPTIVE_RATE_ENABLED is set.
+
+    Every downloaded response (and every failed download) is reported
+    with its latency and status, and the host's download slot then takes
+    the controller's concurrency and delay. A host starts from its slot's
+    CONCURRENT_REQUESTS_PER_DOMAIN and DOWNLOAD_DELAY and may grow to
+    ADAPTIVE_RATE_MAX_CONCURRENCY; what the crawl learns is kept for the
+    extraction stage in the same process.
+
+    Ordered after HttpCacheMiddleware (900), so it sees 429/503 responses
+    before RetryMiddleware reschedules them; cache hits carry no
+    download_latency and are ignored.
+    """
+
+    def __init__(self, crawler, controller):
+        self.crawler = crawler
+        self.controller = controller
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('ADAPTIVE_RATE_ENABLED'):
+            raise NotConfigured
+        RATE_CONTROLLER.configure(
+            max_concurrency=settings.getint('ADAPTIVE_RATE_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY))
+        return cls(crawler, RATE_CONTROLLER)
+
+    def _slot(self, request):
+        return self.crawler.engine.downloader.slots.get(request.meta.get('download_slot'))
+
+    def _report(self, request, latency, status=None, retry_after=None):
+        host = urlparse_cached(request).hostname or ''
+        slot = self._slot(request)
+        if slot is not None:
+            self.controller.add_host(host, slot.concurrency, slot.delay)
+        self.controller.record(host, latency, status, retry_after)
+        if slot is not None:
+            slot.concurrency = self.controller.concurrency(host)
+            slot.delay = self.controller.delay(host)
+
+    def process_response(self, request, response, spider):
+        latency = request.meta.get('download_latency')
+        if latency is not None:
+            self._report(request, latency, response.status, response.headers.get('Retry-After'))
+        return response
+
+    def process_exception(self, request, exception, spider):
+        if not isinstance(exception, IgnoreRequest):
+            self._report(request, request.meta.get('download_latency'))
+        return None
@@ -0,0 +1,272 @@
+# src/pipelines.py
+import time
+from urllib.parse import urlparse
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import defer, task, threads
+from twisted.python.threadpool import ThreadPool
+
+from src.utils.FileSaver import build_output_filename, render_markdown, sanitize_filename
+from src.utils.Manifest import ManifestSet
+from src.utils.Metrics import METRICS, SamplingProfiler
+from src.utils.NearDuplicates import NearDuplicateIndex, DEFAULT_MAX_DISTANCE
+from src.utils.OutputWriter import OutputWriter, create_sink, default_output_path, DEFAULT_SHARD_SIZE
+from src.utils.WorkQueue import open_work_queue
+
+
+class MarkdownExtractionPipeline:
+    """
+    Extracts content from the HTML the spider already downloaded and writes
+    it straight to Markdown, so each page is fetched only once. Pages go
+    through an OutputWriter in OUTPUT_FORMAT ('markdown' files, or a bulk
+    'jsonl'/'jsonl.gz'/'jsonl.zst' file or 'tar'/'zip' shards at
+    OUTPUT_PATH, OUTPUT_SHARD_SIZE pages each).
+
+    With the INCREMENTAL_OUTPUT setting, pages whose HTML or rendered
+    Markdown is unchanged since the last run are skipped (see Manifest);
+    the manifests are saved according to the crawl's close reason (see
+    ManifestSet.finish).
+
+    With EXTRACT_PROFILE_EVERY = N, every Nth page's extraction is
+    profiled into EXTRACT_PROFILE_DIR (see SamplingProfiler).
+
+    With NEAR_DUPLICATES, pages whose content SimHash is within
+    NEAR_DUPLICATE_DISTANCE bits of an earlier page become aliases of
+    that page instead of files of their own (see NearDuplicateIndex).
+
+    Extraction never runs on the reactor thread, so downloads and
+    scheduling carry on while pages are parsed: with EXTRACT_WORKERS = 1
+    (the default) it runs in a dedicated thread, above 1 in a pool of that
+    many processes (see WebpageExtractor.process_pool). process_item
+    returns a Deferred; pages waiting for extraction count against
+    Scrapy's scraper memory limit (SCRAPER_SLOT_MAX_ACTIVE_SIZE), so a
+    slow extraction holds back new downloads.
+
+    Items without an 'html' field are passed through untouched.
+    """
+
+    def __init__(self, incremental=False, profiler=None, output_format='markdown',
+                 output_path=None, shard_size=DEFAULT_SHARD_SIZE, near_duplicate_distance=None,
+                 workers=1):
+        self.workers = max(1, workers)
+        self.incremental = incremental
+        self.profiler = profiler
+        self.output_format = output_format
+        self.output_path = output_path
+        self.shard_size = shard_size
+        self.near_duplicate_distance = near_duplicate_distance
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        profile_every = crawler.settings.getint('EXTRACT_PROFILE_EVERY')
+        profiler = None
+        if profile_every:
+            profiler = SamplingProfiler(crawler.settings.get('EXTRACT_PROFILE_DIR', 'profiles'),
+                                        every=profile_every)
+        near_duplicate_distance = None
+        if crawler.settings.getbool('NEAR_DUPLICATES'):
+            near_duplicate_distance = crawler.settings.getint('NEAR_DUPLICATE_DISTANCE', DEFAULT_MAX_DISTANCE)
+        pipeline = cls(incremental=crawler.settings.getbool('INCREMENTAL_OUTPUT'), profiler=profiler,
+                       output_format=crawler.settings.get('OUTPUT_FORMAT', 'markdown'),
+                       output_path=crawler.settings.get('OUTPUT_PATH'),
+                       shard_size=crawler.settings.getint('OUTPUT_SHARD_SIZE', DEFAULT_SHARD_SIZE),
+                       near_duplicate_distance=near_duplicate_distance,
+                       workers=crawler.settings.getint('EXTRACT_WORKERS', 1))
+        # Manifests are saved once the close reason is known (close_spider does not get it)
+        crawler.signals.connect(pipeline.spider_closed, signal=signals.spider_closed)
+        return pipeline
+
+    def open_spider(self, spider):
+        # Imported here so crawls without in-crawl extraction never load trafilatura
+        from src.utils.WebpageExtractor import WebpageExtractor
+
+        fingerprint = self.near_duplicate_distance is not None
+        self.extractor = WebpageExtractor(profiler=self.profiler, fingerprint=fingerprint)
+        self.manifests = ManifestSet() if self.incremental else None
+        output_path = self.output_path
+        if self.output_format != 'markdown' and not output_path:
+            # Named after the start URL's host and port, like app.py and run_batch.py
+            output_path = default_output_path(self.output_format,
+                                              sanitize_filename(urlparse(spider.start_urls[0]).netloc))
+        self.writer = OutputWriter(create_sink(self.output_format, output_path,
+                                               shard_size=self.shard_size),
+                                   manifests=self.manifests,
+                                   near_duplicates=NearDuplicateIndex(self.near_duplicate_distance)
+                                   if fingerprint else None)
+        self.pages_processed = 0
+        # Started with the first page
+        self.process_pool = self.thread_pool = None
+
+    def _extract(self, url, html_content, encoding):
+        """Extracts a page off the reactor thread; the Deferred fires with the result."""
+        if self.workers > 1 and self.process_pool is None:
+            self.process_pool = self.extractor.process_pool(self.workers)
+        elif self.workers <= 1 and self.thread_pool is None:
+            self.thread_pool = ThreadPool(minthreads=1, maxthreads=1, name='extract')
+            self.thread_pool.start()
+        if self.process_pool is None:
+            from twisted.internet import reactor
+            d = threads.deferToThreadPool(reactor, self.thread_pool, self.extractor.extract_from_html,
+                                          url, html_content, encoding=encoding)
+        else:
+            d = defer.Deferred()
+            future = self.extractor.submit(self.process_pool, url, html_content, encoding)
+            future.add_done_callback(lambda done: self._resolve(d, done))
+            d.addCallback(self._merge_worker_metrics)
+        d.addErrback(self._extraction_failed, url)
+        return d
+
+    @staticmethod
+    def _resolve(d, future):
+        """Fires d on the reactor thread with a finished pool future's outcome."""
+        from twisted.internet import reactor
+        try:
+            outcome = future.result()
+        except Exception as e:
+            reactor.callFromThread(d.errback, e)
+        else:
+            reactor.callFromThread(d.callback, outcome)
+
+    @staticmethod
+    def _merge_worker_metrics(outcome):
+        result, worker_metrics = outcome
+        if worker_metrics:
+            METRICS.merge(worker_metrics)
+        return result
+
+    @staticmethod
+    def _extraction_failed(failure, url):
+        METRICS.inc('errors_total', stage='extract')
+        return {'url': url, 'title': None, 'content': None}
+
+    def process_item(self, item, spider):
+        html_content = item.pop('html', None)
+        encoding = item.pop('encoding', None)
+        if html_content is None:
+            return item
+
+        url = item['url']
+        domain_name, output_filename_base = build_output_filename(url, self.pages_processed)
+        self.pages_processed += 1
+
+        manifest = None
+        if self.manifests is not None:
+            manifest = self.manifests[domain_name]
+            if manifest.body_unchanged(url, html_content):
+                return item
+        d = self._extract(url, html_content, encoding)
+        d.addCallback(self._write, manifest, domain_name, output_filename_base)
+        d.addCallback(lambda _: item)
+        return d
+
+    def _write(self, result, manifest, domain_name, output_filename_base):
+        if manifest is None:
+            self.writer.write(result, domain_name, output_filename_base)
+            return
+        url = result['url']
+        markdown_content = render_markdown(result)
+        if markdown_content and manifest.output_unchanged(url, markdown_content):
+            return
+        written_to = self.writer.write(result, domain_name, output_filename_base,
+                                       markdown=markdown_content)
+        if written_to:
+            manifest.record_output(url, written_to, markdown_content)
+
+    def close_spider(self, spider):
+        # Scrapy waits for every pending item, so no extraction is still running here
+        if self.process_pool is not None:
+            self.process_pool.shutdown()
+        if self.thread_pool is not None:
+            self.thread_pool.stop()
+        self.writer.close()
+        spider.log(f"Extraction pipeline processed {self.pages_processed} pages.")
+
+    def spider_closed(self, spider, reason):
+        if self.manifests is not None:
+            self.manifests.finish(reason)
+
+
+class WorkQueuePipeline:
+    """
+    Pushes every found URL to the shared work queue at WORK_QUEUE (job
+    WORK_QUEUE_NAME), for extraction workers on other nodes to pull (see
+    src/distributed.py). URLs are sent in batches of WORK_QUEUE_BATCH, or
+    at least every second so workers start early; the queue's seen-set
+    drops URLs an earlier crawl of the job already queued.
+    """
+
+    flush_interval = 1.0
+
+    def __init__(self, spec, name='default', batch_size=100):
+        self.spec = spec
+        self.name = name
+        self.batch_size = batch_size
+        self.pending = []
+        self.queued = 0
+        self.last_flush = time.monotonic()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.settings.get('WORK_QUEUE'),
+                   name=crawler.settings.get('WORK_QUEUE_NAME', 'default'),
+                   batch_size=crawler.settings.getint('WORK_QUEUE_BATCH', 100))
+
+    def open_spider(self, spider):
+        self.queue = open_work_queue(self.spec, self.name)
+
+    def _flush(self):
+        if self.pending:
+            self.queued += self.queue.add_many(self.pending)
+            self.pending = []
+        self.last_flush = time.monotonic()
+
+    def process_item(self, item, spider):
+        self.pending.append(item['url'])
+        if (len(self.pending) >= self.batch_size
+                or time.monotonic() - self.last_flush >= self.flush_interval):
+            self._flush()
+        return item
+
+    def close_spider(self, spider):
+        self._flush()
+        spider.log(f"Queued {self.queued} new URLs for job '{self.name}' at {self.spec}.")
+        self.queue.close()
+
+
+class UrlStreamPipeline:
+    """
+    Hands every found URL to the UrlStream in the URL_STREAM setting, for
+    extraction running alongside the crawl (app.py --stream), and closes
+    the stream when the spider closes.
+
+    While the stream is full the item stays pending and is offered again
+    every retry_interval seconds. Pending items count against Scrapy's
+    scraper memory limit (SCRAPER_SLOT_MAX_ACTIVE_SIZE), so a slow
+    extraction holds back new downloads instead of buffering the site.
+    """
+
+    retry_interval = 0.05
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        stream = crawler.settings.get('URL_STREAM')
+        if stream is None:
+            raise NotConfigured
+        return cls(stream)
+
+    def _offer(self, item):
+        if self.stream.offer(item['url']):
+            return item
+        from twisted.internet import reactor
+        return task.deferLater(reactor, self.retry_interval, self._offer, item)
+
+    def process_item(self, item, spider):
+        return self._offer(item)
+
+    def close_spider(self, spider):
+        self.stream.close()
+        spider.logger.info(f"Streamed {self.stream.offered} URLs to extraction.")
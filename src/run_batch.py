@@ -0,0 +1,265 @@
+# src/run_batch.py
+import argparse
+import json
+import os
+import sys
+from urllib.parse import urlparse
+
+# --- Setup Project Path ---
+# Get the directory containing the 'src' directory (project root)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add the project root to the Python path
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# --------------------------
+
+# --- Imports relative to project root ---
+try:
+    from src.app import (add_crawl_arguments, crawl_options, crawl_settings, finish_reporting,
+                         sanitize_filename, URL_LIST_DIR_ABS)
+    from src.run_url_finder import configure_crawl, run_spiders
+    from src.utils.ContentGate import DEFAULT_MAX_BODY_BYTES
+    from src.utils.Metrics import start_reporters, DEFAULT_METRICS_HOST
+    from src.utils.NearDuplicates import DEFAULT_MAX_DISTANCE
+    from src.utils.OutputWriter import OUTPUT_FORMATS, DEFAULT_SHARD_SIZE, check_output_format, default_output_path
+    from src.utils.RateControl import DEFAULT_MAX_CONCURRENCY
+except ImportError as e:
+    print(f"Error: Could not import required modules: {e}")
+    sys.exit(1)
+# --------------------------------------
+
+# Per-site options a seeds file line may set, and the setting each one maps to
+SITE_SETTINGS = {
+    'concurrency': 'CONCURRENT_REQUESTS_PER_DOMAIN',
+    'delay': 'DOWNLOAD_DELAY',
+}
+
+
+def read_seeds(seeds_path):
+    """
+    Reads the sites to crawl from a seeds file: one start URL per line, or
+    a JSON object with 'url' and optional per-site 'concurrency', 'delay',
+    'max_pages', 'max_time', 'sitemap' and 'follow_links'. Blank lines and
+    lines starting with # are ignored, as are repeated hosts (host:port).
+    """
+    seeds = []
+    hosts = set()
+    with open(seeds_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                seed = json.loads(line) if line.startswith('{') else {'url': line}
+                host = urlparse(seed["url"]).netloc
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+                print(f"Skipping invalid seed on line {line_number}: {line} - Error: {e}")
+                continue
+            if not host:
+                print(f"Skipping seed without a host on line {line_number}: {line}")
+                continue
+            if host in hosts:
+                print(f"Skipping repeated host on line {line_number}: {line}")
+                continue
+            hosts.add(host)
+            seeds.append(seed)
+    return seeds
+
+
+def parse_args(argv=None):
+    """Parses command-line options for a multi-site batch run."""
+    parser = argparse.ArgumentParser(
+        description="Crawl and extract many sites in one process. Each site gets its own "
+                    "allowed domain, URL list, output folder and politeness budget; "
+                    "downloads share one global concurrency limit.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "seeds_file",
+        help="File of start URLs, one per line, or JSON lines such as "
+             '{"url": "https://example.com", "concurrency": 2, "delay": 1.0, "max_pages": 500}.'
+    )
+    parser.add_argument(
+        "--max-sites",
+        type=int,
+        default=16,
+        help="Sites crawled at the same time; the next starts as soon as one finishes."
+    )
+    parser.add_argument(
+        "--global-concurrency",
+        type=int,
+        default=64,
+        help="Downloads in flight across all sites; a site waiting out its delay holds none. "
+             "0 = only the per-site limits apply."
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Default concurrent requests per domain (a seed's 'concurrency' overrides it)."
+    )
+    parser.add_argument(
+        "--delay",
+        type=float,
+        default=0.5,
+        help="Default download delay per domain in seconds (a seed's 'delay' overrides it)."
+    )
+    parser.add_argument(
+        "--adaptive-rate",
+        action="store_true",
+        help="Adapt each site's concurrency and delay to its latency and errors (AIMD), "
+             "starting from --concurrency and --delay."
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help="With --adaptive-rate: most concurrent requests allowed to one site."
+    )
+    # Seed defaults; a seed's 'max_pages', 'max_time', 'sitemap' or 'follow_links' override them
+    add_crawl_arguments(parser)
+    parser.add_argument(
+        "--max-body-mb",
+        type=float,
+        default=DEFAULT_MAX_BODY_BYTES / (1024 * 1024),
+        help="Abandon page downloads larger than this; non-HTML responses are dropped on "
+             "their headers. 0 = no size limit."
+    )
+    parser.add_argument(
+        "--urls-only",
+        action="store_true",
+        help="Only write each site's URL list, without extracting content."
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Skip pages unchanged since the last run (per-domain manifests)."
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=OUTPUT_FORMATS,
+        default="markdown",
+        help="'markdown' writes output_folder/<domain>/; bulk formats write "
+             "output_folder/<domain>.<format> per site."
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=DEFAULT_SHARD_SIZE,
+        help="Pages per tar/zip shard."
+    )
+    parser.add_argument(
+        "--near-duplicates",
+        action="store_true",
+        help="Write near-identical pages of a site once, listing the others as aliases."
+    )
+    parser.add_argument(
+        "--near-duplicate-bits",
+        type=int,
+        default=DEFAULT_MAX_DISTANCE,
+        help="Content SimHash bits near-duplicates may differ in."
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Directory for the persistent HTTP response cache, shared by all sites."
+    )
+    parser.add_argument(
+        "--job-dir",
+        default=None,
+        help="Directory for crawl checkpoints, one subfolder per site."
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume the sites' interrupted crawls from --job-dir."
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve live Prometheus metrics on this port at /metrics."
+    )
+    parser.add_argument(
+        "--metrics-host",
+        default=DEFAULT_METRICS_HOST,
+        help="Address for --metrics-port to listen on (0.0.0.0 exposes it to other hosts)."
+    )
+    parser.add_argument(
+        "--stats-file",
+        default=None,
+        help="Periodically write a JSON metrics snapshot to this file."
+    )
+    parser.add_argument(
+        "--stats-interval",
+        type=float,
+        default=10,
+        help="Seconds between --stats-file updates."
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Crawls (and extracts) every site in the seeds file in a single reactor."""
+    args = parse_args(argv)
+    try:
+        check_output_format(args.output_format)
+    except ImportError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    seeds = read_seeds(args.seeds_file)
+    if not seeds:
+        print(f"No valid seeds found in {args.seeds_file}.")
+        sys.exit(1)
+
+    cache_dir = os.path.abspath(args.cache_dir) if args.cache_dir else None
+    job_dir = os.path.abspath(args.job_dir) if args.job_dir else None
+    reporters = start_reporters(args.metrics_port, args.stats_file, args.stats_interval,
+                                metrics_host=args.metrics_host)
+
+    crawls = []
+    for seed in seeds:
+        site_name = sanitize_filename(urlparse(seed['url']).netloc)
+        site_settings = {
+            **crawl_settings(args),
+            'CONCURRENT_REQUESTS_PER_DOMAIN': args.concurrency,
+            'DOWNLOAD_DELAY': args.delay,
+            # The global limit applies once a download starts, after the per-domain delay
+            'DOWNLOAD_HANDLERS': {'http': 'src.handlers.GlobalConcurrencyDownloadHandler',
+                                  'https': 'src.handlers.GlobalConcurrencyDownloadHandler'},
+            'GLOBAL_CONCURRENT_REQUESTS': args.global_concurrency,
+            'OUTPUT_FORMAT': args.output_format,
+            # One bulk file per site: sites on one host (other ports) must not share it
+            'OUTPUT_PATH': (default_output_path(args.output_format, site_name)
+                            if args.output_format != 'markdown' else None),
+            'OUTPUT_SHARD_SIZE': args.shard_size,
+            'NEAR_DUPLICATES': args.near_duplicates,
+            'NEAR_DUPLICATE_DISTANCE': args.near_duplicate_bits,
+        }
+        for option, setting in SITE_SETTINGS.items():
+            if option in seed:
+                site_settings[setting] = seed[option]
+        # Each crawler has one domain; the shared pool caps the total
+        site_settings['CONCURRENT_REQUESTS'] = max(8, int(site_settings['CONCURRENT_REQUESTS_PER_DOMAIN']))
+        options = crawl_options(args)
+        options.update(sitemap=seed.get('sitemap', args.sitemap),
+                       follow_links=seed.get('follow_links', args.follow_links),
+                       max_pages=seed.get('max_pages', args.max_pages),
+                       max_seconds=seed.get('max_time', args.max_time))
+        crawls.append(configure_crawl(
+            seed['url'], os.path.join(URL_LIST_DIR_ABS, f"{site_name}_urls.jsonl"),
+            extract_content=not args.urls_only, incremental=args.incremental,
+            cache_dir=cache_dir, job_dir=os.path.join(job_dir, site_name) if job_dir else None,
+            resume=args.resume, extra_settings=site_settings, **options))
+
+    print(f"--- Crawling {len(crawls)} sites, {args.max_sites} at a time ---")
+    failures = run_spiders(crawls, max_sites=args.max_sites)
+    for start_url, error in failures.items():
+        print(f"  failed: {start_url}: {error}")
+
+    finish_reporting(reporters)
+    print("\n--- run_batch.py finished ---")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 # src/run_url_finder.py
 import argparse
+import json
+import shutil
 import sys
 from urllib.parse import urlparse
 import os
@@ -21,18 +23,79 @@ URL_LIST_DIR_NAME = "url_lists"
 # --- Imports relative to project root ---
 try:
     # Import find_urls now relative to src
-    from src.find_urls import UrlFinderSpider
+    from src.find_urls import UrlFinderSpider, FOUND_URLS_LOG
+    from src.utils.ContentGate import DEFAULT_MAX_BODY_BYTES
+    from src.utils.Metrics import start_reporters, format_stage_summary, DEFAULT_METRICS_HOST
+    from src.utils.NearDuplicates import DEFAULT_MAX_DISTANCE
+    from src.utils.OutputWriter import OUTPUT_FORMATS, DEFAULT_SHARD_SIZE, check_output_format
+    from src.utils.RateControl import DEFAULT_MAX_CONCURRENCY
 except ImportError:
     print("Error: Could not import UrlFinderSpider from src.find_urls.py")
     sys.exit(1)
 
-from scrapy.crawler import CrawlerProcess
+from scrapy.crawler import Crawler, CrawlerProcess
 from scrapy.settings import Settings
+from twisted.internet import defer
 # --------------------------------------
 
 
-def run_spider(start_url, output_file_path, domain=None): # Takes absolute path
-    """Configures and runs the UrlFinderSpider."""
+# Files Scrapy and UrlFinderSpider keep in a job directory
+JOB_DIR_ENTRIES = ('requests.queue', 'requests.seen', 'spider.state', FOUND_URLS_LOG)
+
+
+def _clear_job_dir(job_dir):
+    """Removes checkpoint files from a previous crawl so a fresh one can start."""
+    for entry in JOB_DIR_ENTRIES:
+        path = os.path.join(job_dir, entry)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+
+def sync_feed_with_found_urls(output_file_path, job_dir):
+    """
+    Makes the JSONL feed consistent with the spider's found-URL checkpoint
+    before resuming: drops a partially written last line and appends URLs
+    that were checkpointed but lost from the feed's write buffer. Running it
+    again changes nothing.
+    """
+    log_path = os.path.join(job_dir, FOUND_URLS_LOG)
+    if not os.path.exists(log_path):
+        return
+
+    feed_urls = set()
+    if os.path.exists(output_file_path):
+        with open(output_file_path, 'rb+') as f:
+            content = f.read()
+            if content and not content.endswith(b'\n'):
+                f.truncate(content.rfind(b'\n') + 1)
+                content = content[:content.rfind(b'\n') + 1]
+        for line in content.decode('utf-8', errors='replace').splitlines():
+            try:
+                feed_urls.add(json.loads(line)['url'])
+            except (json.JSONDecodeError, KeyError, TypeError):
+                continue
+
+    with open(log_path, 'r', encoding='utf-8') as f:
+        missing = [u for u in (line.rstrip('\n') for line in f) if u and u not in feed_urls]
+    if missing:
+        with open(output_file_path, 'a', encoding='utf-8') as f:
+            for url in missing:
+                f.write(json.dumps({'url': url}) + '\n')
+        print(f"Recovered {len(missing)} URLs from the crawl checkpoint into {output_file_path}")
+
+
+def configure_crawl(start_url, output_file_path, domain=None, extract_content=False,
+                    extract_workers=1, incremental=False, cache_dir=None, cache_max_bytes=None,
+                    job_dir=None, resume=False, seen_set='set', seen_set_capacity=1_000_000,
+                    seen_set_error_rate=0.001, sitemap=False, follow_links=True,
+                    max_pages=0, max_seconds=0, extra_settings=None):
+    """
+    Prepares one UrlFinderSpider crawl (see run_spider for the options):
+    creates the output and job directories and returns the crawl's
+    Settings and the spider's keyword arguments.
+    """
 
     # Ensure output directory exists (using the absolute path provided)
     output_dir = os.path.dirname(output_file_path)
@@ -43,7 +106,8 @@ def run_spider(start_url, output_file_path, domain=None): # Takes absolute path
     if domain is None:
         try:
             parsed_uri = urlparse(start_url)
-            domain = parsed_uri.netloc.replace('www.', '')
+            # hostname drops any port, which Scrapy's offsite filter rejects
+            domain = (parsed_uri.hostname or '').replace('www.', '')
             if not domain:
                  raise ValueError("Could not parse domain")
             print(f"Automatically derived domain: {domain}")
@@ -51,6 +115,17 @@ def run_spider(start_url, output_file_path, domain=None): # Takes absolute path
              print(f"Error: Could not automatically determine domain from {start_url}: {e}")
              sys.exit(1)
 
+    if resume and not job_dir:
+        print("Warning: resume requested without a job directory; starting a fresh crawl.")
+        resume = False
+    if job_dir:
+        os.makedirs(job_dir, exist_ok=True)
+        if resume:
+            print(f"Resuming crawl from job directory '{job_dir}'")
+            sync_feed_with_found_urls(output_file_path, job_dir)
+        else:
+            _clear_job_dir(job_dir)
+
     settings = Settings()
     # Standard Scrapy settings...
     settings['USER_AGENT'] = 'MyUrlFinderBot/1.0 (+http://mydomain.com/botinfo)'
@@ -62,30 +137,175 @@ def run_spider(start_url, output_file_path, domain=None): # Takes absolute path
     settings['DEPTH_LIMIT'] = 0
     settings['CONCURRENT_REQUESTS'] = 8
     settings['CONCURRENT_REQUESTS_PER_DOMAIN'] = 4
+    # Crawl latency, status codes, bytes and queue depths go to src.utils.Metrics;
+    # non-HTML and oversized page downloads are stopped early (CONTENT_GATE_* settings)
+    settings['EXTENSIONS'] = {
+        'src.extensions.MetricsExtension': 500,
+        'src.extensions.ContentGateExtension': 510,
+    }
     settings['FEEDS'] = {
         output_file_path: { # Use the absolute path here
             'format': 'jsonlines',
             'encoding': 'utf8',
             'store_empty': False,
-            'overwrite': True,
-            'fields': ['url'],
+            'overwrite': not resume, # Append to the existing list when resuming
+            'fields': ['url', 'lastmod'], # lastmod only when a sitemap provides it
             'indent': 0,
         }
     }
+    # Within one priority, crawl breadth-first so shallow pages come first
+    settings['SCHEDULER_MEMORY_QUEUE'] = 'scrapy.squeues.FifoMemoryQueue'
+    settings['SCHEDULER_DISK_QUEUE'] = 'scrapy.squeues.PickleFifoDiskQueue'
+    if max_pages:
+        settings['CLOSESPIDER_ITEMCOUNT'] = max_pages
+    if max_seconds:
+        settings['CLOSESPIDER_TIMEOUT'] = max_seconds
+    if job_dir:
+        settings['JOBDIR'] = job_dir
+        settings['DUPEFILTER_CLASS'] = 'src.dupefilters.FlushingDupeFilter'
+    if seen_set != 'set':
+        settings['DUPEFILTER_CLASS'] = 'src.dupefilters.CompactDupeFilter'
+        settings['SEEN_SET_KIND'] = seen_set
+        settings['SEEN_SET_CAPACITY'] = seen_set_capacity
+        settings['SEEN_SET_ERROR_RATE'] = seen_set_error_rate
+    if cache_dir:
+        settings['HTTPCACHE_ENABLED'] = True
+        settings['HTTPCACHE_DIR'] = cache_dir
+        settings['HTTPCACHE_STORAGE'] = 'src.httpcache.ResponseCacheStorage'
+        settings['HTTPCACHE_POLICY'] = 'src.httpcache.RevalidatingCachePolicy'
+        if cache_max_bytes:
+            settings['RESPONSE_CACHE_MAX_BYTES'] = cache_max_bytes
+    if extract_content:
+        settings['ITEM_PIPELINES'] = {
+            'src.pipelines.MarkdownExtractionPipeline': 300,
+        }
+        settings['EXTRACT_WORKERS'] = extract_workers
+        settings['INCREMENTAL_OUTPUT'] = incremental
+
+    if extra_settings:
+        settings.update(extra_settings)
+    if settings.getbool('ADAPTIVE_RATE_ENABLED'):
+        # Per-host AIMD takes over from AutoThrottle; added after extra_settings,
+        # which may bring their own DOWNLOADER_MIDDLEWARES
+        settings['DOWNLOADER_MIDDLEWARES'] = {
+            **settings.getdict('DOWNLOADER_MIDDLEWARES'),
+            'src.middlewares.AdaptiveRateMiddleware': 960,
+        }
+        settings['AUTOTHROTTLE_ENABLED'] = False
+        settings['CONCURRENT_REQUESTS'] = max(
+            settings.getint('CONCURRENT_REQUESTS'),
+            settings.getint('ADAPTIVE_RATE_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY))
+
+    spider_kwargs = dict(start_url=start_url, domain=domain,
+                         extract_content=extract_content, job_dir=job_dir,
+                         seen_set=seen_set, seen_set_capacity=seen_set_capacity,
+                         seen_set_error_rate=seen_set_error_rate,
+                         sitemap=sitemap, follow_links=follow_links)
+    return settings, spider_kwargs
+
+
+def run_spider(start_url, output_file_path, domain=None, extract_content=False,
+               extract_workers=1, incremental=False, cache_dir=None, cache_max_bytes=None,
+               job_dir=None, resume=False, seen_set='set', seen_set_capacity=1_000_000,
+               seen_set_error_rate=0.001, sitemap=False, follow_links=True,
+               max_pages=0, max_seconds=0, extra_settings=None): # Takes absolute path
+    """
+    Configures and runs the UrlFinderSpider.
+
+    When extract_content is True, pages are extracted and written to Markdown
+    during the crawl (single-fetch mode) instead of being re-downloaded later,
+    in a thread or, with extract_workers > 1, a pool of that many processes;
+    incremental additionally skips pages unchanged since the last run.
+    When cache_dir is set, responses are cached there and revalidated with
+    conditional requests on later runs (shared with WebpageExtractor).
+    When job_dir is set, the request queue, seen-set and found URLs are
+    checkpointed there; resume=True continues an interrupted crawl instead
+    of starting over.
+    seen_set selects how found URLs and request fingerprints are
+    deduplicated: 'set' (exact, unbounded), 'hashed' (64-bit hashes) or
+    'bloom' (fixed memory, seen_set_error_rate false positives).
+    sitemap=True seeds the crawl from the sitemaps listed in robots.txt
+    (or /sitemap.xml); follow_links=False then crawls only those pages.
+    Requests are prioritized by PriorityScorer (depth, sitemap lastmod and
+    changefreq, change history from previous incremental runs, and the
+    PRIORITY_PATTERN_WEIGHTS setting); max_pages and max_seconds stop the
+    crawl once that many pages were found or that much time has passed
+    (0 means no limit).
+    extra_settings are applied last, e.g. URL_STRIP_PARAMS or the TRAP_*
+    limits used by UrlFinderSpider's URL filter. ADAPTIVE_RATE_ENABLED
+    replaces AutoThrottle with AdaptiveRateMiddleware, which grows each
+    host's concurrency up to ADAPTIVE_RATE_MAX_CONCURRENCY while it stays
+    fast and healthy.
+    Returns the crawl's close reason ('finished', 'shutdown' after Ctrl-C,
+    'closespider_itemcount' after max_pages, ...), or None if it never ran.
+    """
+
+    settings, spider_kwargs = configure_crawl(
+        start_url, output_file_path, domain=domain, extract_content=extract_content,
+        extract_workers=extract_workers, incremental=incremental,
+        cache_dir=cache_dir, cache_max_bytes=cache_max_bytes,
+        job_dir=job_dir, resume=resume, seen_set=seen_set, seen_set_capacity=seen_set_capacity,
+        seen_set_error_rate=seen_set_error_rate, sitemap=sitemap, follow_links=follow_links,
+        max_pages=max_pages, max_seconds=max_seconds, extra_settings=extra_settings)
 
     # --- Run the Crawler ---
     process = CrawlerProcess(settings)
-    print(f"Starting crawl for domain '{domain}' at '{start_url}'...")
+    print(f"Starting crawl for domain '{spider_kwargs['domain']}' at '{start_url}'...")
     print(f"Output will be saved to '{output_file_path}'") # Show the absolute path
     # Pass the spider class directly (imported from src.find_urls)
-    process.crawl(UrlFinderSpider, start_url=start_url, domain=domain)
+    crawler = process.create_crawler(UrlFinderSpider)
+    process.crawl(crawler, **spider_kwargs)
     process.start() # Blocks until finished
-    print("Crawling finished.")
+    close_reason = crawler.stats.get_value('finish_reason')
+    print(f"Crawling finished: {close_reason}.")
+    return close_reason
+
+
+def run_spiders(crawls, max_sites=8):
+    """
+    Runs several crawls prepared by configure_crawl in one reactor,
+    at most max_sites at a time; the next one starts as soon as one ends.
+
+    Each crawl keeps its own settings (allowed domain, per-domain
+    concurrency and delay, budgets, feed). Returns {start_url: error
+    message} for crawls that failed; the others carry on regardless.
+    """
+    if not crawls:
+        return {}
+    process = CrawlerProcess(crawls[0][0])
+    site_slots = defer.DeferredSemaphore(max(1, max_sites))
+    failures = {}
+
+    def start_crawl(index, settings, spider_kwargs):
+        print(f"Starting crawl for domain '{spider_kwargs['domain']}' at '{spider_kwargs['start_url']}'...")
+        # The first crawler installs the reactor the settings ask for
+        crawler = Crawler(UrlFinderSpider, settings, init_reactor=index == 0)
+        return process.crawl(crawler, **spider_kwargs)
+
+    def record_failure(failure, start_url):
+        failures[start_url] = failure.getErrorMessage()
+        print(f"Error: Crawl of {start_url} failed: {failures[start_url]}")
+
+    runs = []
+    for index, (settings, spider_kwargs) in enumerate(crawls):
+        run = site_slots.run(start_crawl, index, settings, spider_kwargs)
+        run.addErrback(record_failure, spider_kwargs['start_url'])
+        runs.append(run)
+
+    from twisted.internet import reactor # Installed by the first crawler
+    finished = defer.DeferredList(runs)
+    if not finished.called:
+        finished.addBoth(lambda _: reactor.stop())
+        process.start(stop_after_crawl=False) # Blocks until every crawl finished
+    print(f"Crawling finished: {len(crawls) - len(failures)} of {len(crawls)} sites.")
+    return failures
 
 # --- Main execution block (if run directly) ---
 if __name__ == "__main__":
     # This part is mainly for standalone testing of this script,
     # app.py is the intended entry point.
+    from src.app import add_crawl_arguments, crawl_options, crawl_settings
+
     parser = argparse.ArgumentParser(
         description=f"Find URLs. Saves output to '{URL_LIST_DIR_NAME}/' relative to project root.",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter
@@ -104,6 +324,112 @@ if __name__ == "__main__":
         default=None,
         help="Optional: Domain restriction (e.g., 'example.com'). Auto-derived if None."
     )
+    parser.add_argument(
+        "--extract",
+        action="store_true",
+        help="Extract content and write Markdown during the crawl (single fetch per page)."
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="With --extract: skip pages unchanged since the last run and report added/changed/removed."
+    )
+    add_crawl_arguments(parser)
+    parser.add_argument(
+        "--job-dir",
+        default=None,
+        help="Directory for crawl checkpoints (request queue, seen-set, found URLs)."
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted crawl from --job-dir instead of starting over."
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Directory for the persistent HTTP response cache (disabled if not set)."
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve live Prometheus metrics on this port at /metrics."
+    )
+    parser.add_argument(
+        "--metrics-host",
+        default=DEFAULT_METRICS_HOST,
+        help="Address for --metrics-port to listen on (0.0.0.0 exposes it to other hosts)."
+    )
+    parser.add_argument(
+        "--stats-file",
+        default=None,
+        help="Periodically write a JSON metrics snapshot to this file."
+    )
+    parser.add_argument(
+        "--stats-interval",
+        type=float,
+        default=10,
+        help="Seconds between --stats-file updates."
+    )
+    parser.add_argument(
+        "--profile-extract",
+        type=int,
+        default=0,
+        metavar="N",
+        help="With --extract: cProfile every Nth page's parse + extraction into --profile-dir."
+    )
+    parser.add_argument(
+        "--profile-dir",
+        default="profiles",
+        help="Directory for extraction profiles (extract-<pid>.prof)."
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=OUTPUT_FORMATS,
+        default="markdown",
+        help="With --extract: one Markdown file per page, or one bulk JSON Lines file / tar or zip shards."
+    )
+    parser.add_argument(
+        "--output-path",
+        default=None,
+        help="File for the bulk output formats (default: output_folder/<domain>.<format>)."
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=DEFAULT_SHARD_SIZE,
+        help="Pages per tar/zip shard."
+    )
+    parser.add_argument(
+        "--max-body-mb",
+        type=float,
+        default=DEFAULT_MAX_BODY_BYTES / (1024 * 1024),
+        help="Abandon page downloads larger than this; non-HTML responses are dropped on "
+             "their headers. 0 = no size limit."
+    )
+    parser.add_argument(
+        "--near-duplicates",
+        action="store_true",
+        help="With --extract: write near-identical pages once, listing the others as aliases."
+    )
+    parser.add_argument(
+        "--near-duplicate-bits",
+        type=int,
+        default=DEFAULT_MAX_DISTANCE,
+        help="Content SimHash bits near-duplicates may differ in."
+    )
+    parser.add_argument(
+        "--adaptive-rate",
+        action="store_true",
+        help="Adapt each host's concurrency and delay to its latency and errors (AIMD) instead of AutoThrottle."
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help="With --adaptive-rate: most concurrent requests allowed to one host."
+    )
 
     args = parser.parse_args()
 
@@ -112,4 +438,28 @@ if __name__ == "__main__":
     abs_url_list_dir = os.path.join(project_root, URL_LIST_DIR_NAME)
     full_output_path = os.path.join(abs_url_list_dir, args.output)
 
-    run_spider(args.start_url, full_output_path, args.domain)
\ No newline at end of file
+    if args.extract:
+        try:
+            check_output_format(args.output_format)
+        except ImportError as e:
+            parser.error(str(e))
+
+    reporters = start_reporters(args.metrics_port, args.stats_file, args.stats_interval,
+                                metrics_host=args.metrics_host)
+    run_spider(args.start_url, full_output_path, args.domain, extract_content=args.extract,
+               incremental=args.incremental, cache_dir=args.cache_dir,
+               job_dir=args.job_dir, resume=args.resume, **crawl_options(args),
+               extra_settings={
+                   **crawl_settings(args),
+                   'EXTRACT_PROFILE_EVERY': args.profile_extract,
+                   'EXTRACT_PROFILE_DIR': os.path.abspath(args.profile_dir),
+                   'OUTPUT_FORMAT': args.output_format,
+                   'OUTPUT_PATH': os.path.abspath(args.output_path) if args.output_path else None,
+                   'OUTPUT_SHARD_SIZE': args.shard_size,
+                   'NEAR_DUPLICATES': args.near_duplicates,
+                   'NEAR_DUPLICATE_DISTANCE': args.near_duplicate_bits,
+               })
+    for reporter in reporters:
+        reporter.stop()
+    print("Stage timings:")
+    print(format_stage_summary())
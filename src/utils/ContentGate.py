@@ -0,0 +1,92 @@
+# src/utils/ContentGate.py
+import posixpath
+from collections import Counter
+from typing import Iterable, Optional
+from urllib.parse import urlsplit
+
+from src.utils.Metrics import METRICS
+
+# Links ending in these are never requested: documents, images, media, archives, binaries
+DEFAULT_SKIP_EXTENSIONS = (
+    # documents
+    'pdf', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'odt', 'ods', 'odp', 'rtf', 'epub',
+    # images
+    'jpg', 'jpeg', 'png', 'gif', 'bmp', 'tif', 'tiff', 'webp', 'svg', 'ico', 'psd', 'heic', 'avif',
+    # audio and video
+    'mp3', 'wav', 'ogg', 'flac', 'm4a', 'aac', 'mp4', 'm4v', 'mkv', 'webm', 'avi', 'mov', 'wmv',
+    'flv', 'mpg', 'mpeg', '3gp',
+    # archives and packages
+    'zip', 'gz', 'tgz', 'bz2', 'xz', 'zst', '7z', 'rar', 'tar', 'jar', 'war', 'deb', 'rpm',
+    'apk', 'dmg', 'iso', 'img',
+    # binaries, fonts and page assets
+    'exe', 'msi', 'bin', 'dll', 'so', 'woff', 'woff2', 'ttf', 'otf', 'eot', 'css', 'js', 'map',
+)
+# Content-Types worth extracting; responses that declare none are let through
+DEFAULT_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+# Largest page body downloaded; bigger responses are abandoned mid-transfer
+DEFAULT_MAX_BODY_BYTES = 10 * 1024 * 1024
+
+
+class ContentGate:
+    """
+    Decides which responses are worth downloading and extracting.
+
+    Checks run as early as possible, each returning a skip reason (or None):
+        extension      the URL path ends in a skipped extension (before any request)
+        content_type   the response's Content-Type is not an HTML type (on headers)
+        too_large      Content-Length, or the bytes streamed so far, exceed max_bytes
+
+    Skips are tallied in `skipped` and in the skipped_total metric,
+    labelled with `stage`. A max_bytes of 0 or an empty content_types
+    disables that check.
+    """
+
+    def __init__(self, skip_extensions: Iterable[str] = DEFAULT_SKIP_EXTENSIONS,
+                 content_types: Iterable[str] = DEFAULT_CONTENT_TYPES,
+                 max_bytes: int = DEFAULT_MAX_BODY_BYTES, stage: str = 'fetch'):
+        self.skip_extensions = frozenset(ext.lower().lstrip('.') for ext in skip_extensions)
+        self.content_types = frozenset(content_type.lower() for content_type in content_types)
+        self.max_bytes = max_bytes
+        self.stage = stage
+        self.skipped = Counter()
+
+    @classmethod
+    def from_settings(cls, settings, stage: str = 'crawl'):
+        """Builds a gate from Scrapy settings (CONTENT_GATE_* limits)."""
+        return cls(
+            skip_extensions=settings.getlist('CONTENT_GATE_SKIP_EXTENSIONS', list(DEFAULT_SKIP_EXTENSIONS)),
+            content_types=settings.getlist('CONTENT_GATE_TYPES', list(DEFAULT_CONTENT_TYPES)),
+            max_bytes=settings.getint('CONTENT_GATE_MAX_BYTES', DEFAULT_MAX_BODY_BYTES),
+            stage=stage,
+        )
+
+    def _skip(self, reason: str) -> str:
+        self.skipped[reason] += 1
+        METRICS.inc('skipped_total', stage=self.stage, reason=reason)
+        return reason
+
+    def check_url(self, url: str) -> Optional[str]:
+        """Skip reason for a URL before it is requested."""
+        extension = posixpath.splitext(urlsplit(url).path)[1][1:].lower()
+        if extension and extension in self.skip_extensions:
+            return self._skip('extension')
+        return None
+
+    def check_headers(self, content_type: Optional[str], content_length: Optional[int]) -> Optional[str]:
+        """Skip reason for a response once its headers arrive."""
+        if content_type and self.content_types:
+            mime_type = content_type.split(';', 1)[0].strip().lower()
+            if mime_type and mime_type not in self.content_types:
+                return self._skip('content_type')
+        if self.max_bytes and content_length is not None and content_length > self.max_bytes:
+            return self._skip('too_large')
+        return None
+
+    def check_size(self, received: int) -> Optional[str]:
+        """Skip reason once `received` body bytes have streamed in."""
+        if self.max_bytes and received > self.max_bytes:
+            return self._skip('too_large')
+        return None
+
+    def summary(self) -> str:
+        return ', '.join(f"{reason}: {count}" for reason, count in sorted(self.skipped.items())) or 'none'
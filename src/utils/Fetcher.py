@@ -0,0 +1,329 @@
+# src/utils/Fetcher.py
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Iterable, Iterator, NamedTuple, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from w3lib.encoding import http_content_type_encoding
+
+from src.utils.ContentGate import ContentGate
+from src.utils.Metrics import METRICS
+from src.utils.RateControl import AdaptiveRateController
+from src.utils.ResponseCache import ResponseCache
+
+# Status codes worth retrying: rate limiting and transient server errors.
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# Bytes read at a time from a gated (streamed) response body
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def host_key(url: str) -> str:
+    """
+    Host key for per-host concurrency limits and rate control; matches
+    Scrapy's download slot key (the hostname, without port or userinfo).
+    """
+    return urlparse(url).hostname or ''
+
+
+class Page(NamedTuple):
+    """
+    A fetched page body, left undecoded so the parser can read the bytes
+    directly. encoding is the charset from Content-Type, or None if the
+    server did not declare one (see WebpageExtractor.detect_encoding).
+    """
+    body: bytes
+    encoding: Optional[str] = None
+
+
+class SessionFetcher:
+    """
+    Blocking fetcher backed by a pooled requests.Session.
+
+    Connections are kept alive and reused across pages, so HTTPS sites pay
+    for one TLS handshake per pooled connection instead of one per page.
+    """
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None, timeout: float = 20,
+                 retries: int = 2, backoff: float = 0.5, max_connections: int = 10,
+                 cache: Optional[ResponseCache] = None, gate: Optional[ContentGate] = None,
+                 rate: Optional[AdaptiveRateController] = None):
+        """
+        Initializes the fetcher.
+
+        Args:
+            headers: Headers sent with every request.
+            timeout: Per-request timeout in seconds.
+            retries: Extra attempts after a connection error, timeout or retryable status.
+            backoff: Base delay in seconds; doubles on every retry.
+            max_connections: Size of the connection pool (and of fetch_many's thread pool).
+            cache: Optional ResponseCache. Cached pages are revalidated with
+                If-None-Match/If-Modified-Since and reused on a 304.
+            gate: Optional ContentGate. URLs with skipped extensions are not
+                requested; bodies are streamed so non-HTML and oversized
+                responses are dropped on their headers or mid-transfer.
+            rate: Optional AdaptiveRateController. Each request waits for a
+                slot on its host and reports its latency and status, so
+                per-host concurrency follows the server's health.
+        """
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_connections = max_connections
+        self.cache = cache
+        self.gate = gate
+        self.rate = rate
+
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _read_body(self, response: requests.Response) -> Optional[bytes]:
+        """
+        Reads the body, or with a gate streams it and returns None as soon
+        as the gate rejects the headers or the bytes received so far.
+        """
+        if self.gate is None:
+            return response.content
+        if 200 <= response.status_code < 300:
+            length = response.headers.get('content-length', '')
+            if self.gate.check_headers(response.headers.get('content-type'),
+                                       int(length) if length.isdigit() else None):
+                response.close()
+                return None
+        chunks = []
+        received = 0
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            received += len(chunk)
+            if self.gate.check_size(received):
+                response.close()
+                return None
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+    def _attempt(self, url: str) -> Tuple[Optional[Page], bool]:
+        """Performs a single GET. Returns (page, retryable)."""
+        entry = self.cache.get(url) if self.cache else None
+        start = time.perf_counter()
+        status = retry_after = None
+        try:
+            response = self.session.get(url, timeout=self.timeout, stream=self.gate is not None,
+                                        headers=ResponseCache.conditional_headers(entry))
+            status, retry_after = response.status_code, response.headers.get('retry-after')
+            body = self._read_body(response)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            METRICS.inc('errors_total', stage='fetch')
+            return None, True
+        except requests.exceptions.RequestException:
+            METRICS.inc('errors_total', stage='fetch')
+            return None, False
+        finally:
+            elapsed = time.perf_counter() - start
+            METRICS.observe('stage_seconds', elapsed, stage='fetch')
+            if self.rate is not None:
+                self.rate.release(host_key(url), elapsed, status, retry_after)
+        METRICS.inc('http_responses_total', stage='fetch', status=response.status_code)
+        if body is None:
+            # Skipped by the gate
+            return None, False
+        METRICS.inc('bytes_total', len(body), stage='fetch')
+
+        if response.status_code == 304 and entry:
+            body = ResponseCache.decoded_body(entry)
+            if body is not None:
+                content_type = CaseInsensitiveDict(entry['headers']).get('content-type')
+                return Page(body, entry['encoding'] or http_content_type_encoding(content_type)), False
+            # Cached body is unusable; drop it and fetch unconditionally next time.
+            self.cache.delete(url)
+            return None, True
+        if response.status_code in RETRY_STATUS_CODES:
+            return None, True
+        if not response.ok:
+            return None, False
+
+        encoding = http_content_type_encoding(response.headers.get('content-type'))
+        if self.cache:
+            self._store(url, response, body, encoding)
+        return Page(body, encoding), False
+
+    def _store(self, url: str, response: requests.Response, body: bytes, encoding: Optional[str]):
+        """Caches a response; requests has already removed any Content-Encoding."""
+        headers = {k: v for k, v in response.headers.items()
+                   if k.lower() not in ('content-encoding', 'content-length', 'transfer-encoding')}
+        self.cache.store(url, body, headers, status=response.status_code, encoding=encoding)
+
+    def _backoff_delay(self, attempt: int) -> float:
+        return self.backoff * (2 ** attempt)
+
+    def fetch(self, url: str) -> Optional[Page]:
+        """Fetches a page, retrying transient failures with exponential backoff."""
+        if self.gate is not None and self.gate.check_url(url):
+            return None
+        for attempt in range(self.retries + 1):
+            if self.rate is not None:
+                self.rate.acquire(host_key(url))
+            page, retryable = self._attempt(url)
+            if not retryable:
+                return page
+            if attempt < self.retries:
+                METRICS.inc('retries_total', stage='fetch')
+                time.sleep(self._backoff_delay(attempt))
+        return None
+
+    def fetch_many(self, urls: Iterable[str],
+                   max_pending: Optional[int] = None) -> Iterator[Tuple[str, Optional[Page]]]:
+        """
+        Fetches URLs concurrently, yielding (url, page) pairs in input order.
+
+        At most `max_pending` URLs are in flight; the next one is only
+        started once the caller consumes a result.
+        """
+        max_pending = max_pending or self.max_connections * 2
+        url_iter = iter(urls)
+        pending = deque()
+
+        with ThreadPoolExecutor(max_workers=self.max_connections) as pool:
+
+            def fill():
+                while len(pending) < max_pending:
+                    url = next(url_iter, None)
+                    if url is None:
+                        return
+                    pending.append((url, pool.submit(self.fetch, url)))
+                METRICS.set_gauge('queue_depth', len(pending), queue='fetch')
+
+            fill()
+            while pending:
+                url, future = pending.popleft()
+                page = future.result()
+                fill()
+                METRICS.set_gauge('queue_depth', len(pending), queue='fetch')
+                yield url, page
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncFetcher(SessionFetcher):
+    """
+    Fetch engine with a global connection cap and per-host limits,
+    scheduled by asyncio.
+
+    An event loop enforces the limits and waits out retry backoff and rate
+    control without tying up a thread. The HTTP calls themselves are still
+    blocking requests calls on the shared pooled session, run in a thread
+    pool of max_connections threads; this is not a native async HTTP client.
+    """
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None, timeout: float = 20,
+                 retries: int = 2, backoff: float = 0.5, max_connections: int = 16,
+                 per_host: int = 4, cache: Optional[ResponseCache] = None,
+                 gate: Optional[ContentGate] = None, rate: Optional[AdaptiveRateController] = None):
+        """
+        Initializes the fetcher.
+
+        Args:
+            per_host: Maximum concurrent requests to a single host, unless
+                `rate` is given and sets it per host instead.
+            Other arguments are as for SessionFetcher; max_connections is the global cap.
+        """
+        super().__init__(headers=headers, timeout=timeout, retries=retries,
+                         backoff=backoff, max_connections=max_connections, cache=cache, gate=gate, rate=rate)
+        self.per_host = per_host
+
+    async def _acquire_rate(self, host: str):
+        wait = self.rate.try_acquire(host)
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self.rate.try_acquire(host)
+
+    async def _fetch_async(self, url: str, executor: ThreadPoolExecutor,
+                           global_limit: asyncio.Semaphore,
+                           host_limits: Dict[str, asyncio.Semaphore]) -> Optional[Page]:
+        if self.gate is not None and self.gate.check_url(url):
+            return None
+        loop = asyncio.get_running_loop()
+        host = host_key(url)
+        per_host = self.per_host if self.rate is None else self.max_connections
+        host_limit = host_limits.setdefault(host, asyncio.Semaphore(per_host))
+
+        for attempt in range(self.retries + 1):
+            if self.rate is not None:
+                await self._acquire_rate(host)
+            async with host_limit, global_limit:
+                page, retryable = await loop.run_in_executor(executor, self._attempt, url)
+            if not retryable:
+                return page
+            if attempt < self.retries:
+                METRICS.inc('retries_total', stage='fetch')
+                await asyncio.sleep(self._backoff_delay(attempt))
+        return None
+
+    def fetch_many(self, urls: Iterable[str],
+                   max_pending: Optional[int] = None) -> Iterator[Tuple[str, Optional[Page]]]:
+        """
+        Fetches URLs on a background event loop, yielding (url, page) pairs in input order.
+
+        At most `max_pending` URLs are scheduled at once, which keeps memory
+        bounded when the consumer (e.g. extraction) is slower than the network.
+        """
+        max_pending = max_pending or self.max_connections * 2
+        url_iter = iter(urls)
+        pending = deque()
+
+        loop = asyncio.new_event_loop()
+        loop_thread = threading.Thread(target=loop.run_forever, daemon=True)
+        loop_thread.start()
+        executor = ThreadPoolExecutor(max_workers=self.max_connections)
+        global_limit = asyncio.Semaphore(self.max_connections)
+        host_limits: Dict[str, asyncio.Semaphore] = {}
+
+        def fill():
+            while len(pending) < max_pending:
+                url = next(url_iter, None)
+                if url is None:
+                    return
+                coro = self._fetch_async(url, executor, global_limit, host_limits)
+                pending.append((url, asyncio.run_coroutine_threadsafe(coro, loop)))
+            METRICS.set_gauge('queue_depth', len(pending), queue='fetch')
+
+        try:
+            fill()
+            while pending:
+                url, future = pending.popleft()
+                page = future.result()
+                fill()
+                METRICS.set_gauge('queue_depth', len(pending), queue='fetch')
+                yield url, page
+        finally:
+            for _, future in pending:
+                future.cancel()
+            loop.call_soon_threadsafe(loop.stop)
+            loop_thread.join()
+            loop.close()
+            executor.shutdown(wait=True)
+
+
+FETCH_ENGINES = {
+    'session': SessionFetcher,
+    'async': AsyncFetcher,
+}
+
+
+def create_fetcher(engine: str = 'session', **kwargs) -> SessionFetcher:
+    """Builds a fetcher by engine name ('session' or 'async')."""
+    try:
+        fetcher_cls = FETCH_ENGINES[engine]
+    except KeyError:
+        raise ValueError(f"Unknown fetch engine '{engine}'. Choose from: {', '.join(FETCH_ENGINES)}")
+    if fetcher_cls is SessionFetcher:
+        kwargs.pop('per_host', None)
+    return fetcher_cls(**kwargs)
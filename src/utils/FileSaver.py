@@ -1,6 +1,11 @@
 # src/utils/FileSaver.py
+import hashlib
 import os
+import re
 import sys
+from urllib.parse import unquote, urlparse
+
+from src.utils.Metrics import METRICS
 
 # --- Setup Project Path ---
 # Get the directory containing the 'src' directory (project root)
@@ -13,44 +18,157 @@ project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(_
 # Define output directory name relative to project root
 BASE_OUTPUT_DIR_NAME = "output_folder"
 
-def write_to_markdown(result, filename, domain: str = "unknown_domain"):
+# Characters kept as-is in output path segments; anything else becomes '_'
+_UNSAFE_SEGMENT_CHARS = re.compile(r'[^\w.\-]+')
+# Longer segments are truncated and suffixed with a hash (filesystems cap names at 255 bytes)
+MAX_SEGMENT_LENGTH = 100
+# Page extensions dropped before adding .md
+PAGE_EXTENSIONS = ('.html', '.htm')
+
+
+def _short_hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8', errors='surrogatepass')).hexdigest()[:8]
+
+
+def _safe_segment(segment: str) -> str:
+    """Makes one URL path segment safe to use as a file or directory name."""
+    segment = _UNSAFE_SEGMENT_CHARS.sub('_', unquote(segment))
+    if segment.startswith('.'):
+        segment = '_' + segment
+    if len(segment) > MAX_SEGMENT_LENGTH:
+        segment = f"{segment[:MAX_SEGMENT_LENGTH]}-{_short_hash(segment)}"
+    return segment
+
+
+def url_to_relpath(url: str) -> str:
     """
-    Writes the extraction result to a Markdown file within a domain-specific subfolder
-    located in the project root's output directory.
+    Maps a URL to a Markdown path mirroring its URL path, relative to the
+    domain folder: /docs/a/ -> docs/a/index.md, /docs/a/intro.html ->
+    docs/a/intro.md, /api/v1 -> api/v1.md. A query string adds a short
+    hash of it to the name (search.html?q=x -> search-1a2b3c4d.md), so
+    pages that differ only in their query do not overwrite each other.
+    """
+    parsed = urlparse(url)
+    segments = [_safe_segment(s) for s in parsed.path.split('/') if s not in ('', '.', '..')]
+    if not segments or parsed.path.endswith('/'):
+        segments.append('index')
+    name = segments[-1]
+    stem, ext = os.path.splitext(name)
+    if stem and ext.lower() in PAGE_EXTENSIONS:
+        name = stem
+    if parsed.query:
+        name = f"{name}-{_short_hash(parsed.query)}"
+    segments[-1] = f"{name}.md"
+    return os.path.join(*segments)
+
+
+def build_output_filename(url: str, index: int):
+    """
+    Derives the domain subfolder and Markdown path for a page URL.
 
     Args:
-        result: Dictionary containing 'url', 'title', 'content'.
-        filename: The base name for the output file (e.g., "extracted_site_1.md").
-        domain: The domain name used to create a subfolder (e.g., "aider.chat").
+        url: The page URL.
+        index: Position of the URL in the run, used for fallback names.
+
+    Returns:
+        Tuple of (domain_name, output path relative to the domain folder,
+        see url_to_relpath).
+    """
+    try:
+        parsed_uri = urlparse(url)
+        domain_name = parsed_uri.netloc if parsed_uri.netloc else "unknown_domain"
+        output_filename_base = url_to_relpath(url)
+    except Exception as e:
+        print(f"Warning: Error parsing URL '{url}' for filename generation: {e}")
+        domain_name = "parsing_error_domain"
+        output_filename_base = f"error_site_{index+1}.md"
+
+    return domain_name, output_filename_base
+
+def sanitize_filename(name):
+    """Removes potentially problematic characters for filenames."""
+    name = re.sub(r'^https?:\/\/', '', name)
+    name = name.replace('.', '_').replace('/', '_')
+    name = re.sub(r'[^\w\-]+', '', name)
+    return name or "default"
+
+def get_domain_output_dir(domain: str, base_dir: str = None) -> str:
+    """
+    Returns the absolute output folder for a domain (not created), under
+    base_dir if given, else the project root's output folder.
     """
     # Construct the absolute path to the base output directory in the project root
-    base_output_dir_abs = os.path.join(project_root, BASE_OUTPUT_DIR_NAME)
+    base_output_dir_abs = base_dir or os.path.join(project_root, BASE_OUTPUT_DIR_NAME)
 
     safe_domain_folder = domain if domain else "unknown_domain"
+    return os.path.join(base_output_dir_abs, safe_domain_folder)
 
-    # Create the full path including the domain subfolder within the absolute base dir
-    domain_output_dir = os.path.join(base_output_dir_abs, safe_domain_folder)
-    try:
-        os.makedirs(domain_output_dir, exist_ok=True) # Ensure the domain folder exists
-    except OSError as e:
-        print(f"Error creating directory {domain_output_dir}: {e}")
-        return # Stop if we can't create the directory
-
-    # Construct the final absolute file path within the domain subfolder
-    output_filepath = os.path.join(domain_output_dir, os.path.basename(filename))
+def render_markdown(result):
+    """
+    Renders an extraction result as Markdown with YAML front-matter.
 
-    if result and result.get('content'):
-        markdown_content = f"""---
+    Returns:
+        The Markdown text, or None if the result has no content.
+    """
+    if not result or not result.get('content'):
+        return None
+    return f"""---
 site_url: "{result.get('url', 'N/A')}"
 title: "{result.get('title', 'Not Found')}"
 ---
 
 {result['content']}
 """
+
+def add_front_matter_aliases(markdown: str, aliases) -> str:
+    """
+    Lists `aliases` (URLs of near-duplicate pages) under 'aliases:' in the
+    front-matter written by render_markdown. URLs already listed are skipped.
+    """
+    end = markdown.find('\n---\n', 3)
+    if not markdown.startswith('---\n') or end < 0:
+        return markdown
+    front, body = markdown[:end + 1], markdown[end + 1:]
+    new_lines = [f'  - "{alias}"\n' for alias in aliases]
+    new_lines = [line for line in dict.fromkeys(new_lines) if line not in front]
+    if not new_lines:
+        return markdown
+    if '\naliases:\n' not in front:
+        front += 'aliases:\n'
+    return front + ''.join(new_lines) + body
+
+def write_to_markdown(result, filename, domain: str = "unknown_domain", base_dir: str = None):
+    """
+    Writes the extraction result to a Markdown file within a domain-specific subfolder
+    located in the project root's output directory.
+
+    Args:
+        result: Dictionary containing 'url', 'title', 'content'.
+        filename: The output path relative to the domain folder (e.g., "docs/intro.md"),
+            as returned by build_output_filename.
+        domain: The domain name used to create a subfolder (e.g., "aider.chat").
+        base_dir: Optional output root replacing the project's output folder.
+
+    Returns:
+        The absolute path of the written file, or None if nothing was written.
+    """
+    # Construct the final absolute file path within the domain subfolder
+    output_filepath = os.path.join(get_domain_output_dir(domain, base_dir), filename)
+    output_dir = os.path.dirname(output_filepath)
+    try:
+        os.makedirs(output_dir, exist_ok=True) # Ensure the folder exists
+    except OSError as e:
+        print(f"Error creating directory {output_dir}: {e}")
+        return None # Stop if we can't create the directory
+
+    markdown_content = render_markdown(result)
+    if markdown_content:
         try:
-            with open(output_filepath, "w", encoding="utf-8") as f:
+            with METRICS.timer(stage='write'), open(output_filepath, "w", encoding="utf-8") as f:
                 f.write(markdown_content)
+                METRICS.inc('bytes_total', f.tell(), stage='write')
             print(f"Saved output to {output_filepath}") # Use the absolute path
+            return output_filepath
         except IOError as e:
             print(f"Error: Could not save file {output_filepath}: {e}")
         except Exception as e:
@@ -58,4 +176,5 @@ title: "{result.get('title', 'Not Found')}"
     elif result:
          print(f"No content extracted for URL: {result.get('url', 'N/A')}. Skipping file save.")
     else:
-        print("Error: Invalid result object passed. Skipping file save.")
\ No newline at end of file
+        print("Error: Invalid result object passed. Skipping file save.")
+    return None
@@ -0,0 +1,193 @@
+# src/utils/Manifest.py
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+from src.utils.FileSaver import get_domain_output_dir
+
+MANIFEST_FILENAME = ".manifest.json"
+# Crawl close reasons for a crawl stopped by its page or time budget: pages it
+# did not reach may still exist, so they are kept rather than removed
+BUDGET_CLOSE_REASONS = ('closespider_itemcount', 'closespider_pagecount', 'closespider_timeout')
+
+
+def content_hash(content: Union[str, bytes]) -> str:
+    """SHA-256 hex digest of a body (text is hashed as UTF-8)."""
+    if isinstance(content, str):
+        content = content.encode('utf-8', errors='surrogatepass')
+    return hashlib.sha256(content).hexdigest()
+
+
+class Manifest:
+    """
+    Per-domain record of what the last runs fetched and wrote.
+
+    Stored as `.manifest.json` inside the domain's output folder, mapping
+    each URL to the hash of its fetched HTML ('content_hash'), the hash of
+    the Markdown written for it ('extracted_hash'), the output path
+    (relative to the domain folder), when it was last seen, and its change
+    history: the number of runs that saw it ('runs') and how many of them
+    found different HTML ('change_count', 'last_changed'). Pages written
+    with near-duplicate detection also keep their content SimHash
+    ('simhash'); near-duplicates collapsed into another page's file name
+    that page ('alias_of') and share its output path.
+
+    Incremental runs use it to skip extraction for identical HTML and to
+    skip rewriting Markdown that would come out byte-for-byte the same, so
+    only files that actually changed get touched on disk.
+    """
+
+    def __init__(self, domain: str):
+        self.domain = domain
+        self.domain_dir = get_domain_output_dir(domain)
+        self.path = os.path.join(self.domain_dir, MANIFEST_FILENAME)
+        self.pages: Dict[str, Dict] = {}
+        self.previous_urls = set()
+        self.seen = set()
+        self.written = set()
+        self._output_owners = None
+
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.pages = json.load(f).get('pages', {})
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Warning: Ignoring unreadable manifest {self.path}: {e}")
+                self.pages = {}
+        self.previous_urls = set(self.pages)
+
+    def _output_exists(self, entry: Dict) -> bool:
+        output_path = entry.get('output_path')
+        return bool(output_path) and os.path.exists(os.path.join(self.domain_dir, output_path))
+
+    def output_owner(self, output_path: str) -> Optional[str]:
+        """The URL whose output the previous run wrote to output_path (relative to the domain folder)."""
+        if self._output_owners is None:
+            # Near-duplicates share their canonical page's file but never own it
+            self._output_owners = {}
+            for url, entry in self.pages.items():
+                if entry.get('output_path') and not entry.get('alias_of'):
+                    self._output_owners.setdefault(os.path.normpath(entry['output_path']), url)
+        return self._output_owners.get(os.path.normpath(output_path))
+
+    def mark_seen(self, url: str):
+        entry = self.pages.setdefault(url, {})
+        if url not in self.seen:
+            self.seen.add(url)
+            entry['runs'] = entry.get('runs', 0) + 1
+        entry['last_seen'] = time.time()
+
+    def body_unchanged(self, url: str, html_content: Union[str, bytes]) -> bool:
+        """
+        Records the fetched HTML for a URL and reports whether it matches the
+        previous run (and that run's output file still exists).
+        """
+        new_hash = content_hash(html_content)
+        entry = self.pages.get(url, {})
+        unchanged = entry.get('content_hash') == new_hash and self._output_exists(entry)
+        self.mark_seen(url)
+        entry = self.pages[url]
+        if entry.get('content_hash') not in (None, new_hash):
+            entry['change_count'] = entry.get('change_count', 0) + 1
+            entry['last_changed'] = entry['last_seen']
+        entry['content_hash'] = new_hash
+        return unchanged
+
+    def output_unchanged(self, url: str, markdown_content: str) -> bool:
+        """Reports whether the rendered Markdown matches what is already on disk."""
+        entry = self.pages.get(url, {})
+        return (entry.get('extracted_hash') == content_hash(markdown_content)
+                and self._output_exists(entry))
+
+    def record_output(self, url: str, output_path: str, markdown_content: str):
+        self.mark_seen(url)
+        self.written.add(url)
+        self.pages[url]['extracted_hash'] = content_hash(markdown_content)
+        self.pages[url]['output_path'] = os.path.relpath(output_path, self.domain_dir)
+
+    def record_fingerprint(self, url: str, fingerprint: Optional[int]):
+        """Stores the content SimHash of a page with a file of its own (None: it has none)."""
+        entry = self.pages.setdefault(url, {})
+        if fingerprint is None:
+            entry.pop('simhash', None)
+        else:
+            entry['simhash'] = fingerprint
+
+    def record_alias(self, url: str, canonical: Optional[str]):
+        """Marks url as a near-duplicate written into canonical's file (None: it has a file of its own)."""
+        entry = self.pages.setdefault(url, {})
+        if canonical is None:
+            entry.pop('alias_of', None)
+        else:
+            entry['alias_of'] = canonical
+
+    def fingerprints(self) -> Iterator[Tuple[str, str, int]]:
+        """(url, output_path, simhash) for each recorded page whose file still exists."""
+        for url, entry in self.pages.items():
+            if entry.get('simhash') is not None and self._output_exists(entry):
+                yield url, entry['output_path'], entry['simhash']
+
+    def summary(self, removals: bool = True) -> Dict[str, list]:
+        """
+        Classifies this run's URLs as added, changed, unchanged or removed
+        (only with removals: after a crawl that saw every page).
+        """
+        added = sorted(u for u in self.seen if u not in self.previous_urls)
+        changed = sorted(u for u in self.written if u in self.previous_urls)
+        unchanged = sorted(u for u in self.seen
+                           if u in self.previous_urls and u not in self.written)
+        removed = sorted(self.previous_urls - self.seen) if removals else []
+        return {'added': added, 'changed': changed, 'unchanged': unchanged, 'removed': removed}
+
+    def save(self, removals: bool = True):
+        """Writes the manifest, dropping URLs that were not seen this run (only with removals)."""
+        if removals:
+            for url in self.previous_urls - self.seen:
+                self.pages.pop(url, None)
+        try:
+            os.makedirs(self.domain_dir, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'pages': self.pages}, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error: Could not save manifest {self.path}: {e}")
+
+
+class ManifestSet(dict):
+    """Lazily loads one Manifest per domain: manifests[domain]."""
+
+    def __missing__(self, domain: str) -> Manifest:
+        manifest = self[domain] = Manifest(domain)
+        return manifest
+
+    def save_all(self, removals: bool = True):
+        for manifest in self.values():
+            manifest.save(removals)
+
+    def report(self, removals: bool = True):
+        """Prints added/changed/unchanged/removed counts and lists removed pages."""
+        for domain, manifest in sorted(self.items()):
+            summary = manifest.summary(removals)
+            removed = len(summary['removed']) if removals else "not checked"
+            print(f"[{domain}] added: {len(summary['added'])}, changed: {len(summary['changed'])}, "
+                  f"unchanged: {len(summary['unchanged'])}, removed: {removed}")
+            for url in summary['removed']:
+                print(f"  removed: {url}")
+
+    def finish(self, close_reason: Optional[str] = 'finished'):
+        """
+        Saves and reports every manifest once the crawl that listed the
+        pages has closed for close_reason. Only a finished crawl saw every
+        page, so only then are unseen pages removed; after a budget stop
+        they are kept. After any other stop (interrupted, failed: None) the
+        pages this run did not reach would look removed, so nothing is saved.
+        """
+        if close_reason != 'finished' and close_reason not in BUDGET_CLOSE_REASONS:
+            print(f"Crawl did not finish ({close_reason or 'failed'}); incremental manifests not updated.")
+            return
+        removals = close_reason == 'finished'
+        self.save_all(removals)
+        self.report(removals)
@@ -0,0 +1,367 @@
+# src/utils/Metrics.py
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+METRIC_PREFIX = "site_scraper_"
+
+# Address the Prometheus endpoint listens on; use 0.0.0.0 to expose it to other hosts
+DEFAULT_METRICS_HOST = '127.0.0.1'
+
+# Histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_HELP = {
+    'stage_seconds': "Time spent per page in each stage (crawl_download, fetch, parse, extract, write).",
+    'bytes_total': "Bytes downloaded (crawl, fetch) or written (write).",
+    'http_responses_total': "HTTP responses by stage and status code.",
+    'retries_total': "Retried requests by stage.",
+    'errors_total': "Failed fetches and extractions by stage.",
+    'skipped_total': "Responses skipped before or during download, by stage and reason.",
+    'host_concurrency': "Concurrent requests the adaptive rate controller allows per host.",
+    'host_delay_seconds': "Delay between requests the adaptive rate controller applies per host.",
+    'near_duplicates_total': "Pages collapsed into an earlier page with near-identical content.",
+    'queue_depth': "Items waiting in a queue (fetch, extract, crawl_scheduler, crawl_inflight).",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+class Metrics:
+    """
+    Thread-safe registry of counters, gauges and histograms.
+
+    Components record into the module-level METRICS registry; reporters
+    read it as a JSON snapshot or Prometheus text. Extraction worker
+    processes have their own registry and hand it back with drain(), which
+    the parent folds in with merge().
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        # name -> labels -> [per-bucket counts (+ overflow), sum, count, max]
+        self._histograms: Dict[str, Dict[LabelKey, list]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _label_key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            entry = series.get(key)
+            if entry is None:
+                entry = series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0, 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+            entry[3] = max(entry[3], value)
+
+    @contextmanager
+    def timer(self, name: str = 'stage_seconds', **labels):
+        """Observes the duration of the with-block, e.g. timer(stage='write')."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def state(self) -> Dict[str, Any]:
+        """Picklable copy of the raw series, for merge() in another process."""
+        with self._lock:
+            return {
+                'counters': {n: dict(s) for n, s in self._counters.items()},
+                'gauges': {n: dict(s) for n, s in self._gauges.items()},
+                'histograms': {n: {k: [list(e[0]), e[1], e[2], e[3]] for k, e in s.items()}
+                               for n, s in self._histograms.items()},
+            }
+
+    def drain(self) -> Dict[str, Any]:
+        """Returns state() and resets the counters and histograms."""
+        state = self.state()
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+        return state
+
+    def reset(self):
+        """Clears every series (e.g. the copy a forked worker inherits from its parent)."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def merge(self, state: Dict[str, Any]):
+        """Adds another registry's counters and histograms; its gauges overwrite ours."""
+        with self._lock:
+            for name, series in state.get('counters', {}).items():
+                ours = self._counters.setdefault(name, {})
+                for key, value in series.items():
+                    ours[key] = ours.get(key, 0.0) + value
+            for name, series in state.get('gauges', {}).items():
+                self._gauges.setdefault(name, {}).update(series)
+            for name, series in state.get('histograms', {}).items():
+                ours = self._histograms.setdefault(name, {})
+                for key, (counts, total, count, maximum) in series.items():
+                    entry = ours.get(key)
+                    if entry is None:
+                        ours[key] = [list(counts), total, count, maximum]
+                        continue
+                    entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                    entry[1] += total
+                    entry[2] += count
+                    entry[3] = max(entry[3], maximum)
+
+    def _quantile(self, entry: list, q: float) -> float:
+        """
+        Estimates the q-quantile by linear interpolation inside the bucket
+        holding it (as Prometheus' histogram_quantile does), with the
+        largest observation as the upper bound of the last bucket reached.
+        """
+        counts, _, count, maximum = entry
+        if not count:
+            return 0.0
+        target = q * count
+        cumulative = 0
+        lower = 0.0
+        for bound, bucket_count in zip(self.buckets + (maximum,), counts):
+            if bucket_count and cumulative + bucket_count >= target:
+                upper = min(bound, maximum)
+                return lower + (upper - lower) * (target - cumulative) / bucket_count
+            cumulative += bucket_count
+            lower = bound
+        return maximum
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-friendly view: series are keyed by their label string, e.g. 'stage="fetch"'."""
+        state = self.state()
+
+        def label_string(key):
+            return _format_labels(key)[1:-1] or 'total'
+
+        snapshot = {'time': time.time(), 'counters': {}, 'gauges': {}, 'histograms': {}}
+        for kind in ('counters', 'gauges'):
+            for name, series in state[kind].items():
+                snapshot[kind][name] = {label_string(k): v for k, v in series.items()}
+        for name, series in state['histograms'].items():
+            snapshot['histograms'][name] = {
+                label_string(k): {
+                    'count': e[2],
+                    'sum': round(e[1], 6),
+                    'p50': round(self._quantile(e, 0.5), 6),
+                    'p99': round(self._quantile(e, 0.99), 6),
+                    'max': round(e[3], 6),
+                } for k, e in series.items()
+            }
+        return snapshot
+
+    def to_prometheus(self) -> str:
+        """Renders all series in the Prometheus text exposition format."""
+        state = self.state()
+        lines = []
+
+        def header(name, kind):
+            full_name = METRIC_PREFIX + name
+            if name in METRIC_HELP:
+                lines.append(f"# HELP {full_name} {METRIC_HELP[name]}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            return full_name
+
+        for name, series in sorted(state['counters'].items()):
+            full_name = header(name, 'counter')
+            for key, value in sorted(series.items()):
+                lines.append(f"{full_name}{_format_labels(key)} {value:g}")
+        for name, series in sorted(state['gauges'].items()):
+            full_name = header(name, 'gauge')
+            for key, value in sorted(series.items()):
+                lines.append(f"{full_name}{_format_labels(key)} {value:g}")
+        for name, series in sorted(state['histograms'].items()):
+            full_name = header(name, 'histogram')
+            for key, (counts, total, count, _) in sorted(series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{full_name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {cumulative}")
+                lines.append(f"{full_name}_bucket{_format_labels(key, ('le', '+Inf'))} {count}")
+                lines.append(f"{full_name}_sum{_format_labels(key)} {total:g}")
+                lines.append(f"{full_name}_count{_format_labels(key)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry used by the fetchers, extractor, pipeline and Scrapy extension
+METRICS = Metrics()
+
+
+class MetricsServer:
+    """Serves GET /metrics in Prometheus text format from a background thread."""
+
+    def __init__(self, metrics: Metrics, port: int, host: str = DEFAULT_METRICS_HOST):
+        registry = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class StatsFileWriter:
+    """Rewrites a JSON snapshot of the registry every `interval` seconds, and once more on stop()."""
+
+    def __init__(self, metrics: Metrics, path: str, interval: float = 10.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.metrics.snapshot(), f, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Warning: Could not write stats file {self.path}: {e}")
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.write()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        self.write()
+
+
+class SamplingProfiler:
+    """
+    cProfile for every `every`-th call of a stage, accumulated per process.
+
+    After each sampled call the cumulative stats are dumped to
+    `<output_dir>/<name>-<pid>.prof` (inspect with `python -m pstats`, or
+    combine several processes with pstats.Stats(file1, file2, ...)).
+    """
+
+    def __init__(self, output_dir: str, every: int = 10, name: str = 'extract'):
+        self.output_dir = output_dir
+        self.every = max(1, every)
+        self.name = name
+        self._calls = 0
+        self._profile = None
+
+    def __getstate__(self):
+        # Worker processes start their own profile
+        state = self.__dict__.copy()
+        state['_calls'] = 0
+        state['_profile'] = None
+        return state
+
+    @contextmanager
+    def profile(self):
+        self._calls += 1
+        if self._calls % self.every:
+            yield
+            return
+        if self._profile is None:
+            self._profile = cProfile.Profile()
+        self._profile.enable()
+        try:
+            yield
+        finally:
+            self._profile.disable()
+            os.makedirs(self.output_dir, exist_ok=True)
+            self._profile.dump_stats(os.path.join(self.output_dir, f"{self.name}-{os.getpid()}.prof"))
+
+
+def format_stage_summary(metrics: Metrics = METRICS, snapshot: Optional[Dict[str, Any]] = None) -> str:
+    """
+    One line per stage with page count, total time and p50/p99 latency,
+    from `snapshot` (e.g. a loaded stats file) if given, else from `metrics`.
+    """
+    stages = (snapshot or metrics.snapshot())['histograms'].get('stage_seconds', {})
+    lines = []
+    for label, h in sorted(stages.items()):
+        stage = label.split('"')[1] if '"' in label else label
+        lines.append(f"  {stage:<15} {h['count']:>7} pages  {h['sum']:9.2f}s total  "
+                     f"p50 {h['p50'] * 1000:8.1f} ms  p99 {h['p99'] * 1000:8.1f} ms")
+    return '\n'.join(lines)
+
+
+def format_series_summary(snapshot: Dict[str, Any], kind: str) -> str:
+    """One line per series of a snapshot's 'counters' or 'gauges', e.g. 'errors_total{stage="fetch"} 3'."""
+    lines = []
+    for name, series in sorted(snapshot.get(kind, {}).items()):
+        for label, value in sorted(series.items()):
+            labels = '' if label == 'total' else '{' + label + '}'
+            lines.append(f"  {name}{labels} {value:g}")
+    return '\n'.join(lines)
+
+
+def start_reporters(metrics_port: Optional[int] = None, stats_file: Optional[str] = None,
+                    interval: float = 10.0, metrics: Metrics = METRICS,
+                    metrics_host: str = DEFAULT_METRICS_HOST) -> list:
+    """Starts the requested reporters; call stop() on each when the run ends."""
+    reporters = []
+    if metrics_port is not None:
+        server = MetricsServer(metrics, metrics_port, metrics_host)
+        print(f"Serving Prometheus metrics on http://{metrics_host}:{server.port}/metrics")
+        reporters.append(server)
+    if stats_file:
+        reporters.append(StatsFileWriter(metrics, stats_file, interval))
+    return reporters
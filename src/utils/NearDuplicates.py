@@ -0,0 +1,87 @@
+# src/utils/NearDuplicates.py
+import hashlib
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+SIMHASH_BITS = 64
+# Words per shingle
+SHINGLE_SIZE = 3
+# Fingerprints at most this many bits apart count as near-duplicates
+DEFAULT_MAX_DISTANCE = 3
+
+_WORD = re.compile(r'\w+')
+
+
+def _shingle_hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8', errors='surrogatepass'),
+                                          digest_size=8).digest(), 'big')
+
+
+def simhash(text: Optional[str], shingle_size: int = SHINGLE_SIZE) -> int:
+    """
+    64-bit SimHash of a text over its overlapping word shingles.
+
+    Each shingle votes on every bit with its own hash; the fingerprint keeps
+    the bits most shingles set. Texts that share most of their shingles get
+    fingerprints a few bits apart, so boilerplate-heavy variants of a page
+    (print views, tracking parameters, paginated copies) stay close while
+    different pages land about 32 bits apart. Case and punctuation are
+    ignored.
+    """
+    words = _WORD.findall((text or '').lower())
+    if len(words) > shingle_size:
+        shingles = [' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+    else:
+        shingles = [' '.join(words)]
+    # One bit string per shingle; zip(*) turns them into per-bit columns
+    rows = [format(_shingle_hash(shingle), '064b') for shingle in shingles]
+    threshold = len(rows) / 2
+    fingerprint = 0
+    for column in zip(*rows):
+        fingerprint = (fingerprint << 1) | (column.count('1') > threshold)
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class NearDuplicateIndex:
+    """
+    Finds earlier pages whose SimHash is within `max_distance` bits of a
+    new one.
+
+    The 64 bits are split into max_distance + 1 bands; two fingerprints
+    that differ in at most max_distance bits agree exactly on at least one
+    band, so a lookup only compares against pages sharing a band value
+    instead of every page seen so far.
+    """
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE):
+        if not 0 <= max_distance < SIMHASH_BITS // 4:
+            raise ValueError(f"max_distance must be between 0 and {SIMHASH_BITS // 4 - 1}.")
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        width, extra = divmod(SIMHASH_BITS, bands)
+        self._bands: List[Tuple[int, int]] = []  # (shift, mask) per band
+        shift = 0
+        for band in range(bands):
+            band_width = width + (1 if band < extra else 0)
+            self._bands.append((shift, (1 << band_width) - 1))
+            shift += band_width
+        self._buckets: List[Dict[int, List[Tuple[int, Any]]]] = [{} for _ in self._bands]
+        self.size = 0
+
+    def find(self, fingerprint: int) -> Optional[Any]:
+        """The key of an indexed page within max_distance bits, or None."""
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            for other, key in buckets.get((fingerprint >> shift) & mask, ()):
+                if hamming_distance(fingerprint, other) <= self.max_distance:
+                    return key
+        return None
+
+    def add(self, fingerprint: int, key: Any):
+        """Indexes a page under `key`, returned by later find() calls."""
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            buckets.setdefault((fingerprint >> shift) & mask, []).append((fingerprint, key))
+        self.size += 1
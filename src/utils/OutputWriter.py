@@ -0,0 +1,526 @@
+# src/utils/OutputWriter.py
+import gzip
+import hashlib
+import io
+import json
+import os
+import queue
+import re
+import tarfile
+import threading
+import time
+import zipfile
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from src.utils.FileSaver import (add_front_matter_aliases, build_output_filename, get_domain_output_dir,
+                                 project_root, BASE_OUTPUT_DIR_NAME, render_markdown)
+from src.utils.Metrics import METRICS
+from src.utils.NearDuplicates import simhash
+
+# --output-format choices; everything but 'markdown' goes to one bulk file (or shards)
+OUTPUT_FORMATS = ('markdown', 'jsonl', 'jsonl.gz', 'jsonl.zst', 'tar', 'zip')
+# Pages per tar/zip shard
+DEFAULT_SHARD_SIZE = 10000
+# Pages handed to the sink per batch, and the wait before a partial batch is flushed
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_FLUSH_INTERVAL = 1.0
+# Pages waiting for the writer thread before write() blocks the caller
+DEFAULT_MAX_PENDING = 4096
+# Archive member listing near-duplicate aliases, one {"url", "path", "aliases"} line per canonical page
+ALIASES_MEMBER = 'aliases.jsonl'
+
+_STOP = object()
+_SITE_URL_LINE = re.compile(r'^site_url: "(.*)"$', re.MULTILINE)
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("jsonl.zst output needs the 'zstandard' package "
+                          "(pip install zstandard).") from None
+    return zstandard
+
+
+def check_output_format(output_format: str):
+    """Raises ImportError early if an output format's optional dependency is missing."""
+    if output_format == 'jsonl.zst':
+        _import_zstandard()
+
+
+class OutputRecord(NamedTuple):
+    url: str
+    title: Optional[str]
+    domain: str
+    relpath: str  # relative to the domain folder, e.g. docs/intro.md
+    markdown: str
+    # URLs of near-duplicates collapsed into this page (alias entries only)
+    aliases: Tuple[str, ...] = ()
+
+
+def _alias_line(record: OutputRecord) -> bytes:
+    return json.dumps({
+        'url': record.url,
+        'path': f"{record.domain}/{record.relpath.replace(os.sep, '/')}",
+        'aliases': list(record.aliases),
+    }, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+class MarkdownTreeSink:
+    """
+    One Markdown file per page under <base_dir>/<domain>/<relpath>, the
+    layout write_to_markdown produces. Folders are created once per run.
+    """
+
+    def __init__(self, base_dir: Optional[str] = None):
+        self.base_dir = base_dir
+        self.path = base_dir or os.path.join(project_root, BASE_OUTPUT_DIR_NAME)
+        self._created_dirs = set()
+
+    def location(self, record: OutputRecord) -> str:
+        return os.path.join(get_domain_output_dir(record.domain, self.base_dir), record.relpath)
+
+    def write(self, record: OutputRecord) -> int:
+        path = self.location(record)
+        directory = os.path.dirname(path)
+        if directory not in self._created_dirs:
+            os.makedirs(directory, exist_ok=True)
+            self._created_dirs.add(directory)
+        data = record.markdown.encode('utf-8')
+        with open(path, 'wb') as f:
+            f.write(data)
+        return len(data)
+
+    def write_aliases(self, records: List[OutputRecord]):
+        """Adds each canonical page's aliases to the front-matter of its file."""
+        for record in records:
+            path = self.location(record)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    markdown = f.read()
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(add_front_matter_aliases(markdown, record.aliases))
+            except OSError as e:
+                print(f"Error: Could not add aliases to {path}: {e}")
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class JsonlSink:
+    """
+    All pages in one JSON Lines file, one {"url", "title", "path",
+    "markdown"} object per line, optionally gzip or zstd compressed.
+    zstd needs the optional 'zstandard' package.
+    """
+
+    def __init__(self, path: str, compression: Optional[str] = None):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if compression == 'zstd':
+            zstandard = _import_zstandard()
+            self._raw = open(path, 'wb')
+            self._file = zstandard.ZstdCompressor(level=3).stream_writer(self._raw)
+        elif compression == 'gzip':
+            self._raw = open(path, 'wb')
+            self._file = gzip.GzipFile(fileobj=self._raw, mode='wb', compresslevel=6)
+        elif compression is None:
+            self._raw = self._file = open(path, 'wb')
+        else:
+            raise ValueError(f"Unknown compression '{compression}'.")
+
+    def location(self, record: OutputRecord) -> str:
+        return self.path
+
+    def write(self, record: OutputRecord) -> int:
+        line = json.dumps({
+            'url': record.url,
+            'title': record.title,
+            'path': f"{record.domain}/{record.relpath}",
+            'markdown': record.markdown,
+        }, ensure_ascii=False).encode('utf-8') + b'\n'
+        self._file.write(line)
+        return len(line)
+
+    def write_aliases(self, records: List[OutputRecord]):
+        """Appends one {"url", "path", "aliases"} line per canonical page."""
+        for record in records:
+            self._file.write(_alias_line(record))
+
+    def flush(self):
+        self._file.flush()
+        self._raw.flush()
+
+    def close(self):
+        self._file.close()
+        if not self._raw.closed:
+            self._raw.close()
+
+
+class ArchiveShardSink:
+    """
+    Pages as <domain>/<relpath> members of tar or zip archives, starting a
+    new shard every `shard_size` pages: site.tar -> site-00000.tar,
+    site-00001.tar, ...
+    """
+
+    def __init__(self, path: str, archive_format: str = 'tar', shard_size: int = DEFAULT_SHARD_SIZE):
+        if archive_format not in ('tar', 'zip'):
+            raise ValueError(f"Unknown archive format '{archive_format}'.")
+        self.archive_format = archive_format
+        self.shard_size = max(1, shard_size)
+        self.path = path
+        self._base, self._ext = os.path.splitext(path)
+        self._ext = self._ext or f".{archive_format}"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.shard_index = -1
+        self._archive = None
+        self._members = 0
+        # URL -> shard assigned by location(), so callers learn the right
+        # shard before the writer thread has rotated to it
+        self._assigned: Dict[str, int] = {}
+        self._open_shard()
+
+    @property
+    def shard_path(self) -> str:
+        return self._shard_path(self.shard_index)
+
+    def _shard_path(self, index: int) -> str:
+        return f"{self._base}-{index:05d}{self._ext}"
+
+    def _open_shard(self):
+        self.close()
+        self.shard_index += 1
+        self._members = 0
+        if self.archive_format == 'tar':
+            self._archive = tarfile.open(self.shard_path, 'w')
+        else:
+            self._archive = zipfile.ZipFile(self.shard_path, 'w', compression=zipfile.ZIP_DEFLATED)
+
+    def location(self, record: OutputRecord) -> str:
+        shard = self._assigned.get(record.url)
+        if shard is None:
+            shard = self._assigned[record.url] = len(self._assigned) // self.shard_size
+        return self._shard_path(shard)
+
+    def write(self, record: OutputRecord) -> int:
+        shard = self._assigned.get(record.url)
+        if shard is None:
+            shard = self.shard_index + (self._members >= self.shard_size)
+        while self.shard_index < shard:
+            self._open_shard()
+        data = record.markdown.encode('utf-8')
+        self._add_member(f"{record.domain}/{record.relpath.replace(os.sep, '/')}", data)
+        self._members += 1
+        return len(data)
+
+    def _add_member(self, name: str, data: bytes):
+        if self.archive_format == 'tar':
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            self._archive.addfile(info, io.BytesIO(data))
+        else:
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            self._archive.writestr(info, data)
+
+    def write_aliases(self, records: List[OutputRecord]):
+        """Adds an aliases.jsonl member to the last shard, one line per canonical page."""
+        self._add_member(ALIASES_MEMBER, b''.join(_alias_line(record) for record in records))
+
+    def flush(self):
+        if self.archive_format == 'tar':
+            self._archive.fileobj.flush()
+
+    def close(self):
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+
+
+def default_output_path(output_format: str, name: str, base_dir: Optional[str] = None) -> str:
+    """Bulk output file for a run named `name`, e.g. output_folder/example_com.jsonl.zst."""
+    base_dir = base_dir or os.path.join(project_root, BASE_OUTPUT_DIR_NAME)
+    return os.path.join(base_dir, f"{name}.{output_format}")
+
+
+def create_sink(output_format: str = 'markdown', output_path: Optional[str] = None,
+                base_dir: Optional[str] = None, shard_size: int = DEFAULT_SHARD_SIZE):
+    """
+    Builds the sink for an --output-format. Bulk formats write to
+    output_path (see default_output_path); 'markdown' writes the per-page
+    tree under base_dir.
+    """
+    if output_format == 'markdown':
+        return MarkdownTreeSink(base_dir)
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}', expected one of {OUTPUT_FORMATS}.")
+    if not output_path:
+        raise ValueError(f"Output format '{output_format}' needs an output path.")
+    if output_format in ('tar', 'zip'):
+        return ArchiveShardSink(output_path, output_format, shard_size=shard_size)
+    compression = {'jsonl': None, 'jsonl.gz': 'gzip', 'jsonl.zst': 'zstd'}[output_format]
+    return JsonlSink(output_path, compression=compression)
+
+
+def _record_from_json(data: Dict) -> OutputRecord:
+    domain, _, relpath = data['path'].partition('/')
+    return OutputRecord(data['url'], data.get('title'), domain, os.path.join(*relpath.split('/')),
+                        data.get('markdown', ''), tuple(data.get('aliases', ())))
+
+
+def _iter_alias_records(data: bytes) -> Iterator[OutputRecord]:
+    for line in data.decode('utf-8').splitlines():
+        if line.strip():
+            yield _record_from_json(json.loads(line))
+
+
+def _record_from_member(name: str, markdown: str) -> OutputRecord:
+    domain, _, relpath = name.partition('/')
+    match = _SITE_URL_LINE.search(markdown)
+    return OutputRecord(match.group(1) if match else name, None, domain,
+                        os.path.join(*relpath.split('/')), markdown)
+
+
+def iter_output_records(path: str) -> Iterator[OutputRecord]:
+    """
+    Reads the pages back from a bulk output file or shard (.jsonl,
+    .jsonl.gz, .jsonl.zst, .tar or .zip), e.g. to merge the output of
+    several workers into one Markdown tree.
+
+    Near-duplicate aliases (written after the pages) come back as records
+    with `aliases` set and empty markdown.
+    """
+    if path.endswith('.tar'):
+        with tarfile.open(path, 'r') as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                data = archive.extractfile(member).read()
+                if member.name == ALIASES_MEMBER:
+                    yield from _iter_alias_records(data)
+                else:
+                    yield _record_from_member(member.name, data.decode('utf-8'))
+        return
+    if path.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            for name in archive.namelist():
+                if name == ALIASES_MEMBER:
+                    yield from _iter_alias_records(archive.read(name))
+                elif not name.endswith('/'):
+                    yield _record_from_member(name, archive.read(name).decode('utf-8'))
+        return
+
+    if path.endswith('.zst'):
+        raw = open(path, 'rb')
+        stream = _import_zstandard().ZstdDecompressor().stream_reader(raw)
+    elif path.endswith('.gz'):
+        raw = stream = gzip.open(path, 'rb')
+    else:
+        raw = stream = open(path, 'rb')
+    try:
+        for line in io.TextIOWrapper(stream, encoding='utf-8'):
+            if line.strip():
+                yield _record_from_json(json.loads(line))
+    finally:
+        stream.close()
+        raw.close()
+
+
+class OutputWriter:
+    """
+    Writes rendered pages from a background thread so extraction never
+    waits on disk: write() renders the Markdown, picks the output path and
+    queues the page; the thread hands pages to the sink in batches of up to
+    `batch_size` and flushes after each batch (at the latest every
+    `flush_interval` seconds). At most `max_pending` pages wait in memory;
+    beyond that write() blocks until the thread catches up.
+
+    Paths mirror the URL path (see url_to_relpath); URLs that still map to
+    the same path in one run (/a/ and /a/index.html) get a hash of the URL
+    appended, so no page overwrites another. With `manifests` (incremental
+    runs), paths the previous run wrote stay reserved for their URLs, as
+    unchanged pages keep those files without passing through the writer.
+    With `shared_claims` (WorkQueue.path_claims()), paths are reserved
+    job-wide, so workers on several nodes write one consistent tree.
+
+    With `near_duplicates` (a NearDuplicateIndex), a page whose content
+    SimHash is close to one already written this run is not written again:
+    its URL is added to the first page's aliases, listed in that file's
+    front-matter (or the bulk output's alias entries) on close(). With
+    manifests too, fingerprints are kept in the manifest, so Markdown
+    files an earlier run wrote can still collect aliases.
+
+    close() must be called to write the remaining pages and close the sink.
+    """
+
+    def __init__(self, sink=None, batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 max_pending: int = DEFAULT_MAX_PENDING, manifests=None, shared_claims=None,
+                 near_duplicates=None):
+        self.sink = sink if sink is not None else MarkdownTreeSink()
+        self.manifests = manifests
+        self.shared_claims = shared_claims
+        self.near_duplicates = near_duplicates
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.pages_written = 0
+        self.bytes_written = 0
+        self.errors = 0
+        self.duplicates = 0
+        self._claimed: Dict[str, str] = {}
+        # canonical URL -> its record, with the aliases collected so far
+        self._aliases: Dict[str, OutputRecord] = {}
+        self._seeded_domains = set()
+        self._queue = queue.Queue(maxsize=max(1, max_pending))
+        self._thread = threading.Thread(target=self._run, name='output-writer', daemon=True)
+        self._thread.start()
+
+    def _claim(self, domain: str, relpath: str, url: str) -> str:
+        """Reserves relpath for url in this run, suffixing it if another URL holds it."""
+        key = f"{domain}/{relpath}"
+        owner = self._claimed.get(key)
+        if owner is None:
+            if self.manifests is not None:
+                owner = self.manifests[domain].output_owner(relpath)
+            if self.shared_claims is not None:
+                owner = self.shared_claims.setdefault(key, owner or url)
+            owner = self._claimed[key] = owner or url
+        if owner == url:
+            return relpath
+        stem, ext = os.path.splitext(relpath)
+        suffix = hashlib.sha1(url.encode('utf-8', errors='surrogatepass')).hexdigest()[:8]
+        return self._claim(domain, f"{stem}-{suffix}{ext}", url)
+
+    def write(self, result, domain: Optional[str] = None, relpath: Optional[str] = None,
+              markdown: Optional[str] = None) -> Optional[str]:
+        """
+        Queues an extraction result for writing.
+
+        Args:
+            result: Dictionary containing 'url', 'title', 'content'.
+            domain, relpath: Output location from build_output_filename
+                (derived from the URL if omitted).
+            markdown: The already rendered Markdown, if the caller has it.
+
+        Returns:
+            Where the page will be written (the file, or the bulk file or
+            shard holding it), or None if the result has no content. For a
+            near-duplicate, where its canonical page is written.
+        """
+        markdown = markdown or render_markdown(result)
+        if not markdown:
+            return None
+        url = result['url']
+        if domain is None or relpath is None:
+            domain, relpath = build_output_filename(url, self.pages_written)
+        fingerprint = None
+        if self.near_duplicates is not None:
+            fingerprint = result.get('simhash')
+            if fingerprint is None:
+                fingerprint = simhash(result.get('content') or markdown)
+            self._seed_near_duplicates(domain)
+            canonical = self.near_duplicates.find(fingerprint)
+            if canonical is not None and canonical.url != url:
+                self.add_aliases(canonical.url, canonical.domain, canonical.relpath, [url])
+                self.duplicates += 1
+                METRICS.inc('near_duplicates_total')
+                if self.manifests is not None:
+                    self.manifests[domain].record_fingerprint(url, None)
+                    self.manifests[domain].record_alias(url, canonical.url)
+                return self.sink.location(canonical)
+        if self.manifests is not None:
+            self.manifests[domain].record_alias(url, None)
+        record = OutputRecord(url, result.get('title'), domain,
+                              self._claim(domain, relpath, url), markdown)
+        if fingerprint is not None:
+            self.near_duplicates.add(fingerprint, record._replace(markdown=''))
+            if self.manifests is not None:
+                self.manifests[domain].record_fingerprint(url, fingerprint)
+        location = self.sink.location(record)
+        self._queue.put(record)
+        return location
+
+    def _seed_near_duplicates(self, domain: str):
+        """
+        Indexes the files an earlier incremental run wrote for domain, as
+        unchanged pages never reach write(). Bulk files of incremental runs
+        hold only new and changed pages, so only the Markdown tree is seeded.
+        """
+        if self.manifests is None or domain in self._seeded_domains:
+            return
+        self._seeded_domains.add(domain)
+        if isinstance(self.sink, MarkdownTreeSink):
+            for url, output_path, fingerprint in self.manifests[domain].fingerprints():
+                self.near_duplicates.add(fingerprint, OutputRecord(url, None, domain, output_path, ''))
+
+    def add_aliases(self, url: str, domain: str, relpath: str, aliases):
+        """Records URLs as aliases of the page written for url, to be added on close()."""
+        record = self._aliases.get(url)
+        if record is None:
+            record = OutputRecord(url, None, domain, self._claim(domain, relpath, url), '')
+        self._aliases[url] = record._replace(aliases=record.aliases + tuple(aliases))
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # sync() markers are released once everything queued before them is flushed
+            markers = [item for item in batch if not isinstance(item, OutputRecord)]
+            self._write_batch([item for item in batch if isinstance(item, OutputRecord)])
+            for marker in markers:
+                if marker is _STOP:
+                    return
+                marker.set()
+
+    def _write_batch(self, batch):
+        for record in batch:
+            try:
+                with METRICS.timer(stage='write'):
+                    size = self.sink.write(record)
+            except Exception as e:
+                self.errors += 1
+                METRICS.inc('errors_total', stage='write')
+                print(f"Error: Could not write {record.url}: {e}")
+                continue
+            self.pages_written += 1
+            self.bytes_written += size
+            METRICS.inc('bytes_total', size, stage='write')
+        try:
+            self.sink.flush()
+        except Exception as e:
+            print(f"Error: Could not flush output {self.sink.path}: {e}")
+
+    def sync(self):
+        """Blocks until every page queued so far has been written and flushed."""
+        if self._thread.is_alive():
+            done = threading.Event()
+            self._queue.put(done)
+            done.wait()
+
+    def close(self):
+        """Writes every queued page, closes the sink and prints a summary."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        if self._aliases:
+            try:
+                self.sink.write_aliases(list(self._aliases.values()))
+            except Exception as e:
+                print(f"Error: Could not write near-duplicate aliases to {self.sink.path}: {e}")
+        self.sink.close()
+        failed = f", {self.errors} failed" if self.errors else ""
+        collapsed = f", {self.duplicates} near-duplicates collapsed" if self.duplicates else ""
+        print(f"Wrote {self.pages_written} pages ({self.bytes_written / 1024:.0f} KiB) "
+              f"to {self.sink.path}{failed}{collapsed}.")
@@ -0,0 +1,44 @@
+# src/utils/ProgressLog.py
+import os
+
+
+class ProgressLog:
+    """
+    Append-only log of URLs whose extraction has finished.
+
+    Each URL is flushed as soon as it is marked done, so after a crash a
+    resumed run can skip everything that was already written.
+    """
+
+    def __init__(self, path: str, resume: bool = True):
+        """
+        Args:
+            path: Log file location.
+            resume: Load URLs from an existing log; otherwise start it empty.
+        """
+        self.path = path
+        self.done = set()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if resume and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.done.update(line.rstrip('\n') for line in f if line.strip())
+        self._file = open(path, 'a' if resume else 'w', encoding='utf-8')
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.done
+
+    def __len__(self) -> int:
+        return len(self.done)
+
+    def mark_done(self, url: str):
+        if url in self.done:
+            return
+        self.done.add(url)
+        self._file.write(url + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
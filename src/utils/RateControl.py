@@ -0,0 +1,252 @@
+# src/utils/RateControl.py
+import logging
+import math
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+from src.utils.Metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Status codes that mean "slow down" rather than "broken page"
+BACKOFF_STATUS_CODES = {429, 503}
+# Responses per host between two increase/decrease decisions
+DEFAULT_WINDOW = 20
+DEFAULT_MAX_CONCURRENCY = 32
+# Longest wait honoured from a Retry-After header, in seconds
+MAX_RETRY_AFTER = 300.0
+# Re-check interval for callers waiting on a full host
+_POLL_INTERVAL = 0.05
+_PARAMETERS = ('min_concurrency', 'max_concurrency', 'initial_concurrency', 'initial_delay',
+               'min_delay', 'max_delay', 'latency_target', 'latency_factor', 'max_error_rate', 'window')
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode('latin-1')
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return None
+    if math.isnan(seconds):
+        return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+class _HostState:
+    def __init__(self, concurrency: int, delay: float, window: int):
+        self.concurrency = concurrency
+        self.delay = delay
+        self.inflight = 0
+        self.next_start = 0.0
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.best_p95 = math.inf
+        self.latencies = deque(maxlen=window)
+        self.errors = deque(maxlen=window)
+        self.samples = 0
+
+
+class AdaptiveRateController:
+    """
+    Per-host AIMD (additive increase, multiplicative decrease) rate control
+    shared by the crawl and extraction stages, so what one stage learns
+    about a host carries over to the other.
+
+    Every `window` responses, a host whose p95 latency stays within
+    `latency_factor` times the best p95 seen for it (or under
+    `latency_target` seconds) and whose error rate is at most
+    `max_error_rate` is sped up: its delay is halved down to `min_delay`,
+    then its concurrency grows by one up to `max_concurrency`. Slow or
+    failing hosts are slowed down: concurrency is halved down to
+    `min_concurrency`, then the delay doubles up to `max_delay`. A 429 or
+    503 slows the host down at once, and a Retry-After header pauses it
+    for that long. Decreases are at least a second apart, so a burst of
+    errors from requests already in flight counts once.
+
+    Decisions are logged at INFO and exported as the host_concurrency and
+    host_delay_seconds gauges.
+
+    Fetchers call acquire()/release() around each request; the Scrapy side
+    (AdaptiveRateMiddleware) only calls record() and applies concurrency()
+    and delay() to its download slots.
+    """
+
+    def __init__(self, min_concurrency: int = 1, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 initial_concurrency: int = 4, initial_delay: float = 0.0,
+                 min_delay: float = 0.0, max_delay: float = 30.0,
+                 latency_target: float = 1.0, latency_factor: float = 2.0,
+                 max_error_rate: float = 0.05, window: int = DEFAULT_WINDOW):
+        self._cond = threading.Condition()
+        self._hosts: Dict[str, _HostState] = {}
+        self.configure(min_concurrency=min_concurrency, max_concurrency=max_concurrency,
+                       initial_concurrency=initial_concurrency, initial_delay=initial_delay,
+                       min_delay=min_delay, max_delay=max_delay, latency_target=latency_target,
+                       latency_factor=latency_factor, max_error_rate=max_error_rate, window=window)
+
+    def configure(self, **params):
+        """Updates the limits; hosts already seen keep their learned concurrency and delay."""
+        with self._cond:
+            for name, value in params.items():
+                if name not in _PARAMETERS:
+                    raise TypeError(f"Unknown rate control parameter '{name}'.")
+                setattr(self, name, value)
+            self.min_concurrency = max(1, self.min_concurrency)
+            self.max_concurrency = max(self.min_concurrency, self.max_concurrency)
+            for state in self._hosts.values():
+                state.concurrency = min(max(state.concurrency, self.min_concurrency), self.max_concurrency)
+
+    def reset(self):
+        """Forgets every host."""
+        with self._cond:
+            self._hosts.clear()
+
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            concurrency = min(max(self.initial_concurrency, self.min_concurrency), self.max_concurrency)
+            state = self._hosts[host] = _HostState(concurrency, max(self.initial_delay, self.min_delay),
+                                                   self.window)
+            self._export(host, state)
+        return state
+
+    def add_host(self, host: str, concurrency: int, delay: float):
+        """Starts tracking host at its own concurrency and delay; hosts already tracked are left as they are."""
+        with self._cond:
+            if host not in self._hosts:
+                concurrency = min(max(concurrency, self.min_concurrency), self.max_concurrency)
+                state = self._hosts[host] = _HostState(concurrency, max(delay, self.min_delay), self.window)
+                self._export(host, state)
+
+    def concurrency(self, host: str) -> int:
+        with self._cond:
+            return self._state(host).concurrency
+
+    def delay(self, host: str) -> float:
+        """Seconds between requests to host, stretched to cover any Retry-After pause."""
+        with self._cond:
+            state = self._state(host)
+            return max(state.delay, state.blocked_until - time.monotonic())
+
+    # --- Request slots, for the fetchers ---
+
+    def _try_acquire_locked(self, host: str) -> float:
+        state = self._state(host)
+        now = time.monotonic()
+        wait = max(state.blocked_until, state.next_start) - now
+        if wait > 0:
+            return wait
+        if state.inflight >= state.concurrency:
+            return _POLL_INTERVAL
+        state.inflight += 1
+        state.next_start = now + state.delay
+        return 0.0
+
+    def try_acquire(self, host: str) -> float:
+        """Takes a request slot for host and returns 0, or returns the seconds to wait before trying again."""
+        with self._cond:
+            return self._try_acquire_locked(host)
+
+    def acquire(self, host: str):
+        """Blocks until a request to host may start."""
+        with self._cond:
+            while True:
+                wait = self._try_acquire_locked(host)
+                if wait <= 0:
+                    return
+                self._cond.wait(wait)
+
+    def release(self, host: str, latency: Optional[float], status: Optional[int] = None,
+                retry_after=None):
+        """Frees the slot taken by acquire() and records the outcome (status None: no response)."""
+        with self._cond:
+            state = self._state(host)
+            state.inflight = max(0, state.inflight - 1)
+            self._record_locked(host, state, latency, status, retry_after)
+            self._cond.notify_all()
+
+    # --- Feedback ---
+
+    def record(self, host: str, latency: Optional[float], status: Optional[int] = None,
+               retry_after=None):
+        """Records one response (or a failed request, status None) from host."""
+        with self._cond:
+            self._record_locked(host, self._state(host), latency, status, retry_after)
+            self._cond.notify_all()
+
+    def _record_locked(self, host: str, state: _HostState, latency: Optional[float],
+                       status: Optional[int], retry_after):
+        now = time.monotonic()
+        if latency is not None:
+            state.latencies.append(latency)
+        state.errors.append(status is None or status >= 500 or status in BACKOFF_STATUS_CODES)
+
+        if status in BACKOFF_STATUS_CODES:
+            pause = parse_retry_after(retry_after)
+            reason = f"HTTP {status}"
+            if pause:
+                state.blocked_until = max(state.blocked_until, now + pause)
+                reason += f", Retry-After {pause:.0f}s"
+            self._decrease(host, state, now, reason)
+            return
+
+        state.samples += 1
+        if state.samples < self.window or not state.latencies:
+            return
+        state.samples = 0
+        latencies = sorted(state.latencies)
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        error_rate = sum(state.errors) / len(state.errors)
+        state.best_p95 = min(state.best_p95, p95)
+        target = max(self.latency_target, state.best_p95 * self.latency_factor)
+        if error_rate > self.max_error_rate:
+            self._decrease(host, state, now, f"error rate {error_rate:.0%}")
+        elif p95 > target:
+            self._decrease(host, state, now, f"p95 {p95 * 1000:.0f} ms > {target * 1000:.0f} ms")
+        else:
+            self._increase(host, state, f"p95 {p95 * 1000:.0f} ms, error rate {error_rate:.0%}")
+
+    def _increase(self, host: str, state: _HostState, reason: str):
+        if state.delay > self.min_delay:
+            state.delay = state.delay / 2 if state.delay / 2 > self.min_delay + 0.01 else self.min_delay
+        elif state.concurrency < self.max_concurrency:
+            state.concurrency += 1
+        else:
+            return
+        self._log(host, state, 'up', reason)
+
+    def _decrease(self, host: str, state: _HostState, now: float, reason: str):
+        if now - state.last_decrease < 1.0:
+            return
+        state.last_decrease = now
+        if state.concurrency > self.min_concurrency:
+            state.concurrency = max(self.min_concurrency, state.concurrency // 2)
+        else:
+            state.delay = min(self.max_delay, max(state.delay * 2, 0.25))
+        state.samples = 0
+        state.errors.clear()
+        self._log(host, state, 'down', reason)
+
+    def _log(self, host: str, state: _HostState, direction: str, reason: str):
+        logger.info("Rate %s for %s (%s): concurrency %d, delay %.2fs",
+                    direction, host, reason, state.concurrency, state.delay)
+        self._export(host, state)
+
+    @staticmethod
+    def _export(host: str, state: _HostState):
+        METRICS.set_gauge('host_concurrency', state.concurrency, host=host)
+        METRICS.set_gauge('host_delay_seconds', state.delay, host=host)
+
+
+# Process-wide controller shared by the crawl and extraction stages
+RATE_CONTROLLER = AdaptiveRateController()
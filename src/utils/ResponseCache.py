@@ -0,0 +1,274 @@
+# src/utils/ResponseCache.py
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Optional, Dict, Any
+
+# Default size bound for cached bodies (1 GiB).
+DEFAULT_MAX_BYTES = 1024 ** 3
+# Cache hits whose last_access update is held back before it is written
+# (every store() and close() writes them too), and the longest they wait
+TOUCH_BATCH_SIZE = 256
+TOUCH_FLUSH_INTERVAL = 5.0
+# Least recently used entries dropped per eviction query
+EVICT_BATCH_SIZE = 64
+
+
+class ResponseCache:
+    """
+    Persistent on-disk HTTP response cache with conditional revalidation.
+
+    Bodies are stored content-addressed (by SHA-256) under `bodies/`, so
+    identical pages share one file. A SQLite index maps each URL to its
+    body plus the ETag/Last-Modified validators needed to revalidate it.
+    When the stored bodies exceed `max_bytes`, the least recently used
+    URLs are evicted. The byte total is kept in a meta row updated with
+    every body added or freed, so stores never sum the whole cache, and
+    cache hits update last_access in batches rather than committing per
+    read; close() writes any pending ones.
+
+    The same cache directory is shared by the Scrapy crawl (see
+    src/httpcache.py) and by the extraction fetchers (src/utils/Fetcher.py).
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.bodies_dir = os.path.join(cache_dir, "bodies")
+        os.makedirs(self.bodies_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # url -> last access time of hits not yet written to the index
+        self._touched: Dict[str, float] = {}
+        self._last_touch_flush = time.monotonic()
+        self._db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                body_hash TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                encoding TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+            CREATE INDEX IF NOT EXISTS entries_body_hash ON entries (body_hash);
+            CREATE TABLE IF NOT EXISTS bodies (
+                body_hash TEXT PRIMARY KEY,
+                size INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+        # Caches created before the meta row existed are summed once
+        if self._db.execute("SELECT 1 FROM meta WHERE key = 'total_bytes'").fetchone() is None:
+            self._db.execute("INSERT INTO meta (key, value)"
+                             " SELECT 'total_bytes', COALESCE(SUM(size), 0) FROM bodies")
+        self._db.commit()
+
+    def _body_path(self, body_hash: str) -> str:
+        return os.path.join(self.bodies_dir, body_hash[:2], body_hash)
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached entry for a URL, or None, and marks it as recently used.
+
+        The entry is a dict with 'url', 'status', 'headers', 'encoding',
+        'etag', 'last_modified' and 'body' (bytes).
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body_hash, status, headers, encoding, etag, last_modified"
+                " FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+            if row is not None:
+                self._touched[url] = time.time()
+                if (len(self._touched) >= TOUCH_BATCH_SIZE
+                        or time.monotonic() - self._last_touch_flush >= TOUCH_FLUSH_INTERVAL):
+                    self._flush_touched()
+                    self._db.commit()
+        if row is None:
+            return None
+
+        body_hash, status, headers, encoding, etag, last_modified = row
+        try:
+            with open(self._body_path(body_hash), "rb") as f:
+                body = f.read()
+        except OSError:
+            self.delete(url)
+            return None
+
+        return {
+            'url': url,
+            'status': status,
+            'headers': json.loads(headers),
+            'encoding': encoding,
+            'etag': etag,
+            'last_modified': last_modified,
+            'body': body,
+        }
+
+    @staticmethod
+    def decoded_body(entry: Dict[str, Any]) -> Optional[bytes]:
+        """
+        Returns the entry body with any Content-Encoding removed.
+
+        The Scrapy crawl caches bodies as received on the wire, so they may
+        still be gzip/deflate encoded. Returns None for encodings that
+        cannot be decoded here.
+        """
+        lowered = {k.lower(): v for k, v in entry['headers'].items()}
+        content_encoding = (lowered.get('content-encoding') or '').strip().lower()
+        body = entry['body']
+        try:
+            if content_encoding in ('', 'identity'):
+                return body
+            if content_encoding in ('gzip', 'x-gzip'):
+                return gzip.decompress(body)
+            if content_encoding == 'deflate':
+                try:
+                    return zlib.decompress(body)
+                except zlib.error:
+                    return zlib.decompress(body, -zlib.MAX_WBITS)
+        except (OSError, EOFError, zlib.error):
+            return None
+        return None
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """Builds If-None-Match / If-Modified-Since headers for a cached entry."""
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url: str, body: bytes, headers: Dict[str, Any], status: int = 200,
+              encoding: Optional[str] = None) -> bool:
+        """
+        Stores a response if it carries a validator (ETag or Last-Modified).
+
+        Args:
+            headers: Response headers as a str -> str mapping (case-insensitive lookup
+                is done for the validators).
+
+        Returns:
+            True if the response was cached.
+        """
+        lowered = {k.lower(): v for k, v in headers.items()}
+        etag = lowered.get('etag')
+        last_modified = lowered.get('last-modified')
+        if not etag and not last_modified:
+            return False
+
+        body_hash = hashlib.sha256(body).hexdigest()
+        body_path = self._body_path(body_hash)
+        if not os.path.exists(body_path):
+            os.makedirs(os.path.dirname(body_path), exist_ok=True)
+            tmp_path = f"{body_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, body_path)
+
+        with self._lock:
+            self._flush_touched()
+            previous = self._db.execute(
+                "SELECT body_hash FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+            added = self._db.execute(
+                "INSERT OR IGNORE INTO bodies (body_hash, size) VALUES (?, ?)",
+                (body_hash, len(body))
+            ).rowcount
+            if added:
+                self._add_total(len(body))
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries"
+                " (url, body_hash, status, headers, encoding, etag, last_modified, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, body_hash, status, json.dumps(headers), encoding, etag, last_modified, time.time())
+            )
+            if previous and previous[0] != body_hash:
+                self._release_bodies([previous[0]])
+            self._db.commit()
+        self.evict()
+        return True
+
+    def delete(self, url: str):
+        with self._lock:
+            row = self._db.execute("SELECT body_hash FROM entries WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return
+            self._db.execute("DELETE FROM entries WHERE url = ?", (url,))
+            self._touched.pop(url, None)
+            self._release_bodies([row[0]])
+            self._db.commit()
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._total()
+
+    def evict(self):
+        """Drops least recently used entries until stored bodies fit in max_bytes."""
+        with self._lock:
+            if self._total() <= self.max_bytes:
+                return
+            self._flush_touched()
+            while self._total() > self.max_bytes:
+                rows = self._db.execute(
+                    "SELECT url, body_hash FROM entries ORDER BY last_access LIMIT ?",
+                    (EVICT_BATCH_SIZE,)
+                ).fetchall()
+                if not rows:
+                    break
+                for url, body_hash in rows:
+                    if self._total() <= self.max_bytes:
+                        break
+                    self._db.execute("DELETE FROM entries WHERE url = ?", (url,))
+                    self._release_bodies([body_hash])
+            self._db.commit()
+
+    def _total(self) -> int:
+        return self._db.execute("SELECT value FROM meta WHERE key = 'total_bytes'").fetchone()[0]
+
+    def _add_total(self, size: int):
+        self._db.execute("UPDATE meta SET value = value + ? WHERE key = 'total_bytes'", (size,))
+
+    def _flush_touched(self):
+        if self._touched:
+            self._db.executemany("UPDATE entries SET last_access = ? WHERE url = ?",
+                                 [(accessed, url) for url, accessed in self._touched.items()])
+            self._touched.clear()
+        self._last_touch_flush = time.monotonic()
+
+    def _release_bodies(self, body_hashes):
+        """Deletes the bodies no entry refers to any more (identical pages share one)."""
+        for body_hash in body_hashes:
+            if self._db.execute("SELECT 1 FROM entries WHERE body_hash = ? LIMIT 1",
+                                (body_hash,)).fetchone():
+                continue
+            row = self._db.execute("SELECT size FROM bodies WHERE body_hash = ?", (body_hash,)).fetchone()
+            if row is None:
+                continue
+            self._db.execute("DELETE FROM bodies WHERE body_hash = ?", (body_hash,))
+            self._add_total(-row[0])
+            try:
+                os.remove(self._body_path(body_hash))
+            except OSError:
+                pass
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._db.commit()
+            self._db.close()
@@ -0,0 +1,188 @@
+# src/utils/SeenSet.py
+import math
+from array import array
+from hashlib import blake2b
+from collections import Counter
+from typing import Iterable
+
+SEEN_SET_KINDS = ('set', 'hashed', 'bloom')
+
+
+def _digest(key: str, size: int) -> bytes:
+    return blake2b(key.encode('utf-8', errors='surrogatepass'), digest_size=size).digest()
+
+
+class HashedSeenSet:
+    """
+    Set of strings stored as 64-bit hashes in an open-addressing table.
+
+    Each entry costs 8 bytes in an array('Q') (16-32 bytes per key at the
+    table's load factor) instead of a full Python string plus set slot.
+    Two distinct keys collide with probability ~2**-64, which is
+    negligible for million-page crawls.
+    """
+
+    def __init__(self, capacity: int = 1 << 16):
+        size = 8
+        while size < capacity * 2:
+            size <<= 1
+        self._table = array('Q', [0]) * size
+        self._mask = size - 1
+        self._count = 0
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        # 0 marks an empty slot, so it is never used as a hash value
+        return int.from_bytes(_digest(key, 8), 'little') or 1
+
+    def _slot(self, h: int) -> int:
+        table, mask = self._table, self._mask
+        i = h & mask
+        while True:
+            value = table[i]
+            if value == 0 or value == h:
+                return i
+            i = (i + 1) & mask
+
+    def _grow(self):
+        old_table = self._table
+        self._table = array('Q', [0]) * (len(old_table) * 2)
+        self._mask = len(self._table) - 1
+        for h in old_table:
+            if h:
+                self._table[self._slot(h)] = h
+
+    def add(self, key: str) -> bool:
+        """Adds a key. Returns True if it was not already present."""
+        h = self._hash(key)
+        i = self._slot(h)
+        if self._table[i] == h:
+            return False
+        self._table[i] = h
+        self._count += 1
+        if self._count * 2 > len(self._table):
+            self._grow()
+        return True
+
+    def update(self, keys: Iterable[str]):
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        h = self._hash(key)
+        return self._table[self._slot(h)] == h
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class BloomSeenSet:
+    """
+    Bloom filter sized for `capacity` keys at a target false-positive rate.
+
+    Memory is fixed up front (about 1.8 bytes per key at a 0.1% rate).
+    A false positive makes an unseen URL look seen, so that page is
+    skipped. Past `capacity` keys the false-positive rate climbs.
+    len() counts keys that were new when added.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001):
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1.")
+        capacity = max(1, capacity)
+        self._num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self._num_hashes = max(1, round(self._num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self._num_bits + 7) // 8)
+        self._count = 0
+
+    def _positions(self, key: str):
+        digest = _digest(key, 16)
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self._num_bits for i in range(self._num_hashes)]
+
+    def add(self, key: str) -> bool:
+        """Adds a key. Returns True if it was (probably) not already present."""
+        new = False
+        for pos in self._positions(key):
+            mask = 1 << (pos & 7)
+            if not self._bits[pos >> 3] & mask:
+                self._bits[pos >> 3] |= mask
+                new = True
+        if new:
+            self._count += 1
+        return new
+
+    def update(self, keys: Iterable[str]):
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class CountMinSketch:
+    """
+    Approximate per-key counts in fixed memory (a count-min sketch).
+
+    Counts are kept in `depth` rows of `width` 32-bit cells; a key's count
+    is the smallest of its cells, so it can only be overestimated, by
+    roughly total increments / width at worst. Assignments use the
+    conservative update (cells are raised to the new value, never
+    lowered), so `sketch[key] += 1` works as with a Counter.
+    """
+
+    def __init__(self, width: int = 1 << 16, depth: int = 4):
+        self._width = max(16, width)
+        self._depth = max(1, depth)
+        self._rows = [array('I', [0]) * self._width for _ in range(self._depth)]
+
+    def _cells(self, key: str):
+        digest = _digest(key, 16)
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self._width for i in range(self._depth)]
+
+    def __getitem__(self, key: str) -> int:
+        return min(row[i] for row, i in zip(self._rows, self._cells(key)))
+
+    def __setitem__(self, key: str, value: int):
+        value = min(value, 0xFFFFFFFF)
+        for row, i in zip(self._rows, self._cells(key)):
+            if row[i] < value:
+                row[i] = value
+
+
+def create_counter(kind: str = 'set', capacity: int = 1_000_000):
+    """
+    Builds a per-key counter to go with a seen-set of the same kind:
+    an exact Counter for 'set', otherwise a CountMinSketch of 4 rows of
+    capacity // 4 cells (4 bytes per expected key).
+    """
+    if kind == 'set':
+        return Counter()
+    if kind in SEEN_SET_KINDS:
+        return CountMinSketch(width=capacity // 4, depth=4)
+    raise ValueError(f"Unknown seen-set kind '{kind}'. Choose from: {', '.join(SEEN_SET_KINDS)}")
+
+
+def create_seen_set(kind: str = 'set', capacity: int = 1_000_000, error_rate: float = 0.001):
+    """
+    Builds a seen-set by kind.
+
+    Args:
+        kind: 'set' (plain Python set), 'hashed' (HashedSeenSet) or 'bloom' (BloomSeenSet).
+        capacity: Expected number of keys (initial table size for 'hashed', which grows
+            as needed; fixed size for 'bloom').
+        error_rate: False-positive rate for 'bloom'.
+    """
+    if kind == 'set':
+        return set()
+    if kind == 'hashed':
+        return HashedSeenSet(capacity=capacity)
+    if kind == 'bloom':
+        return BloomSeenSet(capacity=capacity, error_rate=error_rate)
+    raise ValueError(f"Unknown seen-set kind '{kind}'. Choose from: {', '.join(SEEN_SET_KINDS)}")
@@ -0,0 +1,109 @@
+# src/utils/Sitemap.py
+import gzip
+import io
+from typing import Iterator, NamedTuple, Optional
+
+from lxml import etree
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# The sitemap protocol caps a sitemap at 50 MB uncompressed; reading stops there,
+# so a small gzip body cannot inflate without limit (a decompression bomb)
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024
+
+
+class SitemapEntry(NamedTuple):
+    """One <url> or <sitemap> entry. kind is 'url' (a page) or 'sitemap' (a child sitemap)."""
+    kind: str
+    loc: str
+    lastmod: Optional[str] = None
+    changefreq: Optional[str] = None
+    priority: Optional[float] = None
+
+
+def iter_robots_sitemaps(robots_text: str) -> Iterator[str]:
+    """Yields the URLs of 'Sitemap:' lines in a robots.txt body."""
+    for line in robots_text.splitlines():
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'sitemap' and value.strip():
+            yield value.strip()
+
+
+class _CappedReader(io.RawIOBase):
+    """Raw stream that reports end of file after max_bytes have been read."""
+
+    def __init__(self, raw, max_bytes: int):
+        self._raw = raw
+        self._remaining = max_bytes
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        data = self._raw.read(size)
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+
+def _open_body(body: bytes, max_bytes: int = MAX_SITEMAP_BYTES):
+    """
+    Buffered reader over the body, transparently gunzipping .xml.gz sitemaps
+    (detected by their magic bytes, whatever the URL or Content-Type says),
+    that ends after max_bytes of (decompressed) content.
+    """
+    stream = io.BytesIO(body)
+    if body[:2] == GZIP_MAGIC:
+        stream = gzip.GzipFile(fileobj=stream)
+    return io.BufferedReader(_CappedReader(stream, max_bytes))
+
+
+def _localname(tag) -> str:
+    return etree.QName(tag).localname if isinstance(tag, str) else ''
+
+
+def iter_sitemap_entries(body: bytes, max_bytes: int = MAX_SITEMAP_BYTES) -> Iterator[SitemapEntry]:
+    """
+    Streams entries from a sitemap, sitemap index or plain-text sitemap.
+
+    XML is parsed incrementally with iterparse and each element is freed
+    once read, and gzip bodies are decompressed as they are parsed, so
+    memory stays flat even for 50k-URL / 50 MB sitemaps. Parsing stops
+    quietly at the first XML error, or after max_bytes of decompressed
+    content (the entries read until then are kept).
+    """
+    stream = _open_body(body, max_bytes)
+    head = stream.peek(512)[:512]
+    if not head.lstrip().startswith(b'<'):
+        # Plain-text sitemap: one URL per line
+        for line in io.TextIOWrapper(stream, encoding='utf-8', errors='replace'):
+            line = line.strip()
+            if line.startswith(('http://', 'https://')):
+                yield SitemapEntry('url', line)
+        return
+
+    context = etree.iterparse(stream, events=('end',), resolve_entities=False,
+                              no_network=True, huge_tree=True)
+    try:
+        for _, elem in context:
+            kind = _localname(elem.tag)
+            if kind not in ('url', 'sitemap'):
+                continue
+            fields = {_localname(child.tag): (child.text or '').strip() for child in elem}
+            loc = fields.get('loc')
+            if loc:
+                try:
+                    priority = float(fields['priority']) if fields.get('priority') else None
+                except ValueError:
+                    priority = None
+                yield SitemapEntry(kind, loc, fields.get('lastmod') or None,
+                                   fields.get('changefreq') or None, priority)
+            # Free the element and everything parsed before it
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+    except (etree.XMLSyntaxError, OSError, EOFError):
+        return
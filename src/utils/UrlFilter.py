@@ -0,0 +1,174 @@
+# src/utils/UrlFilter.py
+import re
+from collections import Counter
+from fnmatch import fnmatch
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from src.utils.SeenSet import create_counter, create_seen_set
+
+# Query parameters that never change page content: analytics and click tracking, session IDs.
+DEFAULT_STRIP_PARAMS = (
+    'utm_*', 'gclid', 'dclid', 'fbclid', 'msclkid', 'yclid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', '_hsenc', '_hsmi', 'igshid', 'sessionid', 'session_id', 'sid',
+    'phpsessid', 'jsessionid', 'aspsessionid*',
+)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# When grouping URLs into patterns for the per-pattern budget, hex/UUID
+# segments collapse to {id} and digit runs (dates, page numbers) to {n}.
+_ID_SEGMENT = re.compile(r'^([0-9a-f]{16,}|[0-9a-f-]{32,36})$', re.IGNORECASE)
+_DIGITS = re.compile(r'\d+')
+_PATH_SESSION_ID = re.compile(r';(jsessionid|phpsessid|sid)=[^/?#]*', re.IGNORECASE)
+
+
+def clean_url(url: str, strip_params: Iterable[str] = DEFAULT_STRIP_PARAMS) -> str:
+    """
+    Returns the URL to request: lowercased scheme/host, no default port,
+    no fragment or path session ID, tracking params removed and the query
+    sorted. Values keep their original encoding.
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or '').lower()
+    if ':' in netloc:
+        netloc = f"[{netloc}]" # IPv6 literal
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{port}"
+    if parts.username or parts.password:
+        netloc = parts.netloc.rsplit('@', 1)[0] + '@' + netloc
+
+    path = _PATH_SESSION_ID.sub('', parts.path) or '/'
+
+    patterns = [p.lower() for p in strip_params]
+    query_pairs = []
+    for pair in parts.query.split('&'):
+        if not pair:
+            continue
+        name = pair.split('=', 1)[0].lower()
+        if any(fnmatch(name, pattern) for pattern in patterns):
+            continue
+        query_pairs.append(pair)
+    query_pairs.sort()
+
+    return urlunsplit((scheme, netloc, path, '&'.join(query_pairs), ''))
+
+
+def canonical_key(url: str) -> str:
+    """
+    Dedup key for a cleaned URL: also ignores a leading 'www.' and a
+    trailing slash, which sites serve interchangeably (usually via redirect).
+    """
+    parts = urlsplit(url)
+    netloc = parts.netloc[4:] if parts.netloc.startswith('www.') else parts.netloc
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme, netloc, path, parts.query, ''))
+
+
+def url_pattern(url: str) -> str:
+    """Groups URLs by host + path shape, e.g. /calendar/2024/05.html -> /calendar/{n}/{n}.html."""
+    parts = urlsplit(url)
+    segments = ['{id}' if _ID_SEGMENT.match(s) else _DIGITS.sub('{n}', s)
+                for s in parts.path.split('/')]
+    return parts.netloc + '/'.join(segments)
+
+
+class UrlFilter:
+    """
+    Canonicalizes links before they are followed and prunes crawler traps.
+
+    check() returns the URL to request plus a skip reason (or None):
+        duplicate            canonical form already in the seen-set
+        path_depth           more than max_path_depth path segments
+        path_repetition      a path segment repeats more than max_segment_repeats times
+        query_permutations   more than max_query_variants distinct queries on one path
+        pattern_budget       more than max_per_pattern URLs sharing one path shape
+
+    Duplicates are counted in `duplicates`, trap prunes by reason in
+    `pruned`. A limit of 0 disables that check; the pattern budget is
+    off by default, as large sites legitimately have many thousands of
+    pages of one shape (/product/{id}, /blog/{n}/{n}/...).
+
+    `seen` is the set of canonical keys already scheduled or found,
+    normally the spider's own seen-set (see canonical_key); accepted
+    URLs are added to it. Per-path and per-pattern counts are exact for
+    seen_set 'set' and a CountMinSketch (fixed memory) otherwise.
+    """
+
+    def __init__(self, strip_params: Iterable[str] = DEFAULT_STRIP_PARAMS,
+                 max_path_depth: int = 20, max_segment_repeats: int = 3,
+                 max_query_variants: int = 50, max_per_pattern: int = 0,
+                 seen=None, seen_set: str = 'set', seen_set_capacity: int = 1_000_000,
+                 seen_set_error_rate: float = 0.001):
+        self.strip_params = tuple(strip_params)
+        self.max_path_depth = max_path_depth
+        self.max_segment_repeats = max_segment_repeats
+        self.max_query_variants = max_query_variants
+        self.max_per_pattern = max_per_pattern
+        if seen is None:
+            seen = create_seen_set(seen_set, capacity=seen_set_capacity,
+                                   error_rate=seen_set_error_rate)
+        self.seen = seen
+        self.query_variants = create_counter(seen_set, capacity=seen_set_capacity)
+        self.pattern_counts = create_counter(seen_set, capacity=seen_set_capacity)
+        self.pruned: Dict[str, int] = Counter()
+        self.duplicates = 0
+        self.cleaned = 0
+
+    @classmethod
+    def from_settings(cls, settings, **kwargs):
+        """Builds a filter from Scrapy settings (URL_STRIP_PARAMS, TRAP_* limits)."""
+        return cls(
+            strip_params=settings.getlist('URL_STRIP_PARAMS', list(DEFAULT_STRIP_PARAMS)),
+            max_path_depth=settings.getint('TRAP_MAX_PATH_DEPTH', 20),
+            max_segment_repeats=settings.getint('TRAP_MAX_SEGMENT_REPEATS', 3),
+            max_query_variants=settings.getint('TRAP_MAX_QUERY_VARIANTS', 50),
+            max_per_pattern=settings.getint('TRAP_MAX_PER_PATTERN', 0),
+            **kwargs
+        )
+
+    def _trap_reason(self, url: str) -> Optional[str]:
+        parts = urlsplit(url)
+        segments = [s for s in parts.path.split('/') if s]
+
+        if self.max_path_depth and len(segments) > self.max_path_depth:
+            return 'path_depth'
+        if self.max_segment_repeats and segments \
+                and max(Counter(segments).values()) > self.max_segment_repeats:
+            return 'path_repetition'
+        if self.max_query_variants and parts.query:
+            path_key = parts.netloc + parts.path
+            if self.query_variants[path_key] >= self.max_query_variants:
+                return 'query_permutations'
+            self.query_variants[path_key] += 1
+        if self.max_per_pattern:
+            pattern = url_pattern(url)
+            if self.pattern_counts[pattern] >= self.max_per_pattern:
+                return 'pattern_budget'
+            self.pattern_counts[pattern] += 1
+        return None
+
+    def check(self, url: str) -> Tuple[str, Optional[str]]:
+        """Returns (cleaned_url, skip_reason); follow the URL only if the reason is None."""
+        cleaned = clean_url(url, self.strip_params)
+        if cleaned != url.split('#', 1)[0]:
+            self.cleaned += 1
+        key = canonical_key(cleaned)
+        if key in self.seen:
+            self.duplicates += 1
+            return cleaned, 'duplicate'
+        reason = self._trap_reason(cleaned)
+        if reason:
+            self.pruned[reason] += 1
+        else:
+            self.seen.add(key)
+        return cleaned, reason
+
+    def summary(self) -> str:
+        pruned = ', '.join(f"{reason}: {count}" for reason, count in sorted(self.pruned.items()))
+        return f"rewritten: {self.cleaned}, duplicates: {self.duplicates}, pruned: {pruned or 'none'}"
@@ -0,0 +1,66 @@
+# src/utils/UrlStream.py
+import queue
+import threading
+from typing import Iterator
+
+from src.utils.Metrics import METRICS
+
+# URLs buffered between the crawl and the extraction consuming them
+DEFAULT_STREAM_SIZE = 1000
+# Seconds a waiting consumer sleeps before checking whether the stream was closed
+_POLL_INTERVAL = 0.5
+
+
+class UrlStream:
+    """
+    Bounded, thread-safe hand-off of URLs from a running crawl to the
+    extraction consuming them (app.py --stream).
+
+    The producer never blocks: offer() returns False while the buffer is
+    full and the producer tries again later (see UrlStreamPipeline), which
+    holds back the crawl. Iterating yields URLs in order until close() has
+    been called and the buffer is drained. A consumer that stops early
+    calls cancel(); later offers are then dropped, so the crawl never
+    waits on a reader that is gone.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_STREAM_SIZE):
+        self._queue = queue.Queue(maxsize)
+        self._closed = threading.Event()
+        self._cancelled = threading.Event()
+        self.offered = 0
+
+    def __deepcopy__(self, memo):
+        # Scrapy deep-copies the settings the stream travels in; both ends must share this buffer
+        return self
+
+    def offer(self, url: str) -> bool:
+        """Queues url; False if the buffer is full and url should be offered again later."""
+        if self._cancelled.is_set():
+            return True
+        try:
+            self._queue.put_nowait(url)
+        except queue.Full:
+            return False
+        self.offered += 1
+        METRICS.set_gauge('queue_depth', self._queue.qsize(), queue='stream')
+        return True
+
+    def close(self):
+        """Marks the end of the stream; iteration stops once the buffer is drained."""
+        self._closed.set()
+
+    def cancel(self):
+        """Drops every later offer (the consumer has stopped)."""
+        self._cancelled.set()
+
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            try:
+                url = self._queue.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                if self._closed.is_set() and self._queue.empty():
+                    return
+                continue
+            METRICS.set_gauge('queue_depth', self._queue.qsize(), queue='stream')
+            yield url
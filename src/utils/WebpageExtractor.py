@@ -1,8 +1,90 @@
 import json
-import requests
+import os
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 import trafilatura
 import lxml.html
-from typing import Optional, Dict, Any
+from lxml.etree import ParserError
+from trafilatura.metadata import examine_meta, extract_title
+from w3lib.encoding import html_body_declared_encoding, read_bom, resolve_encoding
+from typing import TYPE_CHECKING, Optional, Dict, Any, Callable, Iterable, Iterator, Union
+
+# --- Setup Project Path ---
+# Needed when this file is run directly, so 'src.utils' imports resolve
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# --------------------------
+
+from src.utils.Metrics import METRICS, SamplingProfiler
+from src.utils.NearDuplicates import simhash
+
+if TYPE_CHECKING:
+    # requests is only needed for fetching, not in the extraction worker processes
+    from src.utils.Fetcher import Page, SessionFetcher
+
+
+def detect_encoding(body: bytes, declared: Optional[str] = None) -> str:
+    """
+    Picks the charset for an HTML body without decoding it: a byte-order
+    mark wins, then the HTTP-declared charset, then <meta charset> in the
+    first few KB, then UTF-8.
+    """
+    bom_encoding, _ = read_bom(body)
+    if bom_encoding:
+        return bom_encoding
+    for candidate in (declared, html_body_declared_encoding(body)):
+        resolved = resolve_encoding(candidate) if candidate else None
+        if resolved:
+            return resolved
+    return 'utf-8'
+
+
+def parse_html(html_content: Union[bytes, str, None],
+               encoding: Optional[str] = None) -> Optional[lxml.html.HtmlElement]:
+    """
+    Parses a page into the lxml tree shared by title and content extraction.
+
+    Bytes are parsed directly in their detected encoding (see
+    detect_encoding); text is re-encoded as UTF-8 first. The parser
+    matches trafilatura's own (comments and processing instructions
+    dropped, no ID index). Returns None for empty or unparseable input.
+    """
+    if not html_content:
+        return None
+    if isinstance(html_content, str):
+        html_content, encoding = html_content.encode('utf-8', errors='surrogatepass'), 'utf-8'
+    else:
+        encoding = detect_encoding(html_content, encoding)
+    parser = lxml.html.HTMLParser(encoding=encoding, collect_ids=False, default_doctype=False,
+                                  remove_comments=True, remove_pis=True)
+    try:
+        return lxml.html.fromstring(html_content, parser=parser)
+    except (ParserError, ValueError, LookupError):
+        return None
+
+
+# Per-process extractor for pool workers, set up by _init_worker
+_worker_extractor = None
+
+
+def _init_worker(trafilatura_config: Dict[str, Any], profiler: Optional[SamplingProfiler],
+                 fingerprint: bool = False):
+    global _worker_extractor
+    METRICS.reset() # Forked workers inherit the parent's series; report only their own
+    _worker_extractor = WebpageExtractor(trafilatura_config=trafilatura_config, profiler=profiler,
+                                         fingerprint=fingerprint)
+
+
+def _extract_in_worker(url: str, body: bytes, encoding: Optional[str]):
+    """
+    Process-pool entry point: runs extraction on a page fetched in the parent.
+    Returns (result, metrics state) so the parent can merge the timings.
+    """
+    result = _worker_extractor.extract_from_html(url, body, encoding=encoding)
+    return result, METRICS.drain()
+
 
 class WebpageExtractor:
     """Fetches and extracts main content from a webpage URL."""
@@ -24,73 +106,186 @@ class WebpageExtractor:
     }
 
     def __init__(self, headers: Optional[Dict[str, str]] = None,
-                 trafilatura_config: Optional[Dict[str, Any]] = None):
-        """Initializes the extractor."""
+                 trafilatura_config: Optional[Dict[str, Any]] = None,
+                 fetcher: Optional['SessionFetcher'] = None,
+                 profiler: Optional[SamplingProfiler] = None,
+                 fingerprint: bool = False):
+        """
+        Initializes the extractor.
+
+        Args:
+            headers: Request headers for the default fetcher.
+            trafilatura_config: Keyword arguments for trafilatura.extract.
+            fetcher: Fetch backend (see src.utils.Fetcher). Defaults to a
+                pooled SessionFetcher, created on first use.
+            profiler: Optional SamplingProfiler run around parse + extract
+                (in each worker process too).
+            fingerprint: Add the SimHash of the extracted content to each
+                result as 'simhash', for near-duplicate detection (see
+                src.utils.NearDuplicates).
+        """
         self.headers = headers or self.DEFAULT_HEADERS
         self.config = trafilatura_config or self.DEFAULT_TRAFILATURA_CONFIG
+        self.fetcher = fetcher
+        self.profiler = profiler
+        self.fingerprint = fingerprint
 
-    def _fetch(self, url: str) -> Optional[str]:
-        """Fetches HTML content."""
-        try:
-            response = requests.get(url, headers=self.headers, timeout=20)
-            response.raise_for_status()
-            return response.text
-        except requests.exceptions.RequestException:
-            return None
+    def _get_fetcher(self) -> 'SessionFetcher':
+        if self.fetcher is None:
+            from src.utils.Fetcher import SessionFetcher
+            self.fetcher = SessionFetcher(headers=self.headers)
+        return self.fetcher
 
-    def _get_title(self, html_content: str) -> Optional[str]:
-        """Extracts the title."""
-        if not html_content:
-            return None
+    def _fetch(self, url: str) -> Optional['Page']:
+        """Fetches the page body."""
+        return self._get_fetcher().fetch(url)
+
+    def _get_title(self, tree: lxml.html.HtmlElement) -> Optional[str]:
+        """Extracts the title, falling back to trafilatura's metadata (og:title, <h1>, ...)."""
         try:
-            root = lxml.html.fromstring(html_content)
-            title = root.findtext('.//title')
+            title = tree.findtext('.//title')
+            if not (title and title.strip()):
+                title = examine_meta(tree).title or extract_title(tree)
             return title.strip() if title else None
         except Exception:
             return None
 
     def extract(self, url: str) -> Dict[str, Optional[str]]:
         """Fetches, extracts title and main content."""
-        html_content = self._fetch(url)
-        title = self._get_title(html_content)
+        page = self._fetch(url)
+        if page is None:
+            return self.extract_from_html(url, None)
+        return self.extract_from_html(url, page.body, encoding=page.encoding)
+
+    def extract_from_html(self, url: str, html_content: Union[bytes, str, None],
+                          encoding: Optional[str] = None) -> Dict[str, Optional[str]]:
+        """
+        Extracts title and main content from already-downloaded HTML.
 
-        if not html_content:
-            return {'url': url, 'title': title, 'content': None}
+        The page is parsed once (see parse_html) and the tree feeds both
+        the title lookup and trafilatura, which copies it before cleaning.
+        Pass the raw body and its declared charset rather than decoded text
+        to skip a decode/re-encode round trip.
+        """
+        if self.profiler is None:
+            return self._extract_tree(url, html_content, encoding)
+        with self.profiler.profile():
+            return self._extract_tree(url, html_content, encoding)
+
+    def _extract_tree(self, url: str, html_content: Union[bytes, str, None],
+                      encoding: Optional[str]) -> Dict[str, Optional[str]]:
+        with METRICS.timer(stage='parse'):
+            tree = parse_html(html_content, encoding)
+        if tree is None:
+            return {'url': url, 'title': None, 'content': None}
 
         extracted_content = None
-        try:
-            extracted_content = trafilatura.extract(
-                html_content,
-                url=url,
-                **self.config
-            )
-        except Exception:
-            pass
+        with METRICS.timer(stage='extract'):
+            title = self._get_title(tree)
+            try:
+                extracted_content = trafilatura.extract(
+                    tree,
+                    url=url,
+                    **self.config
+                )
+            except Exception:
+                METRICS.inc('errors_total', stage='extract')
+            if self.fingerprint and extracted_content:
+                return {'url': url, 'title': title, 'content': extracted_content,
+                        'simhash': simhash(extracted_content)}
 
         return {'url': url, 'title': title, 'content': extracted_content}
 
-# src/utils/WebpageExtractor.py
-# ... (class definition remains the same) ...
+    def process_pool(self, workers: int) -> ProcessPoolExecutor:
+        """A pool of `workers` extraction processes configured like this extractor (see submit)."""
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(self.config, self.profiler, self.fingerprint))
+
+    @staticmethod
+    def submit(pool: ProcessPoolExecutor, url: str, body: bytes, encoding: Optional[str] = None) -> Future:
+        """
+        Queues a downloaded page on a process_pool(). The future resolves to
+        (result, worker metrics state) for METRICS.merge.
+        """
+        return pool.submit(_extract_in_worker, url, body, encoding)
+
+    def extract_many(self, urls: Iterable[str], workers: Optional[int] = None,
+                     max_pending: Optional[int] = None,
+                     should_extract: Optional[Callable[[str, bytes], bool]] = None
+                     ) -> Iterator[Dict[str, Optional[str]]]:
+        """
+        Fetches and extracts many URLs, yielding results in input order.
+
+        Pages are fetched concurrently by the fetcher's fetch_many while
+        trafilatura runs in a pool of `workers` processes. At most
+        `max_pending` pages wait for extraction at once, so a slow consumer
+        holds back fetching instead of buffering the site.
+
+        Args:
+            urls: URLs to process. May be a lazy iterable.
+            workers: Extraction processes. Defaults to the CPU count; 1 runs
+                extraction in this process.
+            max_pending: Bound on pages awaiting extraction. Defaults to 4 per worker.
+            should_extract: Optional callback (url, body) -> bool, given the
+                raw page body. Pages it rejects are not extracted and yield a
+                result with 'skipped': True.
+        """
+        workers = workers or os.cpu_count() or 1
+        max_pending = max_pending or workers * 4
+        fetched = self._get_fetcher().fetch_many(urls, max_pending=max_pending)
+
+        def skip(url, page):
+            return page is not None and bool(page.body) and should_extract is not None \
+                and not should_extract(url, page.body)
+
+        if workers <= 1:
+            for url, page in fetched:
+                if skip(url, page):
+                    yield {'url': url, 'title': None, 'content': None, 'skipped': True}
+                elif page is None:
+                    yield self.extract_from_html(url, None)
+                else:
+                    yield self.extract_from_html(url, page.body, encoding=page.encoding)
+            return
+
+        with self.process_pool(workers) as extract_pool:
+            pending = deque()
+
+            def collect():
+                url, future = pending.popleft()
+                METRICS.set_gauge('queue_depth', len(pending), queue='extract')
+                result = None
+                try:
+                    if future:
+                        result, worker_metrics = future.result()
+                        if worker_metrics:
+                            METRICS.merge(worker_metrics)
+                except Exception:
+                    METRICS.inc('errors_total', stage='extract')
+                return result or {'url': url, 'title': None, 'content': None}
+
+            for url, page in fetched:
+                future = None
+                if skip(url, page):
+                    future = Future()
+                    future.set_result(({'url': url, 'title': None, 'content': None, 'skipped': True}, None))
+                elif page is not None and page.body:
+                    future = self.submit(extract_pool, url, page.body, page.encoding)
+                pending.append((url, future))
+                METRICS.set_gauge('queue_depth', len(pending), queue='extract')
+                if len(pending) >= max_pending:
+                    yield collect()
+
+            while pending:
+                yield collect()
 
 # --- Example Usage (if run directly) ---
+# project_root is already on sys.path (see the top of this module)
 if __name__ == "__main__":
-    import json
-    import os
-    import sys
-    from urllib.parse import urlparse
-
-    # --- Setup Project Path ---
-    # Get the directory containing the 'src' directory (project root)
-    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    # Add the project root to the Python path
-    if project_root not in sys.path:
-        sys.path.insert(0, project_root)
-    # --------------------------
-
     # --- Imports relative to project root ---
     try:
         # Import FileSaver using its new path
-        from src.utils.FileSaver import write_to_markdown
+        from src.utils.FileSaver import write_to_markdown, build_output_filename
     except ImportError:
         print("Error: Could not import write_to_markdown from src.utils.FileSaver")
         sys.exit(1)
@@ -131,24 +326,7 @@ if __name__ == "__main__":
         for i, link in enumerate(target_urls):
             print(f"Processing: {link}")
             result = extractor.extract(link)
-            try:
-                parsed_uri = urlparse(link)
-                domain_name = parsed_uri.netloc if parsed_uri.netloc else "unknown_domain"
-                url_path_basename = os.path.basename(parsed_uri.path)
-
-                if not url_path_basename or url_path_basename == '/':
-                    filename_base = "index"
-                else:
-                    filename_base, _ = os.path.splitext(url_path_basename)
-
-                if not filename_base:
-                     filename_base = f"page_{i+1}"
-                output_filename_base = f"{filename_base}.md"
-
-            except Exception as e:
-                print(f"Warning: Error parsing URL '{link}' for filename generation: {e}")
-                domain_name = "parsing_error_domain"
-                output_filename_base = f"error_site_{i+1}.md"
+            domain_name, output_filename_base = build_output_filename(link, i)
 
             # write_to_markdown is imported from src.utils.FileSaver
             # It will handle placing files correctly relative to project root
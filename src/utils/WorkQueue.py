@@ -0,0 +1,407 @@
+# src/utils/WorkQueue.py
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List
+
+# A claimed URL goes back to the queue if its worker has not completed it by then
+DEFAULT_LEASE_SECONDS = 300
+# Claims per URL before it is given up on (its fetch or extraction failed, or a
+# worker died or hung on it, each time)
+DEFAULT_MAX_ATTEMPTS = 3
+# URLs queued per Redis script call, so one call never blocks the server for long
+REDIS_ADD_BATCH = 1000
+
+# URL states in the SQLite backend
+PENDING, LEASED, DONE, FAILED = 0, 1, 2, 3
+
+
+class PathClaims:
+    """
+    Output path registry shared by every worker of a job, with the dict
+    setdefault() interface OutputWriter uses for its per-run claims.
+    """
+
+    def __init__(self, work_queue):
+        self.work_queue = work_queue
+
+    def setdefault(self, key: str, url: str) -> str:
+        return self.work_queue.claim_path(key, url)
+
+
+class SqliteWorkQueue:
+    """
+    Shared URL queue and seen-set for one job in a SQLite database.
+
+    Every URL is added once (the table doubles as the seen-set) and moves
+    pending -> leased -> done. claim() leases a batch to a worker for
+    `lease_seconds`; leases that run out, and URLs the worker reports with
+    fail(), are handed out again, up to `max_attempts` times, so neither a
+    crashed worker nor a transient error loses a page. complete() and
+    fail() only apply to URLs the worker still holds: once a lease has been
+    handed to another worker, the late report is ignored.
+
+    Several processes can share the file on one machine. SQLite locking is
+    unreliable on network filesystems, so use the Redis backend across
+    machines.
+    """
+
+    def __init__(self, path: str, name: str = 'default',
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Autocommit mode; claim() takes the write lock up front with BEGIN IMMEDIATE
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS urls (
+                job TEXT NOT NULL,
+                url TEXT NOT NULL,
+                state INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_until REAL,
+                worker TEXT,
+                PRIMARY KEY (job, url)
+            );
+            CREATE INDEX IF NOT EXISTS urls_state ON urls (job, state);
+            CREATE TABLE IF NOT EXISTS jobs (
+                job TEXT PRIMARY KEY,
+                crawl_done INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS paths (
+                job TEXT NOT NULL,
+                path TEXT NOT NULL,
+                url TEXT NOT NULL,
+                PRIMARY KEY (job, path)
+            );
+        """)
+
+    def add_many(self, urls: Iterable[str]) -> int:
+        """Queues the URLs not seen before in this job. Returns how many were new."""
+        with self._lock:
+            before = self._db.total_changes
+            self._db.execute("BEGIN")
+            self._db.executemany("INSERT OR IGNORE INTO urls (job, url) VALUES (?, ?)",
+                                 ((self.name, url) for url in urls))
+            self._db.execute("COMMIT")
+            return self._db.total_changes - before
+
+    def add(self, url: str) -> bool:
+        return self.add_many([url]) == 1
+
+    def claim(self, worker: str, count: int) -> List[str]:
+        """Leases up to `count` pending URLs to a worker, oldest first."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "UPDATE urls SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END"
+                    " WHERE job = ? AND state = ? AND lease_until < ?",
+                    (self.max_attempts, FAILED, PENDING, self.name, LEASED, now))
+                urls = [row[0] for row in self._db.execute(
+                    "SELECT url FROM urls WHERE job = ? AND state = ? ORDER BY rowid LIMIT ?",
+                    (self.name, PENDING, count))]
+                self._db.executemany(
+                    "UPDATE urls SET state = ?, attempts = attempts + 1, lease_until = ?, worker = ?"
+                    " WHERE job = ? AND url = ?",
+                    ((LEASED, now + self.lease_seconds, worker, self.name, url) for url in urls))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return urls
+
+    def complete(self, worker: str, urls: Iterable[str]) -> int:
+        """Marks URLs the worker still holds as done. Returns how many it held."""
+        with self._lock:
+            before = self._db.total_changes
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "UPDATE urls SET state = ?, lease_until = NULL"
+                " WHERE job = ? AND url = ? AND state = ? AND worker = ?",
+                ((DONE, self.name, url, LEASED, worker) for url in urls))
+            self._db.execute("COMMIT")
+            return self._db.total_changes - before
+
+    def fail(self, worker: str, urls: Iterable[str]) -> int:
+        """
+        Puts URLs the worker still holds back in the queue, or marks them
+        failed once they have been claimed max_attempts times. Returns how
+        many it held.
+        """
+        with self._lock:
+            before = self._db.total_changes
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "UPDATE urls SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, lease_until = NULL"
+                " WHERE job = ? AND url = ? AND state = ? AND worker = ?",
+                ((self.max_attempts, FAILED, PENDING, self.name, url, LEASED, worker) for url in urls))
+            self._db.execute("COMMIT")
+            return self._db.total_changes - before
+
+    def claim_path(self, key: str, url: str) -> str:
+        """Reserves an output path for url unless another URL has it. Returns the owner."""
+        with self._lock:
+            self._db.execute("INSERT OR IGNORE INTO paths (job, path, url) VALUES (?, ?, ?)",
+                             (self.name, key, url))
+            return self._db.execute("SELECT url FROM paths WHERE job = ? AND path = ?",
+                                    (self.name, key)).fetchone()[0]
+
+    def path_claims(self) -> PathClaims:
+        return PathClaims(self)
+
+    def mark_crawl_done(self):
+        """Tells workers no more URLs are coming, so they exit once the queue is drained."""
+        with self._lock:
+            self._db.execute("INSERT INTO jobs (job, crawl_done) VALUES (?, 1)"
+                             " ON CONFLICT (job) DO UPDATE SET crawl_done = 1", (self.name,))
+
+    def counts(self) -> Dict[str, int]:
+        """URL counts by state ('pending', 'leased', 'done', 'failed') and 'seen' in total."""
+        with self._lock:
+            rows = dict(self._db.execute("SELECT state, COUNT(*) FROM urls WHERE job = ? GROUP BY state",
+                                         (self.name,)).fetchall())
+        counts = {'pending': rows.get(PENDING, 0), 'leased': rows.get(LEASED, 0),
+                  'done': rows.get(DONE, 0), 'failed': rows.get(FAILED, 0)}
+        counts['seen'] = sum(counts.values())
+        return counts
+
+    def crawl_done(self) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT crawl_done FROM jobs WHERE job = ?", (self.name,)).fetchone()
+        return bool(row and row[0])
+
+    def finished(self) -> bool:
+        """True once the crawl is done and every URL is done or failed."""
+        if not self.crawl_done():
+            return False
+        counts = self.counts()
+        return counts['pending'] == 0 and counts['leased'] == 0
+
+    def reset(self):
+        """Forgets the job's URLs, paths and crawl state (for a fresh crawl)."""
+        with self._lock:
+            self._db.execute("BEGIN")
+            for table in ('urls', 'jobs', 'paths'):
+                self._db.execute(f"DELETE FROM {table} WHERE job = ?", (self.name,))
+            self._db.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# Queues the URLs not in the seen set, in one step so a crash cannot leave a
+# URL seen but never queued; returns how many were new.
+# KEYS: seen, pending   ARGV: url...
+_REDIS_ADD_SCRIPT = """
+local added = 0
+for i = 1, #ARGV do
+    if redis.call('SADD', KEYS[1], ARGV[i]) == 1 then
+        redis.call('RPUSH', KEYS[2], ARGV[i])
+        added = added + 1
+    end
+end
+return added
+"""
+
+# Moves expired leases back to the queue (or to the failed set after
+# max_attempts claims), then leases up to `count` pending URLs to a worker.
+# Times come from the server's clock, so workers' clocks need not agree.
+# KEYS: pending, leased, attempts, failed, owners   ARGV: lease_seconds, count, max_attempts, worker
+_REDIS_CLAIM_SCRIPT = """
+-- TIME is non-deterministic: replicate the script's writes, not the script (Redis < 5)
+if redis.replicate_commands then redis.replicate_commands() end
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local lease_until = now + tonumber(ARGV[1])
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)
+for _, url in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], url)
+    redis.call('HDEL', KEYS[5], url)
+    if tonumber(redis.call('HGET', KEYS[3], url) or '0') >= tonumber(ARGV[3]) then
+        redis.call('SADD', KEYS[4], url)
+    else
+        redis.call('RPUSH', KEYS[1], url)
+    end
+end
+local urls = {}
+for i = 1, tonumber(ARGV[2]) do
+    local url = redis.call('LPOP', KEYS[1])
+    if not url then break end
+    redis.call('ZADD', KEYS[2], lease_until, url)
+    redis.call('HINCRBY', KEYS[3], url, 1)
+    redis.call('HSET', KEYS[5], url, ARGV[4])
+    urls[#urls + 1] = url
+end
+return urls
+"""
+
+# Marks the URLs the worker still holds as done; returns how many it held.
+# KEYS: leased, attempts, owners, done   ARGV: worker, url...
+_REDIS_COMPLETE_SCRIPT = """
+local held = 0
+for i = 2, #ARGV do
+    local url = ARGV[i]
+    if redis.call('HGET', KEYS[3], url) == ARGV[1] and redis.call('ZSCORE', KEYS[1], url) then
+        redis.call('ZREM', KEYS[1], url)
+        redis.call('HDEL', KEYS[2], url)
+        redis.call('HDEL', KEYS[3], url)
+        held = held + 1
+    end
+end
+if held > 0 then
+    redis.call('INCRBY', KEYS[4], held)
+end
+return held
+"""
+
+# Requeues the URLs the worker still holds, or moves them to the failed set
+# after max_attempts claims; returns how many it held.
+# KEYS: pending, leased, attempts, failed, owners   ARGV: max_attempts, worker, url...
+_REDIS_FAIL_SCRIPT = """
+local held = 0
+for i = 3, #ARGV do
+    local url = ARGV[i]
+    if redis.call('HGET', KEYS[5], url) == ARGV[2] and redis.call('ZSCORE', KEYS[2], url) then
+        redis.call('ZREM', KEYS[2], url)
+        redis.call('HDEL', KEYS[5], url)
+        if tonumber(redis.call('HGET', KEYS[3], url) or '0') >= tonumber(ARGV[1]) then
+            redis.call('SADD', KEYS[4], url)
+        else
+            redis.call('RPUSH', KEYS[1], url)
+        end
+        held = held + 1
+    end
+end
+return held
+"""
+
+
+class RedisWorkQueue:
+    """
+    The same queue on a Redis-protocol server (Redis, Valkey, KeyDB, ...),
+    for coordinator and workers on different machines.
+
+    Keys, all under '<prefix>:<name>:': 'seen' (set of every URL added),
+    'pending' (list), 'leased' (sorted set scored by lease expiry),
+    'attempts' (hash), 'owners' (hash of the worker holding each lease),
+    'failed' (set), 'done' (counter), 'crawl_done' and 'paths' (hash of
+    claimed output paths). Lease expiry is measured on the Redis server's
+    clock, so the nodes' clocks need not agree.
+
+    Needs the optional 'redis' package (pip install redis).
+    """
+
+    def __init__(self, url: str, name: str = 'default',
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS, prefix: str = 'site_scraper'):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("The Redis work queue needs the 'redis' package (pip install redis).") from None
+        self.path = url
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._add_script = self._redis.register_script(_REDIS_ADD_SCRIPT)
+        self._claim_script = self._redis.register_script(_REDIS_CLAIM_SCRIPT)
+        self._complete_script = self._redis.register_script(_REDIS_COMPLETE_SCRIPT)
+        self._fail_script = self._redis.register_script(_REDIS_FAIL_SCRIPT)
+        base = f"{prefix}:{name}:"
+        self._keys = {key: base + key for key in
+                      ('seen', 'pending', 'leased', 'attempts', 'owners', 'failed', 'done',
+                       'crawl_done', 'paths')}
+
+    def add_many(self, urls: Iterable[str]) -> int:
+        urls = list(urls)
+        if not urls:
+            return 0
+        keys = [self._keys['seen'], self._keys['pending']]
+        return sum(self._add_script(keys=keys, args=urls[start:start + REDIS_ADD_BATCH])
+                   for start in range(0, len(urls), REDIS_ADD_BATCH))
+
+    def add(self, url: str) -> bool:
+        return self.add_many([url]) == 1
+
+    def claim(self, worker: str, count: int) -> List[str]:
+        keys = [self._keys[k] for k in ('pending', 'leased', 'attempts', 'failed', 'owners')]
+        return self._claim_script(keys=keys, args=[self.lease_seconds, count, self.max_attempts, worker])
+
+    def complete(self, worker: str, urls: Iterable[str]) -> int:
+        urls = list(urls)
+        if not urls:
+            return 0
+        keys = [self._keys[k] for k in ('leased', 'attempts', 'owners', 'done')]
+        return self._complete_script(keys=keys, args=[worker, *urls])
+
+    def fail(self, worker: str, urls: Iterable[str]) -> int:
+        urls = list(urls)
+        if not urls:
+            return 0
+        keys = [self._keys[k] for k in ('pending', 'leased', 'attempts', 'failed', 'owners')]
+        return self._fail_script(keys=keys, args=[self.max_attempts, worker, *urls])
+
+    def claim_path(self, key: str, url: str) -> str:
+        pipe = self._redis.pipeline()
+        pipe.hsetnx(self._keys['paths'], key, url)
+        pipe.hget(self._keys['paths'], key)
+        return pipe.execute()[1]
+
+    def path_claims(self) -> PathClaims:
+        return PathClaims(self)
+
+    def mark_crawl_done(self):
+        self._redis.set(self._keys['crawl_done'], 1)
+
+    def counts(self) -> Dict[str, int]:
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.llen(self._keys['pending'])
+        pipe.zcard(self._keys['leased'])
+        pipe.get(self._keys['done'])
+        pipe.scard(self._keys['failed'])
+        pipe.scard(self._keys['seen'])
+        pending, leased, done, failed, seen = pipe.execute()
+        return {'pending': pending, 'leased': leased, 'done': int(done or 0),
+                'failed': failed, 'seen': seen}
+
+    def crawl_done(self) -> bool:
+        return bool(self._redis.exists(self._keys['crawl_done']))
+
+    def finished(self) -> bool:
+        if not self.crawl_done():
+            return False
+        counts = self.counts()
+        return counts['pending'] == 0 and counts['leased'] == 0
+
+    def reset(self):
+        self._redis.delete(*self._keys.values())
+
+    def close(self):
+        self._redis.close()
+
+
+def open_work_queue(spec: str, name: str = 'default',
+                    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                    max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+    """
+    Opens a work queue from a location: 'redis://host:6379/0' (also
+    rediss:// and unix://) for the Redis backend, or 'sqlite:///path/to/queue.db'
+    or a plain file path for the SQLite backend.
+    """
+    if spec.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisWorkQueue(spec, name, lease_seconds=lease_seconds, max_attempts=max_attempts)
+    if spec.startswith('sqlite:///'):
+        # sqlite:///queue.db is relative, sqlite:////var/queue.db absolute
+        spec = spec[len('sqlite:///'):]
+    return SqliteWorkQueue(spec, name, lease_seconds=lease_seconds, max_attempts=max_attempts)
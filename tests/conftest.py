@@ -0,0 +1,38 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+# --- Setup Project Path ---
+# The modules import each other as 'src.…', so the project root must be importable
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# --------------------------
+
+
+@pytest.fixture
+def output_root(tmp_path, monkeypatch):
+    """Points the default output folder (and manifests) at a temporary directory."""
+    from src.utils import FileSaver
+    monkeypatch.setattr(FileSaver, 'project_root', str(tmp_path))
+    return tmp_path / FileSaver.BASE_OUTPUT_DIR_NAME
+
+
+@pytest.fixture
+def synthetic_site():
+    """A small generated site served from 127.0.0.1 (see SyntheticSite); yields it started."""
+    pytest.importorskip("scrapy")
+    from src.benchmark import SyntheticSite
+    site = SyntheticSite(pages=12, fanout=3, page_kb=2)
+    site.start_url = site.start()
+    yield site
+    site.stop()
+
+
+def run_in_subprocess(code: str, timeout: float = 120):
+    """Runs Python code in a fresh interpreter at the project root (each Twisted reactor runs once per process)."""
+    import subprocess
+    return subprocess.run([sys.executable, "-c", code], cwd=project_root, capture_output=True,
+                          text=True, timeout=timeout)
@@ -0,0 +1,62 @@
+# tests/test_app.py
+import json
+
+import pytest
+
+pytest.importorskip("scrapy")
+
+from src import app
+from src.find_urls import FOUND_URLS_LOG
+from src.run_url_finder import sync_feed_with_found_urls
+
+START_URL = "http://example.com/"
+
+
+class FakeExtraction:
+    """Stands in for ExtractionRun, recording the URLs it was given."""
+    extracted = []
+
+    def __init__(self, args, output_path=None):
+        FakeExtraction.extracted = []
+
+    def extract_all(self, urls):
+        FakeExtraction.extracted.extend(urls)
+
+    def close(self, source, close_reason='finished'):
+        pass
+
+
+def test_stream_resume_extracts_urls_recovered_from_the_checkpoint(tmp_path, monkeypatch):
+    url_list = tmp_path / "example_com_urls.jsonl"
+    url_list.write_text(''.join(json.dumps({'url': f"{START_URL}{i}"}) + '\n' for i in range(2)))
+    crawl_dir = tmp_path / "job" / "crawl"
+    crawl_dir.mkdir(parents=True)
+    # The interrupted crawl checkpointed a third URL that never reached the list
+    (crawl_dir / FOUND_URLS_LOG).write_text(''.join(f"{START_URL}{i}\n" for i in range(3)))
+
+    def fake_crawl(args, url_list_path, settings, extract_content=False):
+        # Like configure_crawl on resume; the resumed crawl itself finds nothing new
+        sync_feed_with_found_urls(url_list_path, app.crawl_job_dir(args))
+        settings['URL_STREAM'].close()
+        return 'finished'
+
+    monkeypatch.setattr(app, "url_list_path_for", lambda start_url: ("example_com", str(url_list)))
+    monkeypatch.setattr(app, "run_crawl", fake_crawl)
+    monkeypatch.setattr(app, "ExtractionRun", FakeExtraction)
+
+    app.main([START_URL, "--stream", "--resume", "--job-dir", str(tmp_path / "job")])
+
+    assert FakeExtraction.extracted == [f"{START_URL}{i}" for i in range(3)]
+
+
+def test_interrupted_crawl_is_not_extracted(tmp_path, monkeypatch):
+    url_list = tmp_path / "example_com_urls.jsonl"
+    url_list.write_text(json.dumps({'url': START_URL}) + '\n')
+    FakeExtraction.extracted = []
+    monkeypatch.setattr(app, "url_list_path_for", lambda start_url: ("example_com", str(url_list)))
+    monkeypatch.setattr(app, "run_crawl", lambda *args, **kwargs: 'shutdown')
+    monkeypatch.setattr(app, "ExtractionRun", FakeExtraction)
+
+    with pytest.raises(SystemExit):
+        app.main([START_URL])
+    assert FakeExtraction.extracted == []
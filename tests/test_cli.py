@@ -0,0 +1,39 @@
+# tests/test_cli.py
+import json
+import os
+import subprocess
+import sys
+
+from src.cli import main
+from src.utils.Metrics import Metrics
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_stats_command_summarizes_a_snapshot(tmp_path, capsys):
+    metrics = Metrics()
+    metrics.observe('stage_seconds', 0.2, stage='fetch')
+    metrics.inc('errors_total', 3, stage='fetch')
+    metrics.set_gauge('queue_depth', 7, queue='stream')
+    stats_file = tmp_path / "stats.json"
+    stats_file.write_text(json.dumps(metrics.snapshot()), encoding='utf-8')
+
+    assert main(["stats", str(stats_file), "--gauges"]) == 0
+    out = capsys.readouterr().out
+    assert "fetch" in out and "1 pages" in out
+    assert 'errors_total{stage="fetch"} 3' in out
+    assert 'queue_depth{queue="stream"} 7' in out
+
+
+def test_stats_command_reports_unreadable_files(tmp_path, capsys):
+    assert main(["stats", str(tmp_path / "missing.json")]) == 1
+    assert "Could not read stats file" in capsys.readouterr().out
+
+
+def test_cli_imports_without_crawl_or_extraction_dependencies():
+    heavy = ('scrapy', 'twisted', 'trafilatura', 'lxml', 'requests')
+    code = (f"import sys; import src.cli; "
+            f"print([name for name in {heavy!r} if name in sys.modules])")
+    result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
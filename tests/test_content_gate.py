@@ -0,0 +1,36 @@
+# tests/test_content_gate.py
+from src.utils.ContentGate import ContentGate
+
+
+def test_skips_binary_extensions_before_requesting():
+    gate = ContentGate()
+    assert gate.check_url("https://example.com/report.PDF?download=1") == 'extension'
+    assert gate.check_url("https://example.com/docs/intro.html") is None
+    assert gate.check_url("https://example.com/v1.2/") is None
+
+
+def test_checks_content_type_and_length_on_headers():
+    gate = ContentGate(max_bytes=1000)
+    assert gate.check_headers("image/png", 10) == 'content_type'
+    assert gate.check_headers("text/html; charset=utf-8", 10) is None
+    assert gate.check_headers(None, 10) is None
+    assert gate.check_headers("text/html", 1001) == 'too_large'
+    assert gate.check_headers("text/html", None) is None
+
+
+def test_streamed_size_and_disabled_checks():
+    gate = ContentGate(max_bytes=1000)
+    assert gate.check_size(1000) is None
+    assert gate.check_size(1001) == 'too_large'
+
+    unlimited = ContentGate(content_types=(), max_bytes=0)
+    assert unlimited.check_headers("application/pdf", 10 ** 9) is None
+    assert unlimited.check_size(10 ** 9) is None
+
+
+def test_counts_skips_by_reason():
+    gate = ContentGate()
+    gate.check_url("https://example.com/a.zip")
+    gate.check_url("https://example.com/b.zip")
+    gate.check_headers("application/json", None)
+    assert gate.summary() == "content_type: 1, extension: 2"
@@ -0,0 +1,28 @@
+# tests/test_crawl_priority.py
+import pytest
+
+from src.utils.CrawlPriority import PriorityScorer, parse_lastmod, parse_pattern_weights
+
+
+def test_parse_lastmod_accepts_w3c_datetimes():
+    assert parse_lastmod("2024") == parse_lastmod("2024-01-01T00:00:00Z")
+    assert parse_lastmod("2024-03") == parse_lastmod("2024-03-01")
+    assert parse_lastmod("2024-03-01T12:00:00+02:00") == parse_lastmod("2024-03-01T10:00:00Z")
+    assert parse_lastmod("last tuesday") is None
+    assert parse_lastmod(None) is None
+
+
+def test_parse_pattern_weights():
+    assert parse_pattern_weights(["*/blog/*=50", "*a=b*=-5"]) == {"*/blog/*": 50.0, "*a=b*": -5.0}
+    with pytest.raises(ValueError):
+        parse_pattern_weights(["*/blog/*"])
+
+
+def test_recent_shallow_and_matching_pages_score_higher():
+    scorer = PriorityScorer(use_history=False, pattern_weights={"*/blog/*": 50})
+    url = "https://example.com/docs/page"
+    assert scorer.score(url, depth=0) > scorer.score(url, depth=3)
+    assert scorer.score(url, lastmod="2999-01-01") > scorer.score(url, lastmod="2001-01-01")
+    assert scorer.score(url, changefreq="daily") > scorer.score(url, changefreq="yearly")
+    assert scorer.score("https://example.com/blog/post") == scorer.score(url) + 50
+    assert scorer.score(url, depth=1) % scorer.resolution == 0
@@ -0,0 +1,31 @@
+# tests/test_distributed.py
+import pytest
+
+from src.utils.OutputWriter import iter_output_records
+from src.utils.WorkQueue import SqliteWorkQueue
+
+
+def test_worker_claims_completes_and_fails_until_the_job_is_finished(tmp_path, synthetic_site):
+    pytest.importorskip("requests")
+    from src.distributed import parse_args, run_worker
+
+    queue_path = str(tmp_path / "queue.db")
+    base = synthetic_site.start_url.rsplit('/', 1)[0]
+    pages = [f"{base}/{i}.html" for i in range(synthetic_site.pages)]
+    missing = f"{base}/999.html" # 404: fails on every attempt
+    work_queue = SqliteWorkQueue(queue_path, 'job')
+    work_queue.add_many(pages + [missing])
+    work_queue.mark_crawl_done()
+
+    output = str(tmp_path / "worker.jsonl")
+    run_worker(parse_args([
+        "worker", "--queue", queue_path, "--job", "job", "--worker-id", "w1",
+        "--batch-size", "5", "--max-attempts", "2", "--retries", "0", "--poll-interval", "0.1",
+        "--output-format", "jsonl", "--output-path", output]))
+
+    counts = work_queue.counts()
+    assert (counts['done'], counts['failed'], counts['pending'], counts['leased']) == (len(pages), 1, 0, 0)
+    assert sorted(record.url for record in iter_output_records(output)) == sorted(pages)
+    # Every page fetched once, the missing one once per attempt
+    assert synthetic_site.requests == len(pages) + 2
+    work_queue.close()
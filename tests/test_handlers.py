@@ -0,0 +1,36 @@
+# tests/test_handlers.py
+import pytest
+
+pytest.importorskip("scrapy")
+
+from scrapy import Request
+from scrapy.core.downloader.handlers.http11 import HTTP11DownloadHandler
+from scrapy.utils.test import get_crawler
+from twisted.internet import defer
+
+from src.handlers import GlobalConcurrencyDownloadHandler
+
+
+def test_global_slots_are_shared_by_crawlers_and_held_only_while_downloading(monkeypatch):
+    started = []
+
+    def fake_download(self, request, spider):
+        started.append(defer.Deferred())
+        return started[-1]
+
+    monkeypatch.setattr(HTTP11DownloadHandler, "download_request", fake_download)
+    monkeypatch.setattr(GlobalConcurrencyDownloadHandler, "_pools", {})
+    settings = {'GLOBAL_CONCURRENT_REQUESTS': 1}
+    first = GlobalConcurrencyDownloadHandler.from_crawler(get_crawler(settings_dict=settings))
+    second = GlobalConcurrencyDownloadHandler.from_crawler(get_crawler(settings_dict=settings))
+
+    responses = []
+    first.download_request(Request("http://a.example/"), None).addCallback(responses.append)
+    second.download_request(Request("http://b.example/"), None).addCallback(responses.append)
+    assert len(started) == 1
+
+    started[0].callback("a")
+    assert responses == ["a"] and len(started) == 2
+    started[1].callback("b")
+    assert responses == ["a", "b"]
+    assert first.pool is second.pool and first.pool.tokens == 1
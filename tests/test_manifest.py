@@ -0,0 +1,76 @@
+# tests/test_manifest.py
+import os
+
+from src.utils.FileSaver import build_output_filename
+from src.utils.Manifest import ManifestSet
+from src.utils.NearDuplicates import NearDuplicateIndex
+from src.utils.OutputWriter import MarkdownTreeSink, OutputWriter
+
+CANONICAL = "https://example.com/z.html"
+ALIAS = "https://example.com/a.html"
+TEXT = ("Near-duplicate pages share almost all of their words, so their SimHash "
+        "fingerprints differ in very few bits. ") * 20
+
+
+def _run(output_root, pages):
+    """One incremental run with near-duplicate detection; returns {url: path written to}."""
+    manifests = ManifestSet()
+    writer = OutputWriter(MarkdownTreeSink(str(output_root)), manifests=manifests,
+                          near_duplicates=NearDuplicateIndex())
+    written = {}
+    for i, (url, content) in enumerate(pages):
+        domain, relpath = build_output_filename(url, i)
+        result = {'url': url, 'title': url, 'content': content}
+        manifest = manifests[domain]
+        manifest.mark_seen(url)
+        written[url] = writer.write(result, domain, relpath)
+        manifest.record_output(url, written[url], content)
+    writer.close()
+    manifests.save_all()
+    return written
+
+
+def test_canonical_keeps_its_file_after_reload(output_root):
+    # The alias sorts before the canonical page in the saved manifest
+    first = _run(output_root, [(CANONICAL, TEXT), (ALIAS, TEXT + " Footer.")])
+    assert first[ALIAS] == first[CANONICAL]
+    assert os.path.basename(first[CANONICAL]) == "z.md"
+
+    second = _run(output_root, [(CANONICAL, "Completely rewritten page. " * 30)])
+    assert second[CANONICAL] == first[CANONICAL]
+    assert sorted(name for name in os.listdir(os.path.dirname(first[CANONICAL]))
+                  if name.endswith(".md")) == ["z.md"]
+
+
+def test_alias_entries_do_not_own_output(output_root):
+    manifests = ManifestSet()
+    manifest = manifests["example_com"]
+    path = os.path.join(manifest.domain_dir, "z.md")
+    manifest.record_output(ALIAS, path, TEXT)
+    manifest.record_alias(ALIAS, CANONICAL)
+    manifest.record_output(CANONICAL, path, TEXT)
+    manifest.record_alias(CANONICAL, None)
+    manifests.save_all()
+
+    reloaded = ManifestSet()["example_com"]
+    assert reloaded.pages[ALIAS]['alias_of'] == CANONICAL
+    assert reloaded.output_owner("z.md") == CANONICAL
+
+
+def _previous_run(output_root):
+    manifests = ManifestSet()
+    manifest = manifests["example_com"]
+    for url in (CANONICAL, ALIAS):
+        manifest.record_output(url, os.path.join(manifest.domain_dir, "page.md"), TEXT)
+    manifests.save_all()
+
+
+def test_unfinished_crawl_keeps_pages_it_did_not_reach(output_root):
+    _previous_run(output_root)
+
+    for close_reason, kept in (("shutdown", {CANONICAL, ALIAS}), (None, {CANONICAL, ALIAS}),
+                               ("closespider_itemcount", {CANONICAL, ALIAS}), ("finished", {CANONICAL})):
+        manifests = ManifestSet()
+        manifests["example_com"].mark_seen(CANONICAL)
+        manifests.finish(close_reason)
+        assert set(ManifestSet()["example_com"].pages) == kept, close_reason
@@ -0,0 +1,31 @@
+# tests/test_metrics.py
+from src.utils.Metrics import Metrics, MetricsServer
+
+
+def test_quantiles_are_interpolated_within_a_bucket():
+    metrics = Metrics()
+    # Every value falls in the 25-50 ms bucket
+    for i in range(100):
+        metrics.observe('stage_seconds', 0.026 + i * 0.0002, stage='fetch')
+    h = metrics.snapshot()['histograms']['stage_seconds']['stage="fetch"']
+
+    assert h['p50'] < h['p99'] <= h['max']
+    assert 0.025 < h['p50'] < 0.05
+
+
+def test_quantiles_across_buckets():
+    metrics = Metrics()
+    for value in [0.002] * 90 + [2.0] * 10:
+        metrics.observe('stage_seconds', value, stage='fetch')
+    h = metrics.snapshot()['histograms']['stage_seconds']['stage="fetch"']
+
+    assert 0.001 < h['p50'] <= 0.0025
+    assert 1.0 < h['p99'] <= 2.0
+
+
+def test_metrics_server_listens_on_localhost_by_default():
+    server = MetricsServer(Metrics(), 0)
+    try:
+        assert server._server.server_address[0] == '127.0.0.1'
+    finally:
+        server.stop()
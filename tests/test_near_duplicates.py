@@ -0,0 +1,33 @@
+# tests/test_near_duplicates.py
+from src.utils.NearDuplicates import NearDuplicateIndex, hamming_distance, simhash
+from src.utils.OutputWriter import MarkdownTreeSink, OutputWriter
+
+ARTICLE = " ".join(f"sentence {i} talks about crawling and extraction of pages" for i in range(60))
+
+
+def test_simhash_keeps_near_duplicates_close():
+    variant = ARTICLE + " Printed from the print view."
+    other = " ".join(f"unrelated paragraph {i} about cooking pasta with tomatoes" for i in range(60))
+    assert hamming_distance(simhash(ARTICLE), simhash(variant)) <= 3
+    assert hamming_distance(simhash(ARTICLE), simhash(other)) > 10
+    assert simhash(ARTICLE.upper()) == simhash(ARTICLE)
+
+
+def test_index_finds_fingerprints_within_max_distance():
+    index = NearDuplicateIndex(max_distance=3)
+    index.add(0b1011 << 40, "first")
+    assert index.find((0b1011 << 40) ^ 0b111) == "first"
+    assert index.find((0b1011 << 40) ^ 0b1111) is None
+
+
+def test_writer_collapses_near_duplicates_into_aliases(tmp_path):
+    writer = OutputWriter(MarkdownTreeSink(str(tmp_path)), near_duplicates=NearDuplicateIndex())
+    first = writer.write({'url': "https://example.com/a", 'title': "A", 'content': ARTICLE})
+    second = writer.write({'url': "https://example.com/a?print=1", 'title': "A",
+                           'content': ARTICLE + " Print view."})
+    writer.close()
+
+    assert second == first
+    assert writer.duplicates == 1
+    with open(first, encoding='utf-8') as f:
+        assert '  - "https://example.com/a?print=1"' in f.read()
@@ -0,0 +1,42 @@
+# tests/test_output_writer.py
+import pytest
+
+from src.utils.OutputWriter import OutputWriter, create_sink, iter_output_records
+
+PAGES = [
+    {'url': f"https://example.com/docs/page{i}", 'title': f"Page {i}", 'content': f"Body of page {i}."}
+    for i in range(5)
+]
+
+
+@pytest.mark.parametrize('output_format', ['jsonl', 'jsonl.gz', 'tar', 'zip'])
+def test_bulk_output_round_trips(tmp_path, output_format):
+    path = str(tmp_path / f"site.{output_format}")
+    writer = OutputWriter(create_sink(output_format, path, shard_size=2), batch_size=2)
+    locations = [writer.write(page) for page in PAGES]
+    writer.close()
+
+    assert writer.pages_written == len(PAGES)
+    records = [record for location in dict.fromkeys(locations) for record in iter_output_records(location)]
+    assert [record.url for record in records] == [page['url'] for page in PAGES]
+    assert all(record.domain == 'example.com' for record in records)
+    assert all(page['content'] in record.markdown for page, record in zip(PAGES, records))
+    if output_format in ('tar', 'zip'):
+        assert len(set(locations)) == 3  # 5 pages in shards of 2
+
+
+def test_paths_colliding_in_one_run_get_suffixed(tmp_path):
+    writer = OutputWriter(create_sink('jsonl', str(tmp_path / "site.jsonl")))
+    writer.write({'url': "https://example.com/a/", 'title': "A", 'content': "Directory index."})
+    writer.write({'url': "https://example.com/a/index.html", 'title': "A", 'content': "Index file."})
+    writer.close()
+
+    paths = [record.relpath for record in iter_output_records(str(tmp_path / "site.jsonl"))]
+    assert len(set(paths)) == 2
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        create_sink('parquet', str(tmp_path / "site.parquet"))
+    with pytest.raises(ValueError):
+        create_sink('jsonl')
@@ -0,0 +1,29 @@
+# tests/test_pipelines.py
+import pytest
+
+from conftest import run_in_subprocess
+from src.utils.OutputWriter import iter_output_records
+
+CRAWL = """
+import sys
+from src.run_url_finder import run_spider
+reason = run_spider({start_url!r}, {url_list!r}, extract_content=True, extract_workers={workers},
+                    extra_settings={{'OUTPUT_FORMAT': 'jsonl', 'OUTPUT_PATH': {output!r},
+                                     'DOWNLOAD_DELAY': 0, 'AUTOTHROTTLE_ENABLED': False,
+                                     'LOG_LEVEL': 'WARNING'}})
+sys.exit(0 if reason == 'finished' else 1)
+"""
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_single_fetch_downloads_each_page_once(tmp_path, synthetic_site, workers):
+    output = str(tmp_path / "site.jsonl")
+    crawl = run_in_subprocess(CRAWL.format(start_url=synthetic_site.start_url, workers=workers,
+                                           url_list=str(tmp_path / "urls.jsonl"), output=output))
+    assert crawl.returncode == 0, crawl.stdout + crawl.stderr
+
+    records = list(iter_output_records(output))
+    assert len({record.url for record in records}) == synthetic_site.pages
+    assert all("Page" in record.markdown for record in records)
+    # One request per page, plus robots.txt
+    assert synthetic_site.requests == synthetic_site.pages + 1
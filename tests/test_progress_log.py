@@ -0,0 +1,28 @@
+# tests/test_progress_log.py
+from src.utils.ProgressLog import ProgressLog
+
+
+def test_resumed_log_skips_finished_urls(tmp_path):
+    path = str(tmp_path / "progress" / "done.txt")
+    log = ProgressLog(path)
+    log.mark_done("https://example.com/a")
+    log.mark_done("https://example.com/a")
+    log.mark_done("https://example.com/b")
+    # Not closed, as after a crash: every URL is already on disk
+    resumed = ProgressLog(path)
+    assert "https://example.com/a" in resumed and "https://example.com/b" in resumed
+    assert len(resumed) == 2
+    log.close()
+    resumed.close()
+
+
+def test_fresh_log_discards_earlier_progress(tmp_path):
+    path = str(tmp_path / "done.txt")
+    log = ProgressLog(path)
+    log.mark_done("https://example.com/a")
+    log.close()
+
+    fresh = ProgressLog(path, resume=False)
+    assert len(fresh) == 0
+    fresh.close()
+    assert ProgressLog(path).done == set()
@@ -0,0 +1,53 @@
+# tests/test_rate_control.py
+import time
+from email.utils import formatdate
+
+from src.utils.RateControl import MAX_RETRY_AFTER, AdaptiveRateController, parse_retry_after
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after(b" 5 ") == 5.0
+    assert parse_retry_after("-3") == 0.0
+    assert parse_retry_after("86400") == MAX_RETRY_AFTER
+    assert 55 <= parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_fast_host_speeds_up_additively():
+    rate = AdaptiveRateController(initial_concurrency=2, max_concurrency=3, initial_delay=1.0, window=5)
+    for _ in range(5):
+        rate.record("example.com", 0.1, 200)
+    assert (rate.concurrency("example.com"), rate.delay("example.com")) == (2, 0.5)
+    for _ in range(40):
+        rate.record("example.com", 0.1, 200)
+    assert (rate.concurrency("example.com"), rate.delay("example.com")) == (3, 0.0)
+
+
+def test_failing_host_slows_down_multiplicatively():
+    rate = AdaptiveRateController(initial_concurrency=8, window=5)
+    for _ in range(5):
+        rate.record("example.com", 0.1, 500)
+    assert rate.concurrency("example.com") == 4
+    assert rate.concurrency("other.example") == 8
+
+
+def test_429_with_retry_after_pauses_the_host():
+    rate = AdaptiveRateController(initial_concurrency=4)
+    rate.record("example.com", 0.1, 429, retry_after="30")
+    assert rate.concurrency("example.com") == 2
+    assert 29 < rate.delay("example.com") <= 30
+    assert rate.try_acquire("example.com") > 29
+    # A second 429 within a second comes from a request already in flight
+    rate.record("example.com", 0.1, 429)
+    assert rate.concurrency("example.com") == 2
+
+
+def test_slots_are_limited_to_the_host_concurrency():
+    rate = AdaptiveRateController(initial_concurrency=2)
+    assert rate.try_acquire("example.com") == 0.0
+    assert rate.try_acquire("example.com") == 0.0
+    assert rate.try_acquire("example.com") > 0
+    rate.release("example.com", 0.1, 200)
+    assert rate.try_acquire("example.com") == 0.0
@@ -0,0 +1,159 @@
+# tests/test_response_cache.py
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.utils.ResponseCache import ResponseCache
+
+PAGE = b"<html><head><title>Cached</title></head><body><p>Cached page.</p></body></html>"
+VALIDATORS = {'ETag': '"v1"', 'Content-Type': 'text/html; charset=utf-8'}
+
+
+def _body_files(cache):
+    return [name for _, _, names in os.walk(cache.bodies_dir) for name in names]
+
+
+def test_evicts_least_recently_used_urls_first(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=250)
+    for name in ("a", "b"):
+        cache.store(f"https://example.com/{name}", name.encode() * 100, VALIDATORS)
+        time.sleep(0.01)
+    assert cache.get("https://example.com/a") is not None
+    time.sleep(0.01)
+    cache.store("https://example.com/c", b"c" * 100, VALIDATORS)
+
+    assert cache.get("https://example.com/b") is None
+    assert cache.get("https://example.com/a")['body'] == b"a" * 100
+    assert cache.total_bytes() == 200
+    assert len(_body_files(cache)) == 2
+    cache.close()
+
+
+def test_identical_bodies_are_stored_once(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.store("https://example.com/a", PAGE, VALIDATORS)
+    cache.store("https://example.com/a?ref=nav", PAGE, VALIDATORS)
+    assert cache.total_bytes() == len(PAGE)
+    assert len(_body_files(cache)) == 1
+
+    cache.delete("https://example.com/a")
+    assert cache.get("https://example.com/a?ref=nav")['body'] == PAGE
+    cache.delete("https://example.com/a?ref=nav")
+    assert cache.total_bytes() == 0
+    assert _body_files(cache) == []
+    cache.close()
+
+
+def test_byte_total_and_recent_hits_survive_reopening(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=250)
+    cache.store("https://example.com/a", b"a" * 100, VALIDATORS)
+    time.sleep(0.01)
+    cache.store("https://example.com/b", b"b" * 100, VALIDATORS)
+    time.sleep(0.01)
+    cache.get("https://example.com/a")
+    cache.close()
+
+    cache = ResponseCache(str(tmp_path), max_bytes=250)
+    assert cache.total_bytes() == 200
+    cache.store("https://example.com/c", b"c" * 100, VALIDATORS)
+    assert cache.get("https://example.com/b") is None
+    assert cache.get("https://example.com/a") is not None
+    cache.close()
+
+
+def test_responses_without_validators_are_not_cached(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    assert not cache.store("https://example.com/a", PAGE, {'Content-Type': 'text/html'})
+    assert cache.get("https://example.com/a") is None
+    cache.close()
+
+
+class _RevalidatingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        self.conditional_headers = []
+        self.bodies_sent = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.conditional_headers.append(self.headers.get('If-None-Match'))
+                if self.headers.get('If-None-Match') == '"v1"':
+                    self.send_response(304)
+                    self.send_header('ETag', '"v1"')
+                    self.end_headers()
+                    return
+                server.bodies_sent += 1
+                self.send_response(200)
+                self.send_header('ETag', '"v1"')
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(PAGE)))
+                self.end_headers()
+                self.wfile.write(PAGE)
+
+            def log_message(self, format, *args):
+                pass
+
+        super().__init__(('127.0.0.1', 0), Handler)
+
+
+@pytest.fixture
+def revalidating_server():
+    server = _RevalidatingServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetcher_revalidates_and_reuses_the_body_on_304(tmp_path, revalidating_server):
+    pytest.importorskip("requests")
+    from src.utils.Fetcher import SessionFetcher
+
+    url = f"http://127.0.0.1:{revalidating_server.server_address[1]}/page"
+    cache = ResponseCache(str(tmp_path))
+    fetcher = SessionFetcher(cache=cache, retries=0)
+    first = fetcher.fetch(url)
+    second = fetcher.fetch(url)
+    fetcher.close()
+    cache.close()
+
+    assert first.body == second.body == PAGE
+    assert revalidating_server.conditional_headers == [None, '"v1"']
+    assert revalidating_server.bodies_sent == 1
+
+
+def test_scrapy_cache_sends_validators_and_reuses_the_body_on_304(tmp_path):
+    pytest.importorskip("scrapy")
+    from scrapy import Request
+    from scrapy.downloadermiddlewares.httpcache import HttpCacheMiddleware
+    from scrapy.http import HtmlResponse, Response
+    from scrapy.utils.test import get_crawler
+
+    crawler = get_crawler(settings_dict={
+        'HTTPCACHE_ENABLED': True,
+        'HTTPCACHE_DIR': str(tmp_path),
+        'HTTPCACHE_POLICY': 'src.httpcache.RevalidatingCachePolicy',
+        'HTTPCACHE_STORAGE': 'src.httpcache.ResponseCacheStorage',
+    })
+    spider = crawler._create_spider('test')
+    middleware = HttpCacheMiddleware.from_crawler(crawler)
+    middleware.spider_opened(spider)
+    url = "http://example.com/page"
+
+    first = Request(url)
+    assert middleware.process_request(first, spider) is None
+    middleware.process_response(first, HtmlResponse(url, headers=VALIDATORS, body=PAGE), spider)
+
+    second = Request(url)
+    assert middleware.process_request(second, spider) is None
+    assert second.headers.get('If-None-Match') == b'"v1"'
+    reused = middleware.process_response(second, Response(url, status=304), spider)
+    middleware.spider_closed(spider)
+
+    assert reused.status == 200 and reused.body == PAGE
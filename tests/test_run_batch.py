@@ -0,0 +1,40 @@
+# tests/test_run_batch.py
+import os
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("scrapy")
+
+from src import run_batch
+from src.pipelines import MarkdownExtractionPipeline
+from src.utils import OutputWriter
+
+SEEDS = ["http://127.0.0.1:8801/", "http://127.0.0.1:8802/"]
+
+
+def test_sites_on_one_host_get_their_own_bulk_file(tmp_path, monkeypatch):
+    seeds_file = tmp_path / "seeds.txt"
+    seeds_file.write_text("\n".join(SEEDS) + "\n")
+    monkeypatch.setattr(run_batch, "URL_LIST_DIR_ABS", str(tmp_path / "url_lists"))
+    crawls = []
+    monkeypatch.setattr(run_batch, "run_spiders",
+                        lambda prepared, max_sites: crawls.extend(prepared) or {})
+
+    run_batch.main([str(seeds_file), "--output-format", "jsonl"])
+
+    output_paths = [settings.get('OUTPUT_PATH') for settings, _ in crawls]
+    assert [os.path.basename(path) for path in output_paths] == ["127_0_0_18801.jsonl",
+                                                                 "127_0_0_18802.jsonl"]
+
+
+def test_pipeline_default_output_keeps_the_port(tmp_path, monkeypatch):
+    monkeypatch.setattr(OutputWriter, "project_root", str(tmp_path))
+    paths = []
+    for start_url in SEEDS:
+        pipeline = MarkdownExtractionPipeline(output_format='jsonl')
+        pipeline.open_spider(SimpleNamespace(start_urls=[start_url], allowed_domains=["127.0.0.1"]))
+        paths.append(pipeline.writer.sink.path)
+        pipeline.writer.close()
+    assert len(set(paths)) == 2
+    assert os.path.basename(paths[0]) == "127_0_0_18801.jsonl"
@@ -0,0 +1,93 @@
+# tests/test_run_spiders.py
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("scrapy")
+
+from conftest import run_in_subprocess
+
+PAGES = 8
+
+
+class _InFlight:
+    """Counts requests being served across several test servers and the most at once."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = self.peak = 0
+
+    def __enter__(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        with self.lock:
+            self.current -= 1
+
+
+class _SlowSite(ThreadingHTTPServer):
+    """/page/N.html for N < PAGES, each linking to the next two pages, served after 50 ms."""
+    daemon_threads = True
+
+    def __init__(self, in_flight):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with in_flight:
+                    time.sleep(0.05)
+                    n = self.path[len('/page/'):-len('.html')] if self.path.startswith('/page/') else ''
+                    if n.isdigit() and int(n) < PAGES:
+                        links = ''.join(f'<a href="/page/{m}.html">{m}</a>' for m in (int(n) + 1, int(n) + 2))
+                        body, status = f"<html><body><p>Page {n}</p>{links}</body></html>".encode(), 200
+                    else:
+                        body, status = b"Not found", 404
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'text/html')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        super().__init__(('127.0.0.1', 0), Handler)
+        self.start_url = f"http://127.0.0.1:{self.server_address[1]}/page/0.html"
+
+
+CRAWLS = """
+import json
+from src.run_url_finder import configure_crawl, run_spiders
+crawls = [configure_crawl(start_url, url_list, extra_settings={{
+    'DOWNLOAD_DELAY': 0, 'AUTOTHROTTLE_ENABLED': False, 'LOG_LEVEL': 'WARNING',
+    'CONCURRENT_REQUESTS_PER_DOMAIN': 4,
+    'DOWNLOAD_HANDLERS': {{'http': 'src.handlers.GlobalConcurrencyDownloadHandler'}},
+    'GLOBAL_CONCURRENT_REQUESTS': 2}}) for start_url, url_list in {sites!r}]
+print(json.dumps(run_spiders(crawls, max_sites=2)))
+"""
+
+
+def test_crawls_in_one_reactor_share_the_global_download_limit(tmp_path):
+    in_flight = _InFlight()
+    servers = [_SlowSite(in_flight) for _ in range(2)]
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    url_lists = [tmp_path / f"site{i}_urls.jsonl" for i in range(2)]
+    try:
+        crawl = run_in_subprocess(CRAWLS.format(
+            sites=[(server.start_url, str(path)) for server, path in zip(servers, url_lists)]))
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+    assert crawl.returncode == 0, crawl.stdout + crawl.stderr
+    assert json.loads(crawl.stdout.strip().splitlines()[-1]) == {}
+
+    for server, path in zip(servers, url_lists):
+        urls = [json.loads(line)['url'] for line in path.read_text(encoding='utf-8').splitlines()]
+        assert len(urls) == PAGES and all(url.startswith(server.start_url.rsplit('/', 1)[0]) for url in urls)
+    # Each site alone may run 4 downloads; both together never exceed the global 2
+    assert in_flight.peak == 2
@@ -0,0 +1,33 @@
+# tests/test_seen_set.py
+import pytest
+
+from src.utils.SeenSet import BloomSeenSet, HashedSeenSet, create_seen_set
+
+URLS = [f"https://example.com/page/{i}" for i in range(5000)]
+
+
+@pytest.mark.parametrize("kind", ["set", "hashed", "bloom"])
+def test_seen_sets_remember_every_key(kind):
+    seen = create_seen_set(kind, capacity=len(URLS))
+    seen.update(URLS)
+    assert all(url in seen for url in URLS)
+    assert len(seen) == len(URLS)
+
+
+def test_hashed_seen_set_grows_past_its_capacity():
+    seen = HashedSeenSet(capacity=16)
+    assert all(seen.add(url) for url in URLS)
+    assert not seen.add(URLS[0])
+    assert len(seen) == len(URLS)
+
+
+def test_bloom_false_positive_rate_stays_near_target():
+    seen = BloomSeenSet(capacity=len(URLS), error_rate=0.01)
+    seen.update(URLS)
+    false_positives = sum(f"https://example.com/other/{i}" in seen for i in range(10000))
+    assert false_positives < 300
+
+
+def test_unknown_kind_is_rejected():
+    with pytest.raises(ValueError):
+        create_seen_set("list")
@@ -0,0 +1,126 @@
+# tests/test_sitemap.py
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("lxml")
+
+from conftest import run_in_subprocess
+from src.utils.Sitemap import iter_robots_sitemaps, iter_sitemap_entries
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def urlset(locs, lastmod="2024-05-01"):
+    entries = ''.join(f"<url><loc>{loc}</loc><lastmod>{lastmod}</lastmod>"
+                      f"<priority>0.8</priority></url>" for loc in locs)
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset {NS}>{entries}</urlset>'.encode()
+
+
+def sitemap_index(locs):
+    entries = ''.join(f"<sitemap><loc>{loc}</loc></sitemap>" for loc in locs)
+    return f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex {NS}>{entries}</sitemapindex>'.encode()
+
+
+def test_robots_sitemap_lines():
+    robots = "User-agent: *\nDisallow: /private\nSitemap: https://example.com/a.xml\nsitemap:https://example.com/b.xml\n"
+    assert list(iter_robots_sitemaps(robots)) == ["https://example.com/a.xml", "https://example.com/b.xml"]
+
+
+def test_gzip_sitemaps_are_detected_by_magic_bytes():
+    locs = [f"https://example.com/page/{i}" for i in range(3)]
+    entries = list(iter_sitemap_entries(gzip.compress(urlset(locs))))
+    assert [entry.loc for entry in entries] == locs
+    assert entries[0].kind == 'url' and entries[0].lastmod == "2024-05-01" and entries[0].priority == 0.8
+
+
+def test_index_and_plain_text_sitemaps():
+    index = sitemap_index(["https://example.com/a.xml.gz", "https://example.com/b.xml"])
+    assert [(entry.kind, entry.loc) for entry in iter_sitemap_entries(index)] == [
+        ('sitemap', "https://example.com/a.xml.gz"), ('sitemap', "https://example.com/b.xml")]
+    plain = b"https://example.com/a\n\nnot a url\nhttps://example.com/b\n"
+    assert [entry.loc for entry in iter_sitemap_entries(plain)] == ["https://example.com/a", "https://example.com/b"]
+
+
+def test_entries_stream_until_the_first_xml_error():
+    body = urlset(["https://example.com/a", "https://example.com/b"]).replace(b"</urlset>", b"<url><loc>broken")
+    entries = iter_sitemap_entries(body)
+    assert next(entries).loc == "https://example.com/a"
+    assert [entry.loc for entry in entries] == ["https://example.com/b"]
+
+
+def test_decompressed_size_is_capped():
+    body = gzip.compress(urlset([f"https://example.com/page/{i}" for i in range(1000)]))
+    capped = list(iter_sitemap_entries(body, max_bytes=10_000))
+    assert 0 < len(capped) < 1000
+    # A bomb: a few KB of gzip inflating to far more than the cap; the entry past it is never read
+    bomb = gzip.compress(b'<urlset>' + b' ' * (20 * 1024 * 1024)
+                         + b'<url><loc>https://example.com/late</loc></url></urlset>')
+    assert [entry.loc for entry in iter_sitemap_entries(bomb)] == ["https://example.com/late"]
+    assert list(iter_sitemap_entries(bomb, max_bytes=1024 * 1024)) == []
+
+
+class _SitemapServer(ThreadingHTTPServer):
+    """robots.txt -> sitemap index -> a gzipped and a plain child sitemap (plus an index loop)."""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), self._handler())
+        base = f"http://127.0.0.1:{self.server_address[1]}"
+        self.start_url = f"{base}/"
+        self.pages = [f"{base}/page/{i}.html" for i in range(6)]
+        self.files = {
+            '/robots.txt': (f"Sitemap: {base}/sitemap_index.xml\n".encode(), 'text/plain'),
+            '/sitemap_index.xml': (sitemap_index([f"{base}/sitemaps/a.xml.gz", f"{base}/sitemaps/b.xml",
+                                                  f"{base}/sitemap_index.xml"]), 'application/xml'),
+            '/sitemaps/a.xml.gz': (gzip.compress(urlset(self.pages[:3])), 'application/x-gzip'),
+            '/sitemaps/b.xml': (urlset(self.pages[3:]), 'application/xml'),
+        }
+        for page in self.pages:
+            self.files[page[len(base):]] = (b"<html><body><p>Page</p></body></html>", 'text/html')
+
+    @staticmethod
+    def _handler():
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body, content_type = self.server.files.get(self.path, (b"Not found", 'text/plain'))
+                self.send_response(200 if self.path in self.server.files else 404)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+CRAWL = """
+import sys
+from src.run_url_finder import run_spider
+reason = run_spider({start_url!r}, {url_list!r}, sitemap=True, follow_links=False, extra_settings={{
+    'DOWNLOAD_DELAY': 0, 'AUTOTHROTTLE_ENABLED': False, 'LOG_LEVEL': 'WARNING'}})
+sys.exit(0 if reason == 'finished' else 1)
+"""
+
+
+def test_crawl_follows_sitemap_indexes_into_gzipped_sitemaps(tmp_path):
+    pytest.importorskip("scrapy")
+    server = _SitemapServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url_list = tmp_path / "urls.jsonl"
+        crawl = run_in_subprocess(CRAWL.format(start_url=server.start_url, url_list=str(url_list)))
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert crawl.returncode == 0, crawl.stdout + crawl.stderr
+
+    records = [json.loads(line) for line in url_list.read_text(encoding='utf-8').splitlines()]
+    assert sorted(record['url'] for record in records) == sorted(server.pages)
+    assert all(record['lastmod'] == "2024-05-01" for record in records)
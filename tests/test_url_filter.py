@@ -0,0 +1,55 @@
+# tests/test_url_filter.py
+from src.utils.SeenSet import CountMinSketch, HashedSeenSet
+from src.utils.UrlFilter import UrlFilter, canonical_key, clean_url, url_pattern
+
+
+def test_clean_url_normalizes_and_strips_tracking():
+    assert clean_url("HTTPS://Example.COM:443/a;jsessionid=abc?utm_source=x&b=2&a=1#top") \
+        == "https://example.com/a?a=1&b=2"
+    assert clean_url("http://example.com:8080") == "http://example.com:8080/"
+
+
+def test_canonical_key_ignores_www_and_trailing_slash():
+    assert canonical_key("https://www.example.com/docs/") == canonical_key("https://example.com/docs")
+
+
+def test_url_pattern_collapses_numbers_and_ids():
+    assert url_pattern("https://example.com/calendar/2024/05.html") == "example.com/calendar/{n}/{n}.html"
+    assert url_pattern("https://example.com/item/0123456789abcdef0123") == "example.com/item/{id}"
+
+
+def test_filter_counts_duplicates_apart_from_traps():
+    url_filter = UrlFilter(max_segment_repeats=2, max_query_variants=2)
+    assert url_filter.check("https://example.com/a?utm_medium=x") == ("https://example.com/a", None)
+    assert url_filter.check("https://www.example.com/a/")[1] == 'duplicate'
+    assert url_filter.check("https://example.com/x/x/x/page")[1] == 'path_repetition'
+    reasons = [url_filter.check(f"https://example.com/search?q={i}")[1] for i in range(3)]
+    assert reasons == [None, None, 'query_permutations']
+    assert url_filter.duplicates == 1
+    assert url_filter.pruned == {'path_repetition': 1, 'query_permutations': 1}
+
+
+def test_pattern_budget_is_opt_in():
+    urls = [f"https://example.com/product/{i}" for i in range(5)]
+    assert [UrlFilter().check(url)[1] for url in urls] == [None] * 5
+    budgeted = UrlFilter(max_per_pattern=3)
+    assert [budgeted.check(url)[1] for url in urls] == [None] * 3 + ['pattern_budget'] * 2
+
+
+def test_filter_shares_the_given_seen_set():
+    seen = HashedSeenSet()
+    seen.add(canonical_key("https://example.com/found"))
+    url_filter = UrlFilter(seen=seen, seen_set='hashed', seen_set_capacity=1000)
+    assert url_filter.check("https://example.com/found/")[1] == 'duplicate'
+    assert url_filter.check("https://example.com/new")[1] is None
+    assert canonical_key("https://example.com/new") in seen
+    assert isinstance(url_filter.query_variants, CountMinSketch)
+
+
+def test_count_min_sketch_never_undercounts():
+    sketch = CountMinSketch(width=64, depth=4)
+    for i in range(500):
+        sketch[f"key{i % 50}"] += 1
+    counts = [sketch[f"key{i}"] for i in range(50)]
+    assert all(count >= 10 for count in counts)
+    assert sum(counts) < 50 * 10 * 2
@@ -0,0 +1,44 @@
+# tests/test_url_stream.py
+import copy
+import threading
+
+from src.utils.UrlStream import UrlStream
+
+
+def test_full_stream_refuses_offers_until_read():
+    stream = UrlStream(maxsize=2)
+    assert stream.offer("https://example.com/a")
+    assert stream.offer("https://example.com/b")
+    assert not stream.offer("https://example.com/c")
+    assert stream.offered == 2
+
+
+def test_iteration_yields_in_order_until_closed():
+    stream = UrlStream(maxsize=2)
+    urls = [f"https://example.com/{i}" for i in range(10)]
+
+    def produce():
+        for url in urls:
+            while not stream.offer(url):
+                pass
+        stream.close()
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    assert list(stream) == urls
+    producer.join()
+
+
+def test_cancelled_stream_drops_offers():
+    stream = UrlStream(maxsize=1)
+    stream.offer("https://example.com/a")
+    stream.cancel()
+    assert stream.offer("https://example.com/b")
+    stream.close()
+    assert list(stream) == ["https://example.com/a"]
+
+
+def test_deepcopy_shares_the_buffer():
+    stream = UrlStream()
+    settings = copy.deepcopy({'URL_STREAM': stream})
+    assert settings['URL_STREAM'] is stream
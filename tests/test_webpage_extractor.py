@@ -0,0 +1,99 @@
+# tests/test_webpage_extractor.py
+import codecs
+
+import pytest
+
+pytest.importorskip("trafilatura")
+
+from src.utils import WebpageExtractor as extractor_module
+from src.utils.WebpageExtractor import WebpageExtractor, detect_encoding, parse_html
+
+ARTICLE = ("<p>Les crêpes de la Crêperie Église sont préparées chaque matin avec du beurre "
+           "salé, de la farine de sarrasin et beaucoup de patience. " * 6 + "</p>")
+
+
+def page(head, body=ARTICLE):
+    return f"<html><head>{head}</head><body><article><h1>Crêpes</h1>{body}</article></body></html>"
+
+
+def test_meta_charset_decodes_non_utf8_pages():
+    body = page('<meta charset="windows-1252"><title>Café</title>').encode('cp1252')
+    assert detect_encoding(body) == 'cp1252'
+    tree = parse_html(body)
+    assert tree.findtext('.//title') == "Café"
+    # A charset declared by the server wins over the page's own <meta>
+    assert detect_encoding(body, declared='utf-8') == 'utf-8'
+
+
+def test_byte_order_mark_wins_over_declared_charsets():
+    body = codecs.BOM_UTF8 + page('<meta charset="iso-8859-1"><title>Café</title>').encode('utf-8')
+    assert detect_encoding(body, declared='iso-8859-1') == 'utf-8'
+    assert parse_html(body, 'iso-8859-1').findtext('.//title') == "Café"
+
+
+def test_text_and_empty_input():
+    assert parse_html(page('<title>Café</title>')).findtext('.//title') == "Café"
+    assert parse_html(b"") is None
+    assert parse_html(None) is None
+
+
+def test_title_and_content_come_from_one_parsed_tree(monkeypatch):
+    parsed = []
+
+    def counting_parse_html(*args):
+        parsed.append(args)
+        return parse_html(*args)
+
+    monkeypatch.setattr(extractor_module, 'parse_html', counting_parse_html)
+    extractor = WebpageExtractor()
+    body = page('<meta charset="windows-1252"><title> Café du coin </title>').encode('cp1252')
+    result = extractor.extract_from_html("https://example.com/crepes", body)
+    assert len(parsed) == 1
+    assert result['title'] == "Café du coin"
+    assert "Crêperie Église" in result['content']
+
+    # Without <title>, the title falls back to the page's metadata / headings
+    untitled = extractor.extract_from_html(
+        "https://example.com/crepes", page('<meta property="og:title" content="Crêpes du jour">'))
+    assert untitled['title'] == "Crêpes du jour"
+    assert extractor.extract_from_html("https://example.com/empty", b"") == \
+        {'url': "https://example.com/empty", 'title': None, 'content': None}
+
+
+class _StubFetcher:
+    """fetch_many over canned pages that records how many pages it has handed out."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.fetched = 0
+
+    def fetch_many(self, urls, max_pending=None):
+        for url in urls:
+            self.fetched += 1
+            yield url, self.pages.get(url)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_extract_many_keeps_input_order_with_bounded_work_in_flight(workers):
+    from src.utils.Fetcher import Page
+
+    urls = [f"https://example.com/page/{i}" for i in range(12)]
+    # Distinct bodies of different sizes, so worker processes finish out of order
+    pages = {url: Page(page(f'<title>Page {i}</title>', f"<p>Page {i}.</p>" + ARTICLE * (1 + i % 4))
+                       .encode('utf-8'), 'utf-8')
+             for i, url in enumerate(urls)}
+    del pages[urls[5]] # Failed fetch
+    fetcher = _StubFetcher(pages)
+    extractor = WebpageExtractor(fetcher=fetcher)
+
+    results = []
+    for result in extractor.extract_many(urls, workers=workers, max_pending=3,
+                                         should_extract=lambda url, body: not url.endswith('/7')):
+        results.append(result)
+        # Pages fetched but not yet handed back never exceed max_pending
+        assert fetcher.fetched - len(results) <= 3
+
+    assert [result['url'] for result in results] == urls
+    assert [result['title'] for result in results if result['content']] == \
+        [f"Page {i}" for i in range(12) if i not in (5, 7)]
+    assert results[5]['content'] is None and results[7].get('skipped')
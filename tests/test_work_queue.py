@@ -0,0 +1,98 @@
+# tests/test_work_queue.py
+import os
+import uuid
+
+import pytest
+
+from src.utils.WorkQueue import SqliteWorkQueue, open_work_queue
+
+URL = "https://example.com/a"
+# Redis server for the Redis backend's tests; they are skipped when none answers
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/15")
+
+
+@pytest.fixture(params=['sqlite', 'redis'])
+def open_queue(request, tmp_path):
+    """Opens queues of one job on the SQLite backend, or on Redis when a server is reachable."""
+    opened = []
+    if request.param == 'sqlite':
+        spec, name = str(tmp_path / "queue.db"), 'test'
+    else:
+        redis = pytest.importorskip("redis")
+        try:
+            redis.Redis.from_url(REDIS_URL).ping()
+        except redis.RedisError:
+            pytest.skip(f"No Redis server at {REDIS_URL}")
+        spec, name = REDIS_URL, f"test-{uuid.uuid4().hex}"
+
+    def open_queue(**kwargs):
+        work_queue = open_work_queue(spec, name, **kwargs)
+        opened.append(work_queue)
+        return work_queue
+
+    yield open_queue
+    opened[0].reset()
+    for work_queue in opened:
+        work_queue.close()
+
+
+def test_urls_are_queued_once(open_queue):
+    work_queue = open_queue()
+    assert work_queue.add_many([URL, URL + "/b", URL]) == 2
+    assert work_queue.add_many([URL + "/b", URL + "/c"]) == 1
+    assert not work_queue.add(URL)
+    assert work_queue.claim("w1", 10) == [URL, URL + "/b", URL + "/c"]
+    assert work_queue.counts()['seen'] == 3
+
+
+def test_failed_urls_are_retried_until_max_attempts(open_queue):
+    work_queue = open_queue(max_attempts=2)
+    work_queue.add(URL)
+
+    assert work_queue.claim("w1", 10) == [URL]
+    assert work_queue.fail("w1", [URL]) == 1
+    assert work_queue.counts()['pending'] == 1
+
+    assert work_queue.claim("w1", 10) == [URL]
+    assert work_queue.fail("w1", [URL]) == 1
+    counts = work_queue.counts()
+    assert (counts['pending'], counts['done'], counts['failed']) == (0, 0, 1)
+
+
+def test_only_the_lease_holder_completes(open_queue):
+    work_queue = open_queue(lease_seconds=0)
+    work_queue.add(URL)
+
+    assert work_queue.claim("w1", 10) == [URL]
+    # w1's lease has run out and w2 takes the URL over
+    assert work_queue.claim("w2", 10) == [URL]
+    assert work_queue.complete("w1", [URL]) == 0
+    assert work_queue.fail("w1", [URL]) == 0
+    assert work_queue.counts()['leased'] == 1
+
+    assert work_queue.complete("w2", [URL]) == 1
+    assert work_queue.complete("w2", [URL]) == 0
+    assert work_queue.counts()['done'] == 1
+
+
+def test_leases_outlive_a_worker_that_is_still_working(open_queue):
+    work_queue = open_queue(lease_seconds=60)
+    work_queue.add(URL)
+    assert work_queue.claim("w1", 10) == [URL]
+    assert work_queue.claim("w2", 10) == []
+    assert not work_queue.finished()
+    work_queue.mark_crawl_done()
+    assert work_queue.complete("w1", [URL]) == 1
+    assert work_queue.finished()
+
+
+def test_output_paths_are_claimed_by_the_first_url(open_queue):
+    first, second = open_queue(), open_queue()
+    assert first.claim_path("example.com/a.md", URL) == URL
+    assert second.claim_path("example.com/a.md", URL + "?page=2") == URL
+
+
+def test_sqlite_spec_forms(tmp_path):
+    work_queue = open_work_queue(f"sqlite:///{tmp_path / 'queue.db'}")
+    assert isinstance(work_queue, SqliteWorkQueue) and work_queue.path == str(tmp_path / "queue.db")
+    work_queue.close()